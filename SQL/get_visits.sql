@@ -1,4 +1,4 @@
-SELECT VisitID
+SELECT VisitID, CreatedDate
 FROM [VisitMgt].[VisitFinincailInfo]
 WHERE  ContractorEnName = 'Bupa'
 ORDER BY CreatedDate;
\ No newline at end of file
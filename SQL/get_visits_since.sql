@@ -0,0 +1,5 @@
+SELECT VisitID, CreatedDate
+FROM [VisitMgt].[VisitFinincailInfo]
+WHERE  ContractorEnName = 'Bupa'
+AND CreatedDate >= ?
+ORDER BY CreatedDate;
\ No newline at end of file
@@ -1,9 +1,12 @@
+-- Expects the visit ids in the temp table #VisitIds (VisitID BIGINT), see
+-- database.read_data_for_ids. Serves single visits, visit lists and date windows alike.
 WITH CTE AS (
     SELECT 
         ID,
         DENSE_RANK() OVER (PARTITION BY VisitID, StatementID ORDER BY CreatedDate DESC) AS DR
     FROM Nphies.ClaimTransaction
     WHERE TransactionType = 'Request'
+    AND VisitID IN (SELECT VisitID FROM #VisitIds)
 )
 SELECT 
     V.ID AS VisitID,
@@ -12,6 +15,7 @@ SELECT
     V.MainSpecialityEnName AS Specialty_Name,
     CAST(VFI.ContractorClientPolicyNumber AS NVARCHAR(20)) AS ContractorClientPolicyNumber,
     VFI.ContractorClientEnName,
+    VFI.ContractorEnName AS Payer,
     CASE  
         WHEN VFI.ContractEnName LIKE '%OPD%' OR VFI.ContractEnName LIKE '%IPD%'
             THEN LTRIM(SUBSTRING(
@@ -65,6 +69,7 @@ LEFT JOIN (
     LEFT JOIN Patprlm.ProblemCardDetail PCD  
         ON PC.ID = PCD.ProblemCardID  
     WHERE PC.IsDeleted = 0 
+    AND PC.VISITID IN (SELECT VisitID FROM #VisitIds)
     GROUP BY VISITID
 ) AS PCD  
     ON PCD.VisitID = V.ID
@@ -76,4 +81,6 @@ WHERE
      OR CI.ResponseReason LIKE '%CV-%'
      OR CI.ResponseReason LIKE '%BE-%'
       )
-AND CT.VisitId = ?
+-- Superseded transactions (DR > 1) have no CT row through the RIGHT JOIN
+AND CT.VisitId IS NOT NULL
+ORDER BY V.ID
@@ -0,0 +1,4 @@
+-- Visits of a date window, loaded into #VisitIds for resubmission.sql
+SELECT ID
+FROM VISITMGT.Visit
+WHERE CreatedDate >= ? AND CreatedDate < ?
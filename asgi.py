@@ -0,0 +1,103 @@
+"""
+ASGI entry point. Streaming chat requests are served asynchronously so that a user
+waiting on the model only holds a coroutine, every other route is the Flask app.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 2200 --workers 4
+"""
+
+import asyncio
+import json
+import re
+
+from asgiref.wsgi import WsgiToAsgi
+
+from flask_app import _chat_stream_args, logger
+from flask_app import app as flask_app
+from src.resubmission.chatbot import astream_agent_response
+
+CHAT_STREAM_PATH = re.compile(r"^/chat/(?P<visit_id>[^/]+)/stream$")
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def _prepare_chat(scope, body, visit_id):
+    """
+    Runs the synchronous part of the request (session, visit and policy caches) inside
+    a Flask request context rebuilt from the ASGI scope.
+    """
+    headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]]
+    with flask_app.test_request_context(
+        scope["path"],
+        method="POST",
+        headers=headers,
+        data=body,
+        query_string=scope.get("query_string", b""),
+    ):
+        return _chat_stream_args(visit_id)
+
+
+async def _send_json(send, status, payload):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+async def chat_stream(scope, receive, send, visit_id):
+    """Async twin of flask_app.chat_stream, same request and Server-Sent Events format."""
+    body = await _read_body(receive)
+    # Cache misses query SQL Server / MongoDB, keep that off the event loop
+    agent_args = await asyncio.to_thread(_prepare_chat, scope, body, visit_id)
+    if agent_args is None:
+        await _send_json(send, 404, {"error": "Visit not loaded, open it again."})
+        return
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+
+    async def send_event(text):
+        await send(
+            {"type": "http.response.body", "body": text.encode(), "more_body": True}
+        )
+
+    try:
+        async for chunk in astream_agent_response(*agent_args):
+            await send_event(f"data: {json.dumps(chunk)}\n\n")
+    except Exception as e:
+        logger.error(f"Streaming failed for visit {visit_id}: {e}")
+        await send_event(f"event: error\ndata: {json.dumps(str(e))}\n\n")
+    await send(
+        {"type": "http.response.body", "body": b"event: done\ndata: {}\n\n"}
+    )
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http" and scope["method"] == "POST":
+        match = CHAT_STREAM_PATH.match(scope["path"])
+        if match:
+            await chat_stream(scope, receive, send, match["visit_id"])
+            return
+    await wsgi_app(scope, receive, send)
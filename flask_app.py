@@ -2,29 +2,43 @@ import json
 import logging
 import os
 from datetime import timedelta
-from io import StringIO
 
-import pandas as pd
 from dotenv import load_dotenv
 from flask import (
     Flask,
+    Response,
     jsonify,
     redirect,
     render_template,
     render_template_string,
     request,
     session,
+    stream_with_context,
     url_for,
 )
 from pymongo.errors import ServerSelectionTimeoutError
 
-from flask_session import Session  # type: ignore
-from src.resubmission.chatbot import get_agent_response
+from src.resubmission.answer_cache import answer_cache
+from src.resubmission.chatbot import (
+    get_agent_response,
+    get_batch_justifications,
+    stream_agent_response,
+    token_usage,
+)
 from src.resubmission.const import ERROR, INDEX
+from src.resubmission.database import DatabaseUnavailableError, pool_stats
+from src.resubmission.sessions import ServerSideSessionInterface, create_session_store
 from src.resubmission.utils import (
+    coverage_cache,
+    digest_cache,
     get_policy_details,
+    get_policy_digest,
+    policy_cache_key,
+    get_rejected_services,
     get_visit_data,
+    get_visit_info,
     get_visits_by_date,
+    visit_cache,
 )
 
 load_dotenv()
@@ -37,16 +51,26 @@ file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
 app = Flask(__name__)
-app.config["SESSION_TYPE"] = "filesystem"
+# Server-side sessions, backend chosen by SESSION_BACKEND (memory, sqlite or redis),
+# the store is created on the first request
+app.session_interface = ServerSideSessionInterface(create_session_store)
 app.permanent_session_lifetime = timedelta(hours=1)
-Session(app)
 app.secret_key = os.getenv("FLASK_SECRET_KEY")
 
 
+@app.errorhandler(DatabaseUnavailableError)
+def database_unavailable(error):
+    # Fail fast with a friendly page instead of holding the worker while SQL Server recovers
+    logger.error(f"Database unavailable: {error.__cause__ or error}")
+    return render_template(ERROR, message=str(error)), 503
+
+
+# Number of visit IDs rendered with the home page, the rest is reached through /api/visits
+VISITS_PAGE_SIZE = 100
+
+
 @app.route("/", methods=["GET", "POST"])
 def home():
-    visit_ids = get_visits_by_date()
-
     if request.method == "POST":
 
         visit_id = request.form.get("visit_id")
@@ -59,16 +83,35 @@ def home():
                 error_type="warning",
             )
 
+    visits = get_visits_by_date(limit=VISITS_PAGE_SIZE)
     return render_template(
         INDEX,
-        visit_ids=visit_ids,
+        visit_ids=[v["visit_id"] for v in visits["visits"]],
+        total_visits=visits["total"],
     )
 
 
+@app.route("/api/visits")
+def search_visits():
+    """
+    Typeahead and paging over the cached visit IDs.
+    Query args: q (visit ID prefix), start_date, end_date, limit, offset.
+    """
+    try:
+        visits = get_visits_by_date(
+            prefix=request.args.get("q", ""),
+            start_date=request.args.get("start_date") or None,
+            end_date=request.args.get("end_date") or None,
+            limit=min(request.args.get("limit", 50, type=int), 500),
+            offset=max(request.args.get("offset", 0, type=int), 0),
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
+    return jsonify(visits)
+
+
 @app.route("/visit/<visit_id>", methods=["GET", "POST"])
 def display_policy_details(visit_id):
-    df = get_visit_data(visit_id, logger)
-    
     if request.method == "POST":
         data = {
             "start_date": request.form.get("start_date"),
@@ -87,6 +130,8 @@ def display_policy_details(visit_id):
         """,
             data=data,
         )
+
+    df = get_visit_data(visit_id, logger)
     if df is None:
         return render_template(
             ERROR, message="No BE or CV Rejections Were Found for This Visit"
@@ -119,12 +164,9 @@ def display_policy_details(visit_id):
             visit_id=visit_id,
         )
     
-    # Store data in session for the chat route
-    session[f"visit_data_{visit_id}"] = {
-        "df": df.to_json(),
-        "policy_number": policy.policy_number,
-        "detail": json.dumps(detail, default=str),
-    }
+    # Visit rows and coverage detail stay in the server-side caches, the session only
+    # remembers which class was resolved so the chat route can look them up again
+    _remember_visit(visit_id, df)
 
     # Retrieve last search data from session
     last_search = session.get("last_search", {})
@@ -158,6 +200,10 @@ def select_level(visit_id):
     selected_level = request.form.get("selected_level")
 
     df = get_visit_data(visit_id, logger)
+    if df is None:
+        return render_template(
+            ERROR, message="No BE or CV Rejections Were Found for This Visit"
+        )
     df["Contract"] = selected_level
 
     policy, detail, available_levels = get_policy_details(df, logger)
@@ -170,36 +216,54 @@ def select_level(visit_id):
             visit_id=visit_id,
         )
 
-    # CACHE DATA HERE
-    session[f"visit_data_{visit_id}"] = {
-        "df": df.to_json(),
-        "policy_number": policy.policy_number,
-        "detail": json.dumps(detail, default=str),
-    }
+    _remember_visit(visit_id, df)
 
     return redirect(url_for("chat", visit_id=visit_id))
 
+
+def _remember_visit(visit_id, df):
+    """Stores the contract class resolved for a visit, the session holds nothing larger."""
+    session[f"visit_{visit_id}"] = {"contract": df["Contract"].iloc[0]}
+
+
+def _load_visit(visit_id):
+    """
+    Reads back the visit rows and coverage digest of a visit opened in this session,
+    from the visit and coverage caches (SQL Server and MongoDB only on a cache miss).
+
+    Returns:
+        tuple: (df, policy digest, policy cache key), or (None, None, None) if the visit
+        was not opened in this session
+    """
+    selection = session.get(f"visit_{visit_id}")
+    if not selection:
+        return None, None, None
+    df = get_visit_data(visit_id, logger)
+    if df is None:
+        return None, None, None
+    df["Contract"] = selection["contract"]
+    policy, detail, _ = get_policy_details(df, logger)
+    if detail is None:
+        return None, None, None
+    return df, get_policy_digest(policy, detail, df), policy_cache_key(policy, detail)
+
+
 @app.route("/chat/<visit_id>", methods=["GET", "POST"])
 def chat(visit_id):
-    cached_data = session.get(f"visit_data_{visit_id}")
-    if cached_data:
-        df = pd.read_json(StringIO(cached_data["df"]))
-        detail = json.loads(cached_data["detail"])
+    df, policy, policy_key = _load_visit(visit_id)
+    if df is None:
+        return redirect(url_for("display_policy_details", visit_id=visit_id))
 
     # Handle POST requests (chat messages or justification)
     if request.method == "POST":
         thread_id = str(getattr(session, "sid", None))
-        visit_info = str(
-            df[["Med_Dept", "Specialty_Name", "Diagnose_Name", "ICD10 Code"]]
-            .iloc[0]
-            .to_dict()
-        ) + str(df[["Service_Name", "Price"]].to_dict(orient="records"))
+        visit_info = get_visit_info(df)
         # Case 1: Chat message (form submission)
         if request.content_type == "application/x-www-form-urlencoded":
             user_input = request.form.get("message")
 
             assistant_reply = get_agent_response(
-                user_input, thread_id, str(detail), visit_info
+                user_input, thread_id, policy, visit_info, cache_key=policy_key
             )
             return jsonify({"response": assistant_reply})
 
@@ -207,7 +271,7 @@ def chat(visit_id):
         elif request.content_type == "application/json":
             service = request.get_json()
             justification_text = get_agent_response(
-                None, thread_id, str(detail), visit_info, service
+                None, thread_id, policy, visit_info, service
             )
             return jsonify({"justification": justification_text})
 
@@ -219,5 +283,87 @@ def chat(visit_id):
     )
 
 
+@app.route("/chat/<visit_id>/stream", methods=["POST"])
+def chat_stream(visit_id):
+    """
+    Same requests as the chat route's POST (a form message or a JSON service to justify),
+    answered as Server-Sent Events: one "data" event per generated chunk, JSON encoded,
+    then a "done" event.
+    """
+    agent_args = _chat_stream_args(visit_id)
+    if agent_args is None:
+        return jsonify({"error": "Visit not loaded, open it again."}), 404
+    chunks = stream_agent_response(*agent_args)
+
+    def events():
+        try:
+            for chunk in chunks:
+                yield f"data: {json.dumps(chunk)}\n\n"
+        except Exception as e:
+            logger.error(f"Streaming failed for visit {visit_id}: {e}")
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        # Keep proxies (e.g. nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/chat/<visit_id>/justify_all", methods=["POST"])
+def justify_all(visit_id):
+    """
+    Generates the justifications of every rejected service of the visit in one request.
+    Returns {"justifications": {row index: {"service", "justification" or "error"}}}.
+    """
+    df, policy, _ = _load_visit(visit_id)
+    if df is None:
+        return jsonify({"error": "Visit not loaded, open it again."}), 404
+
+    services = get_rejected_services(df)
+    results = get_batch_justifications(policy, get_visit_info(df), services)
+    for key, result in results.items():
+        result["service"] = services[key].get("Service_Name")
+    return jsonify({"justifications": results})
+
+
+def _chat_stream_args(visit_id):
+    """
+    Arguments of stream_agent_response for the current streaming request, shared with
+    the async endpoint of asgi.py.
+
+    Returns:
+        tuple: (user_input, thread_id, policy, visit_info, service, cache_key), or None
+        if the visit was not opened in this session
+    """
+    df, policy, policy_key = _load_visit(visit_id)
+    if df is None:
+        return None
+
+    thread_id = str(getattr(session, "sid", None))
+    if request.content_type == "application/json":
+        user_input, service = None, request.get_json()
+    else:
+        user_input, service = request.form.get("message"), None
+    return user_input, thread_id, policy, get_visit_info(df), service, policy_key
+
+
+@app.route("/metrics")
+def metrics():
+    """Cache, connection pool and token counters, used to size them."""
+    return jsonify(
+        {
+            "coverage_cache": coverage_cache.stats(),
+            "digest_cache": digest_cache.stats(),
+            "answer_cache": answer_cache.stats(),
+            "visit_cache": visit_cache.stats(),
+            "sql_pools": pool_stats(),
+            "llm_tokens": token_usage.stats(),
+        }
+    )
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=2200, debug=True)
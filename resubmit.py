@@ -0,0 +1,62 @@
+"""
+Offline bulk resubmission: justifies every BE/CV rejected visit of a date window.
+
+Example:
+    python resubmit.py --start 2026-10-01 --end 2026-11-01 --output october.csv
+Re-running the same command after an interruption resumes from the checkpoint.
+"""
+
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+from src.resubmission.pipeline import run_bulk_resubmission
+
+load_dotenv()
+
+logger = logging.getLogger("resubmit")
+logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--start", help="First visit date (inclusive), YYYY-MM-DD")
+    parser.add_argument("--end", help="Last visit date (exclusive), YYYY-MM-DD")
+    parser.add_argument(
+        "--visit-ids",
+        help="Text file with one visit id per line, instead of --start/--end. "
+        "Lines that are not a visit id are logged and skipped",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Output .csv file, any other path is written as a directory of Parquet parts",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Visits processed concurrently")
+    parser.add_argument("--rate", type=float, default=1.0, help="LLM calls per second")
+    parser.add_argument("--checkpoint", help="Checkpoint file, defaults to <output>.checkpoint")
+    args = parser.parse_args()
+    if not args.visit_ids and not (args.start and args.end):
+        parser.error("either --visit-ids or both --start and --end are required")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    visit_ids = None
+    if args.visit_ids:
+        with open(args.visit_ids, "r") as f:
+            visit_ids = [line.strip() for line in f if line.strip()]
+
+    processed = run_bulk_resubmission(
+        args.start,
+        args.end,
+        args.output,
+        logger,
+        workers=args.workers,
+        rate=args.rate,
+        checkpoint=args.checkpoint,
+        visit_ids=visit_ids,
+    )
+    logger.info(f"Processed {processed} visits")
@@ -0,0 +1,186 @@
+import os
+import re
+import threading
+
+import numpy as np
+
+from src.resubmission.cache import TTLCache
+
+
+def normalize_question(question) -> str:
+    """Case, punctuation and whitespace insensitive form of a question."""
+    if not isinstance(question, str):
+        return ""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.casefold()).split())
+
+
+class SentenceEmbedder:
+    """
+    Local sentence-transformers model, loaded on the first call. Requires
+    sentence-transformers and the model files on disk, nothing is sent over the network.
+
+    Args:
+        model_name (str): Model name or path, as accepted by SentenceTransformer.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # optional dependency, only needed for semantic matching
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(list(texts), normalize_embeddings=True)
+
+
+class AnswerCache:
+    """
+    Assistant answers keyed by policy number, class, context hash and normalized
+    question, so a question already answered from the same context is served without
+    calling the model. The context hash identifies the exact policy digest the answer
+    was generated from, and the visit info for a question about the visit, see
+    chatbot.answer_cache_key.
+
+    Without an embedder only questions that normalize to the same text match. With one,
+    a question also matches the most similar cached question of the same context whose
+    cosine similarity is at least threshold.
+
+    Args:
+        maxsize (int): Maximum number of answers, the least recently used is evicted first.
+        ttl (float): Seconds an answer stays valid, 0 disables the cache.
+        embedder (callable, optional): Maps a list of texts to unit-norm vectors.
+        threshold (float): Minimum cosine similarity of a semantic match.
+    """
+
+    def __init__(self, maxsize=2048, ttl=24 * 3600.0, embedder=None, threshold=0.92):
+        self.enabled = ttl > 0
+        self._answers = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.embedder = embedder
+        self.threshold = threshold
+        self._vectors = {}  # (policy, class, context) -> {normalized question: vector}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _embed(self, question):
+        return np.asarray(self.embedder([question])[0], dtype=np.float32)
+
+    def _semantic_match(self, policy_key, question):
+        with self._lock:
+            candidates = list(self._vectors.get(policy_key, {}).items())
+        if not candidates:
+            return None
+        keys = [key for key, _ in candidates]
+        similarities = np.stack([vector for _, vector in candidates]) @ self._embed(
+            question
+        )
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.threshold:
+                return None
+            answer = self._answers.get((*policy_key, keys[i]))
+            if answer is not None:
+                return answer
+            # Expired or evicted from the answers, forget its vector too
+            with self._lock:
+                self._vectors.get(policy_key, {}).pop(keys[i], None)
+        return None
+
+    def get(self, policy_key, question):
+        """
+        Looks up the answer to a question for a policy class.
+
+        Args:
+            policy_key (tuple): (normalized policy number, normalized class, context
+                hash), see chatbot.answer_cache_key.
+            question (str): The user's question.
+
+        Returns:
+            str: The cached answer, or None.
+        """
+        question = normalize_question(question)
+        if not question or not self.enabled:
+            return None
+        answer = self._answers.get((*policy_key, question))
+        if answer is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return answer
+        if self.embedder is not None:
+            answer = self._semantic_match(policy_key, question)
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.semantic_hits += 1
+        return answer
+
+    def set(self, policy_key, question, answer):
+        question = normalize_question(question)
+        if not question or not answer or not self.enabled:
+            return
+        self._answers.set((*policy_key, question), answer)
+        if self.embedder is not None:
+            vector = self._embed(question)
+            with self._lock:
+                self._vectors.setdefault(policy_key, {})[question] = vector
+                if sum(map(len, self._vectors.values())) > self._answers.maxsize:
+                    self._prune_vectors()
+
+    def _prune_vectors(self):
+        """Drops the vectors whose answer expired or was evicted, called under _lock."""
+        for policy_key in list(self._vectors):
+            vectors = self._vectors[policy_key]
+            for question in list(vectors):
+                if (*policy_key, question) not in self._answers:
+                    del vectors[question]
+            if not vectors:
+                del self._vectors[policy_key]
+
+    def invalidate(self, policy_number):
+        """Drops every answer of a normalized policy number, e.g. after it is reinserted."""
+        self._answers.invalidate(lambda key: key[0] == policy_number)
+        with self._lock:
+            for policy_key in [k for k in self._vectors if k[0] == policy_number]:
+                del self._vectors[policy_key]
+
+    def stats(self):
+        """Hit/miss counters and occupancy, used to tune the threshold and size."""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            counters = {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
+        answers = self._answers.stats()
+        counters.update(
+            {key: answers[key] for key in ("evictions", "size", "maxsize", "ttl")}
+        )
+        return counters
+
+
+def create_answer_cache():
+    """
+    Builds the answer cache from the environment: ANSWER_CACHE_TTL seconds (defaults to
+    one day, 0 disables the cache), ANSWER_CACHE_EMBEDDING_MODEL (a local
+    sentence-transformers model enabling semantic matches) and ANSWER_CACHE_SIMILARITY
+    (defaults to 0.92).
+    """
+    model_name = os.getenv("ANSWER_CACHE_EMBEDDING_MODEL")
+    return AnswerCache(
+        ttl=float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+        embedder=SentenceEmbedder(model_name) if model_name else None,
+        threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92")),
+    )
+
+
+answer_cache = create_answer_cache()
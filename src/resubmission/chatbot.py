@@ -1,18 +1,140 @@
+import asyncio
+import hashlib
+import logging
 import operator
+import os
+import re
+import threading
+import weakref
 from typing import Annotated, TypedDict
 
 from dotenv import load_dotenv
-from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage
-from langchain.messages import RemoveMessage
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
 from langchain_fireworks import ChatFireworks
-from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import END, StateGraph
 from langgraph.types import Overwrite
 
-from src.resubmission.prompt import chatbot_prompt, justification_prompt
+from src.resubmission.answer_cache import answer_cache
+from src.resubmission.checkpointer import create_checkpointer
+from src.resubmission.prompt import chatbot_prompt, justification_prompt, summary_prompt
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent async calls to one upstream model, per event loop
+# (uvicorn runs one per process)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+# Semaphores are bound to the loop they are used in: event loop -> {model: semaphore}
+_model_limiters = weakref.WeakKeyDictionary()
+_model_limiters_lock = threading.Lock()
+
+# Tokens of conversation history kept per model before older turns are summarized,
+# models not listed use HISTORY_TOKEN_BUDGET
+HISTORY_TOKEN_BUDGETS = {
+    "accounts/fireworks/models/gpt-oss-120b": 24000,
+}
+DEFAULT_HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "16000"))
+
+# A history over its budget is trimmed down to this fraction of it, so that the
+# summary call runs once every few turns rather than on every turn
+HISTORY_TRIM_TARGET = float(os.getenv("HISTORY_TRIM_TARGET", "0.6"))
+
+# Message ids marking the system context (never trimmed) and the rolling summary
+CONTEXT_ID_PREFIX = "context-"
+SUMMARY_ID = "history-summary"
+
+
+def get_model_limiter(model: str) -> asyncio.Semaphore:
+    """
+    Returns the semaphore capping concurrent async calls to a model from the running
+    event loop. Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    with _model_limiters_lock:
+        limiters = _model_limiters.setdefault(loop, {})
+        if model not in limiters:
+            limiters[model] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        return limiters[model]
+
+
+class TokenUsage:
+    """
+    Running totals of the input tokens sent to the models, split into the part served
+    from the provider's prompt prefix cache and the part billed at the full rate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+
+    @staticmethod
+    def _read(message):
+        """Returns (input, cached input, output) tokens reported for one response."""
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            details = usage.get("input_token_details") or {}
+            return (
+                usage.get("input_tokens", 0),
+                details.get("cache_read", 0) or 0,
+                usage.get("output_tokens", 0),
+            )
+        # Raw OpenAI-style usage, for providers without usage_metadata
+        token_usage = (getattr(message, "response_metadata", None) or {}).get(
+            "token_usage"
+        ) or {}
+        details = token_usage.get("prompt_tokens_details") or {}
+        return (
+            token_usage.get("prompt_tokens", 0),
+            details.get("cached_tokens", 0) or 0,
+            token_usage.get("completion_tokens", 0),
+        )
+
+    def record(self, message):
+        """
+        Adds the usage of one model response to the totals.
+
+        Returns:
+            dict: {"input_tokens", "cached_input_tokens", "uncached_input_tokens",
+            "output_tokens"} of this call.
+        """
+        input_tokens, cached, output_tokens = self._read(message)
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cached_input_tokens += cached
+            self.output_tokens += output_tokens
+        return {
+            "input_tokens": input_tokens,
+            "cached_input_tokens": cached,
+            "uncached_input_tokens": input_tokens - cached,
+            "output_tokens": output_tokens,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_input_tokens": self.cached_input_tokens,
+                "uncached_input_tokens": self.input_tokens - self.cached_input_tokens,
+                "output_tokens": self.output_tokens,
+                "cache_hit_rate": (
+                    self.cached_input_tokens / self.input_tokens
+                    if self.input_tokens
+                    else 0.0
+                ),
+            }
+
+
+token_usage = TokenUsage()
+
 
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], operator.add]
@@ -22,7 +144,8 @@ class InsuranceAgent:
     def __init__(
         self,
         model="accounts/fireworks/models/gpt-oss-120b",
-        message_window=3,  # For debugging/development purposes, replace with a more reasonable window for production
+        token_budget=None,  # Defaults to HISTORY_TOKEN_BUDGETS for the model
+        checkpointer=None,  # Defaults to create_checkpointer()
     ):
         self.llm = ChatFireworks(
             model=model,
@@ -33,49 +156,155 @@ class InsuranceAgent:
             },  # Using stream to escape Fireworks error "Requests with max_tokens > 4096 must have stream=true"
             request_timeout=(120, 120),
         )
-        self.message_window = message_window
+        self.model = model
+        self.token_budget = token_budget or HISTORY_TOKEN_BUDGETS.get(
+            model, DEFAULT_HISTORY_TOKEN_BUDGET
+        )
+        self._pinned_over_budget = False  # logged once, see _plan_trim
 
         graph = StateGraph(AgentState)
 
-        graph.add_node("llm", self._call_llm)
-        graph.add_node("replace_messages", self._replace_messages)
+        # Sync runs (invoke/stream) call _call_llm, async runs (ainvoke/astream) call _acall_llm
+        graph.add_node("llm", RunnableLambda(self._call_llm, afunc=self._acall_llm))
+        graph.add_node(
+            "trim_history", RunnableLambda(self._trim_history, afunc=self._atrim_history)
+        )
 
         graph.set_entry_point("llm")
 
-        graph.add_edge("llm", "replace_messages")
-        graph.add_edge("replace_messages", END)
+        graph.add_edge("llm", "trim_history")
+        graph.add_edge("trim_history", END)
 
-        checkpointer = InMemorySaver()
-        self.graph = graph.compile(checkpointer=checkpointer)
+        # Conversations persist on disk, shared by the workers and bounded in size
+        self.checkpointer = checkpointer or create_checkpointer()
+        self.graph = graph.compile(checkpointer=self.checkpointer)
+
+    def _plan_trim(self, messages):
+        """
+        Splits the history when it exceeds the token budget.
+
+        The system context is pinned, then the most recent messages are kept while they
+        fit in HISTORY_TRIM_TARGET of the budget (at least the last one), the older ones
+        are evicted. When the pinned context leaves no room for a summary, the evicted
+        messages are dropped without one.
 
-    def _delete_messages(self, state: AgentState):
-        """ "
-        A LangGraph node function, currently not used.
-        LangGraph handles calling this function as part of the graph execution, applies the deletion as a reducer.
-        Args:
-            state (AgentState): They entire state dictionary
         Returns:
-            Dict: A dictionary with the messages to delete from the state."""
-        messages = state["messages"]
-        if len(messages) > self.message_window:
-            keep = messages[:3] + messages[-self.message_window :]
-            to_remove = [m for m in messages if m not in keep]
-            return {"messages": [RemoveMessage(id=m.id) for m in to_remove]}
+            tuple: (pinned, previous summary or None, evicted, kept, whether to
+            summarize the evicted messages), or None when the history fits in the
+            budget or nothing can be evicted.
+        """
+        if count_tokens_approximately(messages) <= self.token_budget:
+            return None
+
+        pinned = [m for m in messages if (m.id or "").startswith(CONTEXT_ID_PREFIX)]
+        summary = next((m for m in messages if m.id == SUMMARY_ID), None)
+        history = [
+            m
+            for m in messages
+            if m is not summary and not (m.id or "").startswith(CONTEXT_ID_PREFIX)
+        ]
+
+        target = int(self.token_budget * HISTORY_TRIM_TARGET)
+        pinned_tokens = count_tokens_approximately(pinned)
+        # Leave an eighth of the budget to the summary
+        summary_budget = self.token_budget // 8
+        summarize = pinned_tokens + summary_budget < target
+        if not summarize:
+            summary = None
+            if not self._pinned_over_budget:
+                self._pinned_over_budget = True
+                logger.warning(
+                    "System context of %s tokens leaves no room for history within "
+                    "%s tokens, older turns are dropped without a summary.",
+                    pinned_tokens,
+                    self.token_budget,
+                )
+        reserved = pinned_tokens + (summary_budget if summarize else 0)
+        available = max(target - reserved, 0)
+        cut = len(history) - 1
+        used = count_tokens_approximately(history[cut:])
+        while cut > 0:
+            size = count_tokens_approximately(history[cut - 1 : cut])
+            if used + size > available:
+                break
+            used += size
+            cut -= 1
+        # Do not start the kept history with an answer separated from its question
+        while cut < len(history) - 1 and isinstance(history[cut], AIMessage):
+            cut += 1
+        if cut == 0:
+            return None
+        return pinned, summary, history[:cut], history[cut:], summarize
+
+    def _summary_messages(self, summary, evicted):
+        """Helper building the summarization request of the evicted messages."""
+        transcript = "\n".join(
+            f"{m.__class__.__name__.replace('Message', '')}: {m.content}"
+            for m in evicted
+        )
+        if summary is not None:
+            transcript = f"Summary so far:\n{summary.content}\n\n{transcript}"
+        return [SystemMessage(content=summary_prompt), HumanMessage(content=transcript)]
+
+    def _trimmed(self, pinned, summary_text, kept):
+        summary = []
+        if summary_text:
+            summary = [
+                SystemMessage(
+                    content="Summary of the earlier conversation:\n" + summary_text,
+                    id=SUMMARY_ID,
+                )
+            ]
+        # Bypass the reducer and replace the entire messages list
+        return {"messages": Overwrite(pinned + summary + kept)}
 
-    def _replace_messages(self, state: AgentState):
+    def _trim_history(self, state: AgentState):
         """
         A LangGraph node function, must follow a specific signature.
         LangGraph handles calling this function as part of the graph execution.
+        Keeps the conversation within the model's token budget: the system context is
+        kept as is, evicted turns are folded into a rolling summary message.
         Args:
             state (AgentState): They entire state dictionary
         Returns:
-            Dict: A dictionary with the new conversation history to replace the existing state with it
+            Dict: The trimmed conversation history replacing the existing state, or no
+            update when the history fits in the budget
         """
-        messages = state["messages"]
-        if len(messages) > self.message_window:
-            replacement = messages[:3] + messages[-self.message_window :]
-        # Bypass the reducer and replace the entire messages list
-        return {"messages": Overwrite(replacement)}
+        plan = self._plan_trim(state["messages"])
+        if plan is None:
+            return {}
+        pinned, summary, evicted, kept, summarize = plan
+        if not summarize:
+            return self._trimmed(pinned, "", kept)
+        try:
+            response = self.llm.invoke(self._summary_messages(summary, evicted))
+            self._record_usage(response)
+            summary_text = response.content
+        except Exception as e:
+            # Keep the previous summary rather than failing the user's request
+            logger.warning(f"History summary failed: {e}")
+            summary_text = summary.content.split("\n", 1)[-1] if summary else ""
+        return self._trimmed(pinned, summary_text, kept)
+
+    async def _atrim_history(self, state: AgentState):
+        """Async version of _trim_history."""
+        plan = self._plan_trim(state["messages"])
+        if plan is None:
+            return {}
+        pinned, summary, evicted, kept, summarize = plan
+        if not summarize:
+            return self._trimmed(pinned, "", kept)
+        try:
+            async with get_model_limiter(self.model):
+                response = await self.llm.ainvoke(
+                    self._summary_messages(summary, evicted)
+                )
+            self._record_usage(response)
+            summary_text = response.content
+        except Exception as e:
+            logger.warning(f"History summary failed: {e}")
+            summary_text = summary.content.split("\n", 1)[-1] if summary else ""
+        return self._trimmed(pinned, summary_text, kept)
 
     def _call_llm(self, state: AgentState):
         """
@@ -87,8 +316,34 @@ class InsuranceAgent:
             Dict: A dictionary with updates only to merge into the state
         """
         response = self.llm.invoke(state["messages"])
+        self._record_usage(response)
+        return {"messages": [response]}
+
+    async def _acall_llm(self, state: AgentState):
+        """
+        Async version of _call_llm, used when the graph runs with ainvoke/astream.
+        The number of concurrent calls to the same model is capped by its limiter.
+        """
+        async with get_model_limiter(self.model):
+            response = await self.llm.ainvoke(state["messages"])
+        self._record_usage(response)
         return {"messages": [response]}
 
+    def _record_usage(self, response):
+        """
+        Helper to count the cached and uncached input tokens of a model response.
+        Totals are served by /metrics, each call is only logged at debug level.
+        """
+        usage = token_usage.record(response)
+        logger.debug(
+            "%s: %s input tokens (%s cached, %s uncached), %s output tokens",
+            self.model,
+            usage["input_tokens"],
+            usage["cached_input_tokens"],
+            usage["uncached_input_tokens"],
+            usage["output_tokens"],
+        )
+
     def _get_thread_config(self, thread_id: str):
         """Helper to create thread configuration."""
         return {"configurable": {"thread_id": thread_id}}
@@ -104,40 +359,111 @@ class InsuranceAgent:
         messages = self.graph.get_state(thread).values.get("messages", [])
         return len(messages) == 0
 
+    def is_new_thread(self, thread_id: str) -> bool:
+        """Whether the thread has no message yet, so its next answer has no history."""
+        return self._is_first_call(self._get_thread_config(thread_id))
+
+    async def ais_new_thread(self, thread_id: str) -> bool:
+        """Async version of is_new_thread."""
+        snapshot = await self.graph.aget_state(self._get_thread_config(thread_id))
+        return not snapshot.values.get("messages")
+
+    def _system_context(self, policy: str, visit_info: str):
+        """
+        Helper building the system context messages of a new thread.
+        Ordered from the most to the least shared content (instructions, then the policy
+        class digest, then the visit) so consecutive calls share the longest prefix the
+        provider can serve from its prompt cache.
+        """
+        return {
+            "messages": [
+                SystemMessage(content=chatbot_prompt, id=CONTEXT_ID_PREFIX + "prompt"),
+                SystemMessage(content=policy, id=CONTEXT_ID_PREFIX + "policy"),
+                SystemMessage(
+                    content="Patient's info and services provided during the visit: "
+                    + visit_info,
+                    id=CONTEXT_ID_PREFIX + "visit",
+                ),
+            ]
+        }
+
     def _add_system_context(self, thread, policy: str, visit_info: str):
         """Helper to add system context messages on the first call."""
+        self.graph.update_state(thread, self._system_context(policy, visit_info))
+
+    async def _aadd_system_context(self, thread, policy: str, visit_info: str):
+        """Async version of _add_system_context, also adds the context on the first call only."""
+        snapshot = await self.graph.aget_state(thread)
+        if not snapshot.values.get("messages"):
+            await self.graph.aupdate_state(
+                thread, self._system_context(policy, visit_info)
+            )
+
+    def record_exchange(
+        self, thread_id: str, policy: str, visit_info: str, user_input: str, answer: str
+    ):
+        """
+        Adds a question and an answer obtained without calling the model (e.g. from the
+        answer cache) to the thread, so that follow-up questions see them.
+        """
+        thread = self._get_thread_config(thread_id)
+        if self._is_first_call(thread):
+            self._add_system_context(thread, policy, visit_info)
         self.graph.update_state(
             thread,
-            {
-                "messages": [
-                    SystemMessage(content=policy),
-                    SystemMessage(content=chatbot_prompt),
-                    SystemMessage(
-                        content="Patient's info and services provided during the visit: "
-                        + visit_info
-                    ),
-                ]
-            },
+            {"messages": [HumanMessage(content=user_input), AIMessage(content=answer)]},
+            as_node="trim_history",
         )
 
-    def _stream(self, state, thread):
-        """Helper to stream LLM responses."""
-        full_response = ""
+    async def arecord_exchange(
+        self, thread_id: str, policy: str, visit_info: str, user_input: str, answer: str
+    ):
+        """Async version of record_exchange."""
+        thread = self._get_thread_config(thread_id)
+        await self._aadd_system_context(thread, policy, visit_info)
+        await self.graph.aupdate_state(
+            thread,
+            {"messages": [HumanMessage(content=user_input), AIMessage(content=answer)]},
+            as_node="trim_history",
+        )
+
+    def _iter_stream(self, state, thread):
+        """Helper yielding the LLM response chunk by chunk as the model generates it."""
         for chunk, metadata in self.graph.stream(
             state, thread, version="v1", stream_mode="messages"
         ):
-            if chunk.content:
-                full_response += chunk.content
+            if chunk.content and metadata.get("langgraph_node") == "llm":
+                yield chunk.content
 
-        return full_response
+    async def _aiter_stream(self, state, thread):
+        """Async version of _iter_stream, the event loop is free while waiting on the model."""
+        async for chunk, metadata in self.graph.astream(
+            state, thread, version="v1", stream_mode="messages"
+        ):
+            if chunk.content and metadata.get("langgraph_node") == "llm":
+                yield chunk.content
 
-    def respond(self, thread_id: str, policy: str, visit_info: str, user_input: str):
-        thread = self._get_thread_config(thread_id)
+    def _stream(self, state, thread):
+        """Helper to stream LLM responses."""
+        return "".join(self._iter_stream(state, thread))
 
+    def _respond_state(self, thread, policy: str, visit_info: str, user_input: str):
         # Add system context on FIRST call only, Subsequent calls: only send to the llm the new user message
         if self._is_first_call(thread):
             self._add_system_context(thread, policy, visit_info)
-        state = {"messages": [HumanMessage(content=user_input)]}
+        return {"messages": [HumanMessage(content=user_input)]}
+
+    def _justify_state(self, thread, policy, visit_info, claim_info):
+        # Add system context on FIRST call only, Subsequent calls: only send to the llm the new user message
+        if self._is_first_call(thread):
+            self._add_system_context(thread, policy, visit_info)
+        return {
+            "messages": [SystemMessage(content=justification_prompt + str(claim_info))]
+        }
+
+    def respond(self, thread_id: str, policy: str, visit_info: str, user_input: str):
+        thread = self._get_thread_config(thread_id)
+        state = self._respond_state(thread, policy, visit_info, user_input)
 
         response = self._stream(state, thread)
         self._print_history(thread)
@@ -145,21 +471,163 @@ class InsuranceAgent:
 
     def justify(self, thread_id: str, policy, visit_info, claim_info: str):
         thread = self._get_thread_config(thread_id)
+        state = self._justify_state(thread, policy, visit_info, claim_info)
 
-        # Add system context on FIRST call only, Subsequent calls: only send to the llm the new user message
-        if self._is_first_call(thread):
-            self._add_system_context(thread, policy, visit_info)
+        response = self._stream(state, thread)
+
+        self._print_history(thread)
+        return response
+
+    def stream_respond(
+        self, thread_id: str, policy: str, visit_info: str, user_input: str
+    ):
+        """Same as respond, but yields the answer chunk by chunk as it is generated."""
+        thread = self._get_thread_config(thread_id)
+        state = self._respond_state(thread, policy, visit_info, user_input)
+        yield from self._iter_stream(state, thread)
+
+    def stream_justify(self, thread_id: str, policy, visit_info, claim_info: str):
+        """Same as justify, but yields the justification chunk by chunk as it is generated."""
+        thread = self._get_thread_config(thread_id)
+        state = self._justify_state(thread, policy, visit_info, claim_info)
+        yield from self._iter_stream(state, thread)
+
+    def justify_batch(self, policy, visit_info, services: dict, max_concurrency=4):
+        """
+        Generates the justifications of several rejected services with bounded concurrent
+        calls. Each service gets its own stateless call sharing the same system context,
+        so the chat thread's history is neither sent nor modified.
+
+        Args:
+            policy (str): Policy coverage details.
+            visit_info (str): Patient's info and services provided during the visit.
+            services (dict): Mapping of a key (e.g. the row index) to the service details.
+            max_concurrency (int): Maximum number of calls in flight at once.
+
+        Returns:
+            dict: For each key, {"justification": text} or {"error": message}.
+        """
+        context = self._system_context(policy, visit_info)["messages"]
+        keys = list(services)
+        prompts = [
+            context + [SystemMessage(content=justification_prompt + str(services[key]))]
+            for key in keys
+        ]
+        responses = self.llm.batch(
+            prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        )
+
+        results = {}
+        for key, response in zip(keys, responses):
+            if isinstance(response, Exception):
+                results[key] = {"error": str(response)}
+            else:
+                self._record_usage(response)
+                results[key] = {"justification": response.content}
+        return results
+
+    async def astream_respond(
+        self, thread_id: str, policy: str, visit_info: str, user_input: str
+    ):
+        """Async version of stream_respond."""
+        thread = self._get_thread_config(thread_id)
+        await self._aadd_system_context(thread, policy, visit_info)
+        state = {"messages": [HumanMessage(content=user_input)]}
+        async for chunk in self._aiter_stream(state, thread):
+            yield chunk
+
+    async def astream_justify(self, thread_id: str, policy, visit_info, claim_info: str):
+        """Async version of stream_justify."""
+        thread = self._get_thread_config(thread_id)
+        await self._aadd_system_context(thread, policy, visit_info)
         state = {
             "messages": [SystemMessage(content=justification_prompt + str(claim_info))]
         }
+        async for chunk in self._aiter_stream(state, thread):
+            yield chunk
 
-        response = self._stream(state, thread)
+    async def arespond(
+        self, thread_id: str, policy: str, visit_info: str, user_input: str
+    ):
+        """Async version of respond."""
+        chunks = self.astream_respond(thread_id, policy, visit_info, user_input)
+        return "".join([chunk async for chunk in chunks])
+
+    async def ajustify(self, thread_id: str, policy, visit_info, claim_info: str):
+        """Async version of justify."""
+        chunks = self.astream_justify(thread_id, policy, visit_info, claim_info)
+        return "".join([chunk async for chunk in chunks])
 
-        self._print_history(thread)
-        return response
 
+_agent = None
+_agent_lock = threading.Lock()
 
-_agent = InsuranceAgent()
+
+def get_agent() -> InsuranceAgent:
+    """
+    Returns the shared agent, built on first use so that importing this module does not
+    create the model client nor open the checkpoint database.
+    """
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = InsuranceAgent()
+    return _agent
+
+
+# Words tying a question to the visit or to the earlier turns, e.g. "Is this service
+# covered?" or "And its limit?". Questions without them are answered from the policy
+# alone, so their answers are shared by every visit of the class and every turn
+CONTEXT_REFERENCE = re.compile(
+    r"^\s*(and|or|but|so|what about|how about)\b"
+    r"|\b(this|that|these|those|it|its|they|them|their|he|she|his|her|above|previous"
+    r"|earlier|same|else|patient|member|visit|claim|claims|rejected|rejection|denied"
+    r"|service|services|diagnosis|icd\w*)\b",
+    re.I,
+)
+
+
+def is_standalone_question(question) -> bool:
+    """True if a question refers neither to the visit nor to the conversation."""
+    return isinstance(question, str) and not CONTEXT_REFERENCE.search(question)
+
+
+def answer_cache_key(cache_key, policy, visit_info=None):
+    """
+    Answer cache key of a question: the (policy number, class) cache_key and a hash of
+    the exact policy digest, plus the visit info for a question about the visit, that
+    the answer is generated from.
+    """
+    context = policy if visit_info is None else f"{policy}\0{visit_info}"
+    return (*cache_key, hashlib.sha256(context.encode("utf-8")).hexdigest())
+
+
+def _answer_key(agent, cache_key, thread_id, policy, visit_info, user_input):
+    """
+    Answer cache key of a question, or None when its answer is not reusable: a
+    standalone question is keyed by the policy digest, a question about the visit by
+    the policy digest and the visit info, and only as the first one of its thread,
+    later answers depending on the conversation so far.
+    """
+    if cache_key is None:
+        return None
+    if is_standalone_question(user_input):
+        return answer_cache_key(cache_key, policy)
+    if agent.is_new_thread(thread_id):
+        return answer_cache_key(cache_key, policy, visit_info)
+    return None
+
+
+async def _aanswer_key(agent, cache_key, thread_id, policy, visit_info, user_input):
+    """Async version of _answer_key."""
+    if cache_key is None:
+        return None
+    if is_standalone_question(user_input):
+        return answer_cache_key(cache_key, policy)
+    if await agent.ais_new_thread(thread_id):
+        return answer_cache_key(cache_key, policy, visit_info)
+    return None
 
 
 def get_agent_response(
@@ -168,23 +636,162 @@ def get_agent_response(
     policy="",
     visit_info="",
     service=None,  # Optional parameter, in justify route only,
+    cache_key=None,  # Optional (policy number, class), enables the answer cache
 ):
     """
     Call this inside your Flask chat route.
+    Questions go through the answer cache when cache_key is given, see _answer_key.
     Example:
         answer = get_agent_response(msg, session_id, policy, visit_info)
     """
     if user_input:
-        return _agent.respond(
+        agent = get_agent()
+        cache_key = _answer_key(
+            agent, cache_key, thread_id, policy, visit_info, user_input
+        )
+        if cache_key is not None:
+            cached = answer_cache.get(cache_key, user_input)
+            if cached is not None:
+                agent.record_exchange(thread_id, policy, visit_info, user_input, cached)
+                return cached
+        answer = agent.respond(
             thread_id=thread_id,
             policy=policy,
             visit_info=visit_info,
             user_input=user_input,
         )
+        if cache_key is not None:
+            answer_cache.set(cache_key, user_input, answer)
+        return answer
     else:
-        return _agent.justify(
+        return get_agent().justify(
             thread_id=thread_id,
             policy=policy,
             visit_info=visit_info,
             claim_info=service,
         )
+
+
+def _cache_stream(chunks, cache_key, user_input):
+    """Yields the chunks, then caches the full answer if the stream completed."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    answer_cache.set(cache_key, user_input, "".join(parts))
+
+
+async def _acached_respond(user_input, thread_id, policy, visit_info, cache_key):
+    """Async counterpart of the answer cache handling of stream_agent_response."""
+    agent = get_agent()
+    cache_key = await _aanswer_key(
+        agent, cache_key, thread_id, policy, visit_info, user_input
+    )
+    if cache_key is not None:
+        cached = answer_cache.get(cache_key, user_input)
+        if cached is not None:
+            await agent.arecord_exchange(
+                thread_id, policy, visit_info, user_input, cached
+            )
+            yield cached
+            return
+    parts = []
+    chunks = agent.astream_respond(
+        thread_id=thread_id,
+        policy=policy,
+        visit_info=visit_info,
+        user_input=user_input,
+    )
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if cache_key is not None:
+        answer_cache.set(cache_key, user_input, "".join(parts))
+
+
+def stream_agent_response(
+    user_input,
+    thread_id,
+    policy="",
+    visit_info="",
+    service=None,  # Optional parameter, in justify route only,
+    cache_key=None,  # Optional (policy number, class), enables the answer cache
+):
+    """
+    Streaming counterpart of get_agent_response, yields the reply chunk by chunk.
+    Example:
+        for chunk in stream_agent_response(msg, session_id, policy, visit_info): ...
+    """
+    if user_input:
+        agent = get_agent()
+        cache_key = _answer_key(
+            agent, cache_key, thread_id, policy, visit_info, user_input
+        )
+        if cache_key is not None:
+            cached = answer_cache.get(cache_key, user_input)
+            if cached is not None:
+                agent.record_exchange(thread_id, policy, visit_info, user_input, cached)
+                return iter([cached])
+        chunks = agent.stream_respond(
+            thread_id=thread_id,
+            policy=policy,
+            visit_info=visit_info,
+            user_input=user_input,
+        )
+        if cache_key is not None:
+            return _cache_stream(chunks, cache_key, user_input)
+        return chunks
+    else:
+        return get_agent().stream_justify(
+            thread_id=thread_id,
+            policy=policy,
+            visit_info=visit_info,
+            claim_info=service,
+        )
+
+
+def astream_agent_response(
+    user_input,
+    thread_id,
+    policy="",
+    visit_info="",
+    service=None,  # Optional parameter, in justify route only,
+    cache_key=None,  # Optional (policy number, class), enables the answer cache
+):
+    """
+    Async counterpart of stream_agent_response, for the ASGI entry point.
+    Example:
+        async for chunk in astream_agent_response(msg, session_id, policy, visit_info): ...
+    """
+    if user_input:
+        if cache_key is not None:
+            return _acached_respond(
+                user_input, thread_id, policy, visit_info, cache_key
+            )
+        return get_agent().astream_respond(
+            thread_id=thread_id,
+            policy=policy,
+            visit_info=visit_info,
+            user_input=user_input,
+        )
+    else:
+        return get_agent().astream_justify(
+            thread_id=thread_id,
+            policy=policy,
+            visit_info=visit_info,
+            claim_info=service,
+        )
+
+
+def get_batch_justifications(policy, visit_info, services, max_concurrency=4):
+    """
+    Justifies every rejected service of a visit at once.
+    Example:
+        results = get_batch_justifications(policy, visit_info, {"0": service, "1": ...})
+    """
+    return get_agent().justify_batch(
+        policy=policy,
+        visit_info=visit_info,
+        services=services,
+        max_concurrency=max_concurrency,
+    )
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class BoundedSqliteSaver(SqliteSaver):
+    """
+    LangGraph checkpointer persisting conversations to a local SQLite file, shared by
+    every worker of the host and kept across restarts, with bounded growth:
+
+    - only the latest max_checkpoints checkpoints of a thread are kept, older ones and
+      their pending writes are deleted after each new checkpoint;
+    - threads without a new checkpoint for ttl seconds are deleted, checked at most
+      once every prune_interval seconds.
+
+    The async methods run the sync ones in a thread, so the same saver serves the graph's
+    invoke/stream and ainvoke/astream runs.
+
+    Args:
+        conn (sqlite3.Connection): Connection opened with check_same_thread=False.
+        ttl (float): Seconds of inactivity before a thread is deleted.
+        max_checkpoints (int): Checkpoints kept per thread.
+        prune_interval (float): Seconds between two purges of expired threads.
+    """
+
+    def __init__(self, conn, ttl=24 * 3600.0, max_checkpoints=20, prune_interval=300.0):
+        super().__init__(conn)
+        self.ttl = ttl
+        self.max_checkpoints = max_checkpoints
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+
+    def setup(self):
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS thread_activity (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS thread_activity_updated_at
+                ON thread_activity (updated_at);
+            """
+        )
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        now = time.time()
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) "
+                "VALUES (?, ?)",
+                (thread_id, now),
+            )
+            self._trim_thread(cur, thread_id, checkpoint_ns)
+            if now - self._pruned_at >= self.prune_interval:
+                self._delete_expired(cur, now - self.ttl)
+                self._pruned_at = now
+        return next_config
+
+    def _trim_thread(self, cur, thread_id, checkpoint_ns):
+        """Deletes the checkpoints of a thread older than its latest max_checkpoints."""
+        cur.execute(
+            "SELECT checkpoint_id FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints - 1),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return
+        # Checkpoint ids are time ordered, everything before the oldest kept one goes
+        for table in ("checkpoints", "writes"):
+            cur.execute(
+                f"DELETE FROM {table} "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, row[0]),
+            )
+
+    def _delete_expired(self, cur, cutoff):
+        cur.execute(
+            "SELECT thread_id FROM thread_activity WHERE updated_at < ?", (cutoff,)
+        )
+        expired = [(thread_id,) for (thread_id,) in cur.fetchall()]
+        for table in ("checkpoints", "writes", "thread_activity"):
+            cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", expired)
+
+    def delete_thread(self, thread_id):
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute(
+                "DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),)
+            )
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(
+            self.put_writes, config, writes, task_id, task_path
+        )
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(path=None):
+    """
+    Builds the conversation checkpointer from the environment: CHECKPOINT_SQLITE_PATH
+    (defaults to checkpoints.db), CHECKPOINT_TTL seconds (defaults to one day) and
+    CHECKPOINT_MAX_PER_THREAD (defaults to 20).
+    """
+    path = path or os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.db")
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = BoundedSqliteSaver(
+        conn,
+        ttl=float(os.getenv("CHECKPOINT_TTL", str(24 * 3600))),
+        max_checkpoints=int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20")),
+    )
+    saver.setup()
+    return saver
@@ -0,0 +1,132 @@
+import difflib
+import re
+
+# Contract values produced by the CASE expression of resubmission.sql, matched once per
+# policy against its class names when the policy is ingested
+CONTRACT_VOCABULARY = (
+    "VIP",
+    "VIP+",
+    "VVIP",
+    "A+",
+    "A",
+    "B",
+    "C",
+    "SNB",
+    "OPD",
+    "IPD",
+    "Gold",
+    "Silver",
+    "Bronze",
+    "Platinum",
+    "Diamond",
+)
+
+# Words dropped from class names before matching, e.g. "Class A+" -> "A+"
+GENERIC_WORDS = re.compile(r"\b(class|plan|category|level|tier|network)\b", re.I)
+
+# Characters of an alias key that tell apart tiers of one name, e.g. VIP, VVIP and VIP+
+TIER_MARKERS = re.compile(r"[v+\d]")
+
+# Scores of the alias kinds, fuzzy aliases score their similarity ratio
+EXACT_SCORE = 1.0
+CONTRACT_SCORE = 0.95
+STRIPPED_SCORE = 0.9
+MIN_FUZZY_SCORE = 0.8
+
+
+def alias_key(text) -> str:
+    """
+    Lookup key of a class or contract name: lowercase without spaces, dashes or dots,
+    the same as utils.normalize_text and safe as a MongoDB field name.
+    """
+    if not isinstance(text, str):
+        return ""
+    return re.sub(r"[\s\-–.$]", "", text).lower()
+
+
+def tier_variants(key, other) -> bool:
+    """True if two alias keys differ only in tier markers, e.g. "vip" and "vvip"."""
+    return key != other and TIER_MARKERS.sub("", key) == TIER_MARKERS.sub("", other)
+
+
+def contract_form(name) -> str:
+    """The contract value resubmission.sql derives from a contract named like name."""
+    name = name.strip()
+    upper = name.upper()
+    if "OPD" in upper or "IPD" in upper:
+        return name[max(upper.find("OPD"), upper.find("IPD")) :].strip()
+    if "VIP" in upper:
+        return name[upper.find("VIP") :].strip()
+    if upper.endswith("A+"):
+        return "A+"
+    if upper.endswith("SNB"):
+        return "SNB"
+    if upper.endswith((" A", " B")):
+        return name[-1]
+    return name
+
+
+def build_class_aliases(class_names) -> dict:
+    """
+    Alias table of a policy's classes, computed at ingestion so that resolving the
+    contract of a visit is a dict lookup.
+
+    Each class is reachable by its own name, by the contract value resubmission.sql
+    would derive from it and by its name without generic words. The contract values
+    of CONTRACT_VOCABULARY not covered that way map to the most similar class when
+    it is the only one scoring at least MIN_FUZZY_SCORE. A value that is another tier
+    of a class, e.g. VVIP or VIP+ next to VIP, is never fuzzy matched and is left to
+    the user's choice.
+
+    Args:
+        class_names: vip_level / class_code of every class of the policy
+
+    Returns:
+        dict: alias key -> [class name, score between 0 and 1]
+    """
+    names = [n for n in class_names if isinstance(n, str) and n.strip()]
+    aliases = {}
+
+    def add(alias, name, score):
+        key = alias_key(alias)
+        if key and (key not in aliases or aliases[key][1] < score):
+            aliases[key] = [name, score]
+
+    stripped = {}
+    for name in names:
+        stripped[name] = " ".join(GENERIC_WORDS.sub(" ", name).split())
+        add(stripped[name], name, STRIPPED_SCORE)
+        add(contract_form(name), name, CONTRACT_SCORE)
+    for name in names:
+        add(name, name, EXACT_SCORE)
+
+    for term in CONTRACT_VOCABULARY:
+        key = alias_key(term)
+        if key in aliases or any(tier_variants(key, alias) for alias in aliases):
+            continue
+        scores = sorted(
+            (
+                (difflib.SequenceMatcher(None, key, alias_key(s)).ratio(), name)
+                for name, s in stripped.items()
+            ),
+            reverse=True,
+        )
+        if not scores or scores[0][0] < MIN_FUZZY_SCORE:
+            continue
+        if len(scores) > 1 and scores[1][0] == scores[0][0]:
+            continue  # ambiguous, left to the user's choice
+        add(term, scores[0][1], round(scores[0][0], 3))
+    return aliases
+
+
+def resolve_class(aliases, contract, min_score=MIN_FUZZY_SCORE):
+    """
+    Class name of a visit's contract from a policy's alias table.
+
+    Returns:
+        str or None: The class name, or None if no alias scores at least min_score.
+    """
+    entry = (aliases or {}).get(alias_key(contract))
+    if entry and entry[1] >= min_score:
+        return entry[0]
+    return None
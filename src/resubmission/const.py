@@ -8,3 +8,13 @@ JUSTIFICATION = "Justification"
 SERVICE = "Service"
 INDEX = "index.html"
 ERROR = "error.html"
+
+# Service details sent to the assistant when justifying a rejected service
+SERVICE_FIELDS = (
+    "Med_Dept",
+    "Specialty_Name",
+    "Service_Name",
+    "ResponseReason",
+    "Diagnose_Name",
+    "ICD10 Code",
+)
@@ -0,0 +1,100 @@
+import re
+
+# Payer name fragments (lowercase) -> policy kind, see utils.POLICY_MODELS
+PAYER_KINDS = (
+    ("bupa", "policy"),
+    ("ncci", "ncci"),
+)
+
+# Policy level NCCI fields repeated in the view of each class
+NCCI_POLICY_FIELDS = ("coverage", "exclusion", "comments", "additional_information")
+
+
+def payer_kind(payer):
+    """
+    Kind of policy ("policy" or "ncci") of a payer name from the visit, or None when
+    the payer is unknown and every kind should be tried.
+    """
+    if not isinstance(payer, str):
+        return None
+    payer = payer.lower()
+    for fragment, kind in PAYER_KINDS:
+        if fragment in payer:
+            return kind
+    return None
+
+
+def _field_name(text) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", str(text).lower()).strip("_")
+
+
+def _join(label, values):
+    values = [f"{name} {value}" for name, value in values if value not in (None, "")]
+    return f"{label}: " + ", ".join(values) if values else ""
+
+
+def flatten_ncci_class(policy, policy_class) -> dict:
+    """
+    Flat coverage view of an NCCI policy class, in the shape of a Bupa coverage detail:
+    one text field per benefit, "vip_level" holding the class code.
+
+    Args:
+        policy: NCCI_Policy document, for its policy level fields
+        policy_class: PolicyClass of the policy
+
+    Returns:
+        dict: Field name -> text, sorted by field name
+    """
+    view = {
+        "vip_level": policy_class.class_code,
+        "class_limit": policy_class.class_limit,
+        "room_type": policy_class.room_type,
+        "room_limit": policy_class.room_limit,
+    }
+    for field in NCCI_POLICY_FIELDS:
+        view[field] = getattr(policy, field, None)
+
+    for benefit in policy_class.benefits or []:
+        parts = [f"Limit: {benefit.limit}"] if benefit.limit else []
+        for case in benefit.cases or []:
+            parts.append(
+                _join(
+                    case.case_name,
+                    [
+                        ("patient share", case.patient_share),
+                        ("max patient share", case.max_patient_share),
+                        ("max consultation fee", case.max_consultation_fee),
+                        ("approval threshold", case.approval_threshold),
+                    ],
+                )
+            )
+        for sub in benefit.sub_coverages or []:
+            parts.append(
+                _join(
+                    sub.description,
+                    [("limit", sub.limit), ("approval threshold", sub.approval_threshold)],
+                )
+            )
+        key = _field_name(benefit.description) or _field_name(benefit.benefit_code)
+        if key in view:
+            key = f"{key}_{_field_name(benefit.benefit_code)}"
+        view[key] = " | ".join(part for part in parts if part)
+
+    return dict(sorted((k, v) for k, v in view.items() if v not in (None, "")))
+
+
+def flatten_policy_detail(coverage_detail) -> dict:
+    """Flat coverage view of a Bupa CoverageDetail, sorted by field name."""
+    return dict(sorted(coverage_detail.to_mongo().to_dict().items()))
+
+
+def class_views(kind, policy):
+    """
+    Flat coverage views of every class of a policy.
+
+    Returns:
+        list: (class name, view dict) pairs in document order
+    """
+    if kind == "ncci":
+        return [(c.class_code, flatten_ncci_class(policy, c)) for c in policy.classes]
+    return [(c.vip_level, flatten_policy_detail(c)) for c in policy.coverage_details]
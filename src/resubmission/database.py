@@ -0,0 +1,403 @@
+import json
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+PASSCODE_PATH = Path("passcode.json")
+
+# Pool settings applied to every engine, an entry in passcode.json can override
+# any of them through an optional "pool" object, e.g. {"pool": {"pool_size": 10}}.
+# pool_timeout is capped at the retry deadline, see get_engine
+DEFAULT_POOL_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 5,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+}
+
+# Errors worth retrying: dropped/refused connections and pool exhaustion.
+# Anything else (bad SQL, wrong parameters) fails immediately.
+RETRYABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError)
+
+# Visit ids sent to #VisitIds per executemany call, see read_data_for_ids
+VISIT_IDS_CHUNK_SIZE = 1000
+
+_db_configs = None
+_engines = {}
+_connect_counts = {}
+_breakers = {}
+_lock = threading.Lock()
+
+
+class DatabaseUnavailableError(Exception):
+    """Raised when a query could not be served by any configured database entry."""
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff bounded by a number of attempts and a total deadline.
+
+    Args:
+        attempts (int): Maximum number of attempts per database entry.
+        base_delay (float): Backoff ceiling in seconds before the first retry.
+        max_delay (float): Upper bound in seconds for a single backoff.
+        deadline (float): Total time budget in seconds across all attempts and entries.
+    """
+
+    def __init__(self, attempts=3, base_delay=0.5, max_delay=4.0, deadline=15.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt):
+        """Full jitter: a random delay between 0 and the exponential ceiling of this attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops sending queries to a database entry after repeated failures.
+
+    After failure_threshold consecutive failed calls the circuit opens and calls are
+    rejected right away. Once reset_timeout seconds pass, a single trial call is let
+    through, closing the circuit again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "half-open":
+                # Let one trial call through and keep the rest rejected until it reports back
+                self.opened_at = time.monotonic()
+                return True
+            return state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def get_db_configs():
+    """
+    Loads the "DB_NAMES" section of passcode.json on first use and keeps it in memory.
+
+    Returns:
+        dict: Mapping of database entry names (e.g. "Replica") to their credentials.
+    """
+    global _db_configs
+    if _db_configs is None:
+        with open(PASSCODE_PATH, "r") as file:
+            _db_configs = json.load(file)["DB_NAMES"]
+    return _db_configs
+
+
+def get_conn_engine(passcodes, **pool_options):
+    """
+    Creates and returns a SQLAlchemy engine for connecting to the SQL database.
+
+    Args:
+    - passcodes (dict): A dictionary containing database credentials.
+    - pool_options: Keyword arguments forwarded to create_engine to configure the connection pool.
+
+    Returns:
+    - engine (sqlalchemy.engine.Engine): A SQLAlchemy Engine instance for connecting to the database.
+    """
+    try:
+        server, db, uid, pwd, driver = (
+            passcodes["Server"],
+            passcodes["Database"],
+            passcodes["UID"],
+            passcodes["PWD"],
+            passcodes["driver"],
+        )
+        params = urllib.parse.quote_plus(
+            f"DRIVER={driver};"
+            f"SERVER={server};"
+            f"DATABASE={db};"
+            f"UID={uid};"
+            f"PWD={pwd};"
+            f"Connection Timeout={passcodes.get('connect_timeout', 15)};"
+        )
+        engine = create_engine(
+            "mssql+pyodbc:///?odbc_connect={}".format(params),
+            fast_executemany=True,
+            **pool_options,
+        )
+        return engine
+    except KeyError as e:
+        logger.error(f"Missing key in passcodes dictionary: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Error creating database connection engine: {e}")
+        raise
+
+
+def get_engine(db_name="Replica"):
+    """
+    Returns the process-wide engine for a passcode.json entry, creating it on first use.
+    Every query against the same entry shares one connection pool instead of paying
+    the ODBC handshake on each call. Waiting for a pooled connection never takes
+    longer than the deadline of DEFAULT_RETRY_POLICY.
+
+    Args:
+        db_name (str): Name of the entry under "DB_NAMES" in passcode.json.
+
+    Returns:
+        sqlalchemy.engine.Engine: The shared engine for that entry.
+    """
+    engine = _engines.get(db_name)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(db_name)
+        if engine is None:
+            passcodes = get_db_configs()[db_name]
+            pool_options = {**DEFAULT_POOL_OPTIONS, **passcodes.get("pool", {})}
+            pool_options["pool_timeout"] = min(
+                pool_options["pool_timeout"], DEFAULT_RETRY_POLICY.deadline
+            )
+            engine = get_conn_engine(passcodes, **pool_options)
+            _connect_counts[db_name] = 0
+
+            @event.listens_for(engine, "connect")
+            def _count_connect(dbapi_connection, connection_record):
+                _connect_counts[db_name] += 1
+
+            _engines[db_name] = engine
+    return engine
+
+
+def pool_stats():
+    """
+    Reports the state of every engine created so far.
+
+    Returns:
+        dict: Per database entry, the pool size, checked in/out connections, current
+        overflow and the number of physical connections opened since startup.
+    """
+    stats = {}
+    for db_name, engine in list(_engines.items()):
+        pool = engine.pool
+        stats[db_name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "connections_opened": _connect_counts.get(db_name, 0),
+        }
+    return stats
+
+
+def dispose_engines():
+    """Closes every pooled connection, e.g. after a worker fork or a credentials change."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _connect_counts.clear()
+
+
+def get_breaker(db_name):
+    """Returns the circuit breaker guarding a database entry, creating it on first use."""
+    with _lock:
+        return _breakers.setdefault(db_name, CircuitBreaker())
+
+
+def failover_chain(db_name):
+    """
+    Lists db_name followed by the entries it fails over to. An entry names its
+    secondary through an optional "failover" key in passcode.json.
+    """
+    configs = get_db_configs()
+    chain = [db_name]
+    while True:
+        secondary = configs.get(chain[-1], {}).get("failover")
+        if not secondary or secondary in chain or secondary not in configs:
+            return chain
+        chain.append(secondary)
+
+
+def _run_with_failover(db_name, run, retry_policy=None):
+    """
+    Calls run(engine) with the shared engine of db_name. Connection failures are
+    retried with jittered exponential backoff, then the call fails over to the
+    secondary entries of db_name. Entries whose circuit is open are skipped.
+
+    Raises:
+        DatabaseUnavailableError: If no entry answered within the retry policy's deadline.
+    """
+    policy = retry_policy or DEFAULT_RETRY_POLICY
+    deadline = time.monotonic() + policy.deadline
+    last_error = None
+
+    for name in failover_chain(db_name):
+        breaker = get_breaker(name)
+        if not breaker.allow():
+            logger.warning(f"Circuit open for {name}, skipping.")
+            continue
+
+        for attempt in range(policy.attempts):
+            try:
+                result = run(get_engine(name))
+                breaker.record_success()
+                return result
+            except RETRYABLE_ERRORS as e:
+                logger.warning(f"Query on {name} failed (attempt {attempt + 1}): {e}")
+                last_error = e
+
+            delay = policy.backoff(attempt)
+            if time.monotonic() + delay >= deadline:
+                break
+            if attempt + 1 < policy.attempts:
+                time.sleep(delay)
+        # One failure per call whatever its attempts, a single transient error
+        # retried a few times must not open the circuit on its own
+        breaker.record_failure()
+
+        if time.monotonic() >= deadline:
+            break
+
+    raise DatabaseUnavailableError(
+        f"Database {db_name} is unavailable, please try again later."
+    ) from last_error
+
+
+def read_data(query, db_name, params, retry_policy=None):
+    """
+    Executes a SQL query using the shared engine of db_name, with the retries and
+    failover of _run_with_failover.
+
+    Args:
+        query (str): SQL query to run.
+        db_name (str): Name of the passcode.json entry to query first.
+        params: Query parameters forwarded to pandas.read_sql_query.
+        retry_policy (RetryPolicy, optional): Defaults to DEFAULT_RETRY_POLICY.
+
+    Returns:
+        pandas DataFrame with query results
+
+    Raises:
+        DatabaseUnavailableError: If no entry answered within the retry policy's deadline.
+    """
+    return _run_with_failover(
+        db_name,
+        lambda engine: pd.read_sql_query(query, engine, params=params),
+        retry_policy,
+    )
+
+
+def _read_with_visit_ids(query, db_name, fill, retry_policy=None):
+    """
+    Creates the #VisitIds temp table, calls fill(conn) to load it, then runs query on
+    the same connection with the retries and failover of _run_with_failover. The table
+    is dropped whether the query succeeds or not.
+    """
+
+    def run(engine):
+        with engine.connect() as conn:
+            # Temp tables outlive a pooled checkout, clear one left by a lost call
+            conn.exec_driver_sql(
+                "IF OBJECT_ID('tempdb..#VisitIds') IS NOT NULL DROP TABLE #VisitIds"
+            )
+            conn.exec_driver_sql("CREATE TABLE #VisitIds (VisitID BIGINT PRIMARY KEY)")
+            try:
+                fill(conn)
+                return pd.read_sql_query(query, conn)
+            finally:
+                try:
+                    conn.exec_driver_sql("DROP TABLE #VisitIds")
+                except RETRYABLE_ERRORS as e:
+                    # The connection is gone and its temp table with it, keep the
+                    # error of the query itself
+                    logger.warning(f"Could not drop #VisitIds: {e}")
+
+    return _run_with_failover(db_name, run, retry_policy)
+
+
+def read_data_for_ids(query, db_name, ids, retry_policy=None):
+    """
+    Executes a SQL query that joins the #VisitIds temp table, after loading ids into it
+    on the same connection, VISIT_IDS_CHUNK_SIZE ids per insert. Lets one query serve
+    many visits instead of one query per visit.
+
+    Args:
+        query (str): SQL query referencing #VisitIds (VisitID BIGINT).
+        db_name (str): Name of the passcode.json entry to query first.
+        ids: Iterable of visit ids.
+        retry_policy (RetryPolicy, optional): Defaults to DEFAULT_RETRY_POLICY.
+
+    Returns:
+        pandas DataFrame with query results
+    """
+    rows = [(i,) for i in dict.fromkeys(int(i) for i in ids)]
+
+    def fill(conn):
+        for start in range(0, len(rows), VISIT_IDS_CHUNK_SIZE):
+            conn.exec_driver_sql(
+                "INSERT INTO #VisitIds (VisitID) VALUES (?)",
+                rows[start : start + VISIT_IDS_CHUNK_SIZE],
+            )
+
+    return _read_with_visit_ids(query, db_name, fill, retry_policy)
+
+
+def read_data_for_id_query(query, db_name, id_query, id_params, retry_policy=None):
+    """
+    Same as read_data_for_ids, with #VisitIds filled server side by id_query, e.g. the
+    visits of a date window, so the ids never travel to the client.
+
+    Args:
+        query (str): SQL query referencing #VisitIds (VisitID BIGINT).
+        db_name (str): Name of the passcode.json entry to query first.
+        id_query (str): SELECT returning one column of visit ids.
+        id_params: Parameters of id_query.
+        retry_policy (RetryPolicy, optional): Defaults to DEFAULT_RETRY_POLICY.
+
+    Returns:
+        pandas DataFrame with query results
+    """
+
+    def fill(conn):
+        conn.exec_driver_sql(
+            "INSERT INTO #VisitIds (VisitID) " + id_query, tuple(id_params)
+        )
+
+    return _read_with_visit_ids(query, db_name, fill, retry_policy)
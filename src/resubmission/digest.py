@@ -0,0 +1,59 @@
+import json
+
+# Header fields of the policy rendered ahead of the coverage fields, in this order.
+# Policy and NCCI_Policy name them differently, the missing ones are skipped
+HEADER_FIELDS = (
+    "policy_number",
+    "company_name",
+    "provider_name",
+    "policy_holder",
+    "policy_holder_name",
+    "policy_type",
+    "effective_from",
+    "effective_to",
+    "start_date",
+    "end_date",
+)
+
+
+def _render_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(
+            value,
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+    return " ".join(str(value).split())
+
+
+def render_coverage_digest(detail: dict, policy=None) -> str:
+    """
+    Canonical text rendering of a coverage detail for the system prompt.
+
+    The same policy class always renders to the same text: header first, then one
+    "field: value" line per non-empty field in name order, with whitespace collapsed.
+    Unlike str(detail) it skips empty fields and Python repr quoting, so it is shorter
+    and stays byte-identical across requests, which lets the provider reuse its prompt
+    prefix cache.
+
+    Args:
+        detail (dict): Coverage detail of one class, as returned by get_policy_details.
+        policy (optional): Policy document the detail belongs to, for the header lines.
+
+    Returns:
+        str: The digest text.
+    """
+    lines = ["Policy coverage details"]
+    if policy is not None:
+        for field in HEADER_FIELDS:
+            value = getattr(policy, field, None)
+            if value not in (None, ""):
+                lines.append(f"{field}: {_render_value(value)}")
+    for field in sorted(detail):
+        value = detail[field]
+        if field.startswith("_") or value in (None, "", [], {}):
+            continue
+        lines.append(f"{field}: {_render_value(value)}")
+    return "\n".join(lines)
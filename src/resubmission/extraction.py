@@ -1,34 +1,223 @@
 import asyncio
+import inspect
 import json
+import random
+import threading
+import time
+from pathlib import Path
 from typing import Optional
 
 from dotenv import load_dotenv
-from llama_cloud import ExtractConfig
-from llama_cloud_services import LlamaExtract
 
+from src.resubmission.ingestion import (
+    MANIFEST_NAME,
+    IngestionManifest,
+    file_digest,
+    ingest_data,
+)
 from src.resubmission.utils import list_files
 
 _ = load_dotenv()
 
+# Job statuses after which a job is not polled anymore
+SUCCESS_STATUSES = {"SUCCESS", "PARTIAL_SUCCESS"}
+FAILED_STATUSES = {"ERROR", "CANCELLED"}
+
+# Seconds the remote agent list is reused before being listed again
+AGENT_LIST_TTL = 600
+
+_client = None
+_agent_lists = {}  # id(client) -> (listed at, {name: agent metadata})
+_agent_lists_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the shared LlamaExtract client, created on first use."""
+    global _client
+    if _client is None:
+        from llama_cloud_services import LlamaExtract
+
+        _client = LlamaExtract()
+    return _client
+
+
+def list_agent_names(client, refresh=False):
+    """
+    Names of the remote extraction agents, listed once per AGENT_LIST_TTL seconds
+    instead of on every ExtractAgent construction.
+    """
+    with _agent_lists_lock:
+        listed = _agent_lists.get(id(client))
+        if refresh or listed is None or time.monotonic() - listed[0] > AGENT_LIST_TTL:
+            names = {agent.name for agent in client.list_agents()}
+            listed = (time.monotonic(), names)
+            _agent_lists[id(client)] = listed
+        return listed[1]
+
+
+def _status(job):
+    status = job.status
+    return str(getattr(status, "value", status))
+
+
+class ExtractionTracker:
+    """
+    Runs extraction jobs for many files at once. Every file is queued right away and
+    all running jobs are polled concurrently, at most max_in_flight uploads and status
+    checks are sent at any time. Each job starts polling every poll_interval seconds
+    and backs off by backoff up to max_poll_interval while it keeps running, so a slow
+    job never delays queuing the other files or noticing the finished ones.
+
+    Args:
+        agent: Extraction agent, anything with the queue_extraction,
+            get_extraction_job and get_extraction_run_for_job methods of LlamaExtract's.
+        max_in_flight (int): Maximum number of concurrent calls to the agent.
+        poll_interval (float): Seconds before the first status check of a job.
+        max_poll_interval (float): Upper bound of the seconds between two checks.
+        backoff (float): Factor applied to the interval after each running check.
+        timeout (float): Seconds after which a job still running is reported failed.
+    """
+
+    def __init__(
+        self,
+        agent,
+        max_in_flight=4,
+        poll_interval=2.0,
+        max_poll_interval=30.0,
+        backoff=1.5,
+        timeout=1800.0,
+    ):
+        self.agent = agent
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.timeout = timeout
+
+    async def _wait(self, limiter, job):
+        """Polls a job until it ends, returns its extraction run."""
+        interval = self.poll_interval
+        deadline = time.monotonic() + self.timeout
+        while True:
+            # The client is synchronous, keep it off the event loop
+            async with limiter:
+                job = await asyncio.to_thread(self.agent.get_extraction_job, job.id)
+            status = _status(job)
+            if status in SUCCESS_STATUSES:
+                async with limiter:
+                    return await asyncio.to_thread(
+                        self.agent.get_extraction_run_for_job, job.id
+                    )
+            if status in FAILED_STATUSES:
+                raise RuntimeError(f"Job {job.id} ended with status {status}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job.id} still {status} after {self.timeout}s")
+            # Jitter keeps jobs queued together from being polled together
+            await asyncio.sleep(interval * random.uniform(0.8, 1.2))
+            interval = min(interval * self.backoff, self.max_poll_interval)
+
+    async def _extract(self, limiter, file_path, on_result):
+        async with limiter:
+            job = await self.agent.queue_extraction(file_path)
+        if isinstance(job, list):
+            job = job[0]
+        print(f"Queued {Path(file_path).name} as job {job.id}")
+        run = await self._wait(limiter, job)
+        print(f"Extracted {Path(file_path).name}")
+        if on_result is not None:
+            result = on_result(file_path, run)
+            if inspect.isawaitable(result):
+                await result
+        return run
+
+    async def run(self, files, on_result=None):
+        """
+        Extracts every file, calling on_result(file_path, run) as soon as each one is
+        done, in completion order. on_result may be a coroutine function.
+
+        Returns:
+            dict: file path -> extraction run, or the exception the file failed with.
+        """
+        limiter = asyncio.Semaphore(self.max_in_flight)
+        files = [str(f) for f in files]
+        results = await asyncio.gather(
+            *(self._extract(limiter, f, on_result) for f in files),
+            return_exceptions=True,
+        )
+        for file_path, result in zip(files, results):
+            if isinstance(result, Exception):
+                print(f"Extraction of {Path(file_path).name} failed: {result}")
+        return dict(zip(files, results))
+
+
+class IngestingSink:
+    """
+    on_result callback of ExtractionTracker: saves each extracted policy as JSON in
+    output_folder, upserts it into MongoDB and records it in the folder's ingestion
+    manifest, so a later ingest_changed of the folder does not load it again.
+
+    Args:
+        output_folder: Folder of the extracted JSON files.
+        kind (str, optional): "policy" or "ncci", detected per result by default.
+    """
+
+    def __init__(self, output_folder, kind=None):
+        self.folder = Path(output_folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.kind = kind
+        self.policies = {}  # source file -> policy number
+        self.errors = {}  # source file -> error message
+        self._manifest_lock = threading.Lock()
+
+    def _ingest(self, file_path, run):
+        path = self.folder / f"llama-extract-{run.id}-{Path(file_path).stem}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(run.data, f, ensure_ascii=False, indent=2)
+        policy_number, _ = ingest_data(run.data, self.kind)
+        with self._manifest_lock:
+            manifest = IngestionManifest(self.folder / MANIFEST_NAME)
+            manifest.record(path, file_digest(path), policy_number)
+            manifest.save()
+        return policy_number
+
+    async def __call__(self, file_path, run):
+        try:
+            policy_number = await asyncio.to_thread(self._ingest, file_path, run)
+        except Exception as e:
+            self.errors[file_path] = f"{type(e).__name__}: {e}"
+            print(f"Ingestion of {Path(file_path).name} failed: {e}")
+            return
+        self.policies[file_path] = policy_number
+        print(f"Policy {policy_number} of {Path(file_path).name} ingested.")
+
 
 class ExtractAgent:
     def __init__(
-        self, name: str, schema: Optional[str] = None, prompt: Optional[str] = None
+        self,
+        name: str,
+        schema: Optional[str] = None,
+        prompt: Optional[str] = None,
+        client=None,
     ):
         """
         Generic base class.
 
         Args:
             name (str): Identifier for the service/object.
-            config (dict, optional): Configuration parameters. Defaults to empty dict.
+            schema (str, optional): JSON schema file, used to create the agent if it
+                does not exist yet.
+            prompt (str, optional): System prompt of a created agent.
+            client (optional): LlamaExtract client, the shared one by default.
         """
-        extractor = LlamaExtract()
-        agents = [agent.name for agent in extractor.list_agents()]
+        extractor = client or get_client()
+        agents = list_agent_names(extractor)
 
         if name in agents:
             print("Loading existing agent.")
             self.agent = extractor.get_agent(name=name)
         elif name not in agents and schema is not None:
+            from llama_cloud import ExtractConfig
+
             with open(schema, "r") as file:
                 schema = json.load(file)
             config = ExtractConfig(
@@ -38,27 +227,27 @@ class ExtractAgent:
             self.agent = extractor.create_agent(
                 name=name, data_schema=schema, config=config
             )
+            list_agent_names(extractor, refresh=True)
         elif name not in agents and schema is None:
             print("No schema found, try again.")
 
     def extract_file(self, file_path):
         return self.agent.extract(file_path)
 
-    async def extract_batch(self, data_directory):
+    async def extract_batch(self, data_directory, on_result=None, max_in_flight=4):
+        """
+        Extracts every file of a directory concurrently, see ExtractionTracker.run.
+        Pass an IngestingSink as on_result to load the policies as they are extracted.
+
+        Returns:
+            list: Extraction runs in file order, None for the files that failed.
+        """
         files = list_files(data_directory)
-        jobs = await self.agent.queue_extraction(files)
-
-        # Check job status
-        for job in jobs:
-            while True:
-                status = self.agent.get_extraction_job(job.id).status
-                print(f"Job {job.id}: {status}")
-                if status == "SUCCESS":
-                    break
-                await asyncio.sleep(10)
-
-        # Get results when complete (status = success)
-        return [self.agent.get_extraction_run_for_job(job.id) for job in jobs]
+        tracker = ExtractionTracker(self.agent, max_in_flight=max_in_flight)
+        results = await tracker.run(files, on_result)
+        return [
+            None if isinstance(results[f], Exception) else results[f] for f in files
+        ]
 
     def update_schema(self, new_schema):
         self.agent.data_schema = new_schema
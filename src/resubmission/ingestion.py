@@ -0,0 +1,423 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.resubmission.class_aliases import build_class_aliases
+from src.resubmission.models import NCCI_Policy, Policy
+from src.resubmission.policy_index import get_policy_index
+from src.resubmission.utils import (
+    build_ncci_policy,
+    build_policy,
+    invalidate_policy_cache,
+)
+
+MODELS = {"policy": Policy, "ncci": NCCI_Policy}
+BUILDERS = {"policy": build_policy, "ncci": build_ncci_policy}
+# Embedded list and class name field of each kind, see backfill_class_aliases
+CLASS_FIELDS = {
+    "policy": ("coverage_details", "vip_level"),
+    "ncci": ("classes", "class_code"),
+}
+
+# Manifest file written in the ingested folder by ingest_changed
+MANIFEST_NAME = ".ingestion_manifest.json"
+
+
+def detect_kind(data: dict) -> str:
+    """Tells a Bupa policy JSON ("policy") from an NCCI one ("ncci") by its layout."""
+    if "classes" in data:
+        return "ncci"
+    if "coverage_details" in data:
+        return "policy"
+    raise ValueError("Neither 'coverage_details' nor 'classes' found")
+
+
+def parse_policy_file(path, kind=None):
+    """
+    Reads, builds and validates the policy document of one extracted JSON file.
+    Runs in the worker processes of ingest_files, so it returns plain data.
+
+    Args:
+        path: JSON file path
+        kind (str, optional): "policy" or "ncci", detected from the content by default
+
+    Returns:
+        tuple: (kind, policy_number, document as a dict ready for MongoDB)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return parse_policy_data(data, kind)
+
+
+def parse_policy_data(data: dict, kind=None):
+    """
+    Builds and validates the policy document of an extracted JSON already in memory.
+
+    Returns:
+        tuple: (kind, policy_number, document as a dict ready for MongoDB)
+    """
+    kind = kind or detect_kind(data)
+    if not data.get("policy_number"):
+        raise ValueError("Missing required field: 'policy_number'")
+
+    document = BUILDERS[kind](data)
+    document.validate()
+    son = document.to_mongo().to_dict()
+    son.pop("_id", None)  # keep the _id of the document being replaced
+    return kind, document.policy_number, son
+
+
+def ingest_data(data: dict, kind=None):
+    """
+    Upserts one extracted policy, e.g. straight from an extraction job.
+
+    Returns:
+        tuple: (policy_number, {"inserted", "updated", "unchanged"} counts)
+
+    Raises:
+        ValueError: If the policy is invalid or could not be written
+    """
+    kind, number, son = parse_policy_data(data, kind)
+    counts, errors = upsert_policies(kind, {number: son})
+    if errors:
+        raise ValueError(f"Policy {number} not written: {errors[number]}")
+    return number, counts
+
+
+def _parse(path, kind):
+    """Worker wrapper of parse_policy_file returning the error instead of raising it."""
+    try:
+        return parse_policy_file(path, kind), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def upsert_policies(kind, documents, batch_size=500):
+    """
+    Writes policy documents with one unordered bulk_write per batch, replacing the
+    stored policy with the same policy_number or inserting it.
+
+    Args:
+        kind (str): "policy" or "ncci"
+        documents (dict): policy_number -> document dict, see parse_policy_file
+        batch_size (int): Maximum number of operations per bulk_write
+
+    Returns:
+        tuple: ({"inserted", "updated", "unchanged"} counts,
+        {policy_number: error message} of the documents that were not written)
+    """
+    model = MODELS[kind]
+    collection = model._get_collection()
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    errors = {}
+    numbers = list(documents)
+    for start in range(0, len(numbers), batch_size):
+        batch = numbers[start : start + batch_size]
+        operations = [
+            ReplaceOne({"policy_number": number}, documents[number], upsert=True)
+            for number in batch
+        ]
+        try:
+            details = collection.bulk_write(operations, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: the other operations of the batch were still applied
+            details = e.details
+            for error in details.get("writeErrors", []):
+                errors[batch[error["index"]]] = error.get("errmsg")
+        counts["inserted"] += details.get("nUpserted", 0)
+        counts["updated"] += details.get("nModified", 0)
+        counts["unchanged"] += details.get("nMatched", 0) - details.get("nModified", 0)
+
+    index = get_policy_index(model)
+    for number in numbers:
+        if number not in errors:
+            index.add(number, documents[number].get("class_aliases"))
+            invalidate_policy_cache(number)
+    return counts, errors
+
+
+def delete_policies(kind, numbers):
+    """
+    Deletes policies by policy_number and drops them from the index and the caches.
+
+    Returns:
+        int: Number of documents deleted
+    """
+    numbers = list(numbers)
+    if not numbers:
+        return 0
+    model = MODELS[kind]
+    result = model._get_collection().delete_many({"policy_number": {"$in": numbers}})
+    index = get_policy_index(model)
+    for number in numbers:
+        index.discard(number)
+        invalidate_policy_cache(number)
+    return result.deleted_count
+
+
+def backfill_class_aliases(kind, batch_size=500):
+    """
+    Computes the class alias table of the policies stored before class_aliases
+    existed, reading only their class names.
+
+    Args:
+        kind (str): "policy" or "ncci"
+        batch_size (int): Maximum number of operations per bulk_write
+
+    Returns:
+        int: Number of policies updated
+    """
+    model = MODELS[kind]
+    collection = model._get_collection()
+    list_field, name_field = CLASS_FIELDS[kind]
+    missing = collection.find(
+        {"$or": [{"class_aliases": {"$exists": False}}, {"class_aliases": {}}]},
+        {"policy_number": 1, f"{list_field}.{name_field}": 1},
+    )
+    index = get_policy_index(model)
+    operations, updated = [], 0
+    for row in missing:
+        aliases = build_class_aliases(
+            c.get(name_field) for c in row.get(list_field) or []
+        )
+        operations.append(
+            UpdateOne({"_id": row["_id"]}, {"$set": {"class_aliases": aliases}})
+        )
+        index.set_class_aliases(row.get("policy_number"), aliases)
+        if len(operations) == batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+
+def ingest_files(paths, kind=None, workers=None, batch_size=500):
+    """
+    Loads policy JSON files into MongoDB: the files are parsed and validated in
+    parallel processes, then upserted by policy_number with batched bulk writes.
+    A file that fails is reported and does not stop the others.
+
+    Args:
+        paths: JSON file paths
+        kind (str, optional): "policy" or "ncci", detected per file by default
+        workers (int, optional): Parsing processes, defaults to the number of CPUs
+        batch_size (int): Maximum number of operations per bulk_write
+
+    Returns:
+        dict: {"files": number of files, "policies": {file: policy_number},
+        "kinds": {file: kind}, "inserted", "updated", "unchanged" counts and
+        "errors": {file: message}}
+    """
+    paths = [str(p) for p in paths]
+    report = {
+        "files": len(paths),
+        "policies": {},
+        "kinds": {},
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "errors": {},
+    }
+    if not paths:
+        return report
+
+    documents = {"policy": {}, "ncci": {}}
+    sources = {}  # (kind, policy_number) -> file, to report duplicates
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        for path, (parsed, error) in zip(
+            paths, pool.map(_parse, paths, [kind] * len(paths), chunksize=8)
+        ):
+            if error:
+                report["errors"][path] = error
+                continue
+            file_kind, number, son = parsed
+            previous = sources.get((file_kind, number))
+            if previous:
+                print(f"Policy {number} of {path} also in {previous}, the last wins.")
+            sources[(file_kind, number)] = path
+            documents[file_kind][number] = son
+            report["policies"][path] = number
+            report["kinds"][path] = file_kind
+
+    for file_kind, docs in documents.items():
+        if not docs:
+            continue
+        files = {n: path for (k, n), path in sources.items() if k == file_kind}
+        try:
+            counts, errors = upsert_policies(file_kind, docs, batch_size)
+        except Exception as e:
+            errors = {number: f"{type(e).__name__}: {e}" for number in docs}
+            counts = {}
+        for number, error in errors.items():
+            report["errors"][files[number]] = error
+            report["policies"].pop(files[number], None)
+            report["kinds"].pop(files[number], None)
+        for key, count in counts.items():
+            report[key] += count
+    return report
+
+
+def file_digest(path) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """
+    Record of the ingested files: content hash, mtime, size and policy number of each,
+    so that a re-run only loads the files that are new or whose content changed.
+
+    Args:
+        path: JSON file holding the manifest, created on the first save.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}  # file name -> {"sha256", "mtime", "size", "policy_number"}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def classify(self, paths):
+        """
+        Compares files with the manifest. The content is hashed only when the mtime or
+        the size differs from the recorded ones.
+
+        Returns:
+            tuple: ({path: sha256} of new files, {path: sha256} of modified files,
+            list of unchanged paths, list of recorded names whose file is gone)
+        """
+        new, modified, unchanged = {}, {}, []
+        for path in paths:
+            path = Path(path)
+            stat = path.stat()
+            entry = self.entries.get(path.name)
+            recorded = entry and (entry["mtime"], entry["size"])
+            if recorded == (stat.st_mtime, stat.st_size):
+                unchanged.append(str(path))
+                continue
+            digest = file_digest(path)
+            if entry is None:
+                new[str(path)] = digest
+            elif entry["sha256"] != digest:
+                modified[str(path)] = digest
+            else:
+                # Touched but identical, only refresh the recorded mtime
+                self.record(path, digest, entry.get("policy_number"))
+                unchanged.append(str(path))
+        names = {Path(p).name for p in paths}
+        removed = [name for name in self.entries if name not in names]
+        return new, modified, unchanged, removed
+
+    def record(self, path, digest, policy_number):
+        path = Path(path)
+        stat = path.stat()
+        self.entries[path.name] = {
+            "sha256": digest,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "policy_number": policy_number,
+        }
+
+    def forget(self, name):
+        self.entries.pop(name, None)
+
+    def save(self):
+        """Writes the manifest atomically, a crash never leaves it half written."""
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def policy_files(folder):
+    """The *.json files of a folder, without hidden ones such as the manifest."""
+    return sorted(p for p in Path(folder).glob("*.json") if not p.name.startswith("."))
+
+
+def ingest_folder(folder_path, kind=None, workers=None, batch_size=500):
+    """
+    Loads every *.json file of a folder, see ingest_files.
+
+    Raises:
+        ValueError: If the folder does not exist
+    """
+    folder = Path(folder_path)
+    if not folder.is_dir():
+        raise ValueError(f"Folder not found: {folder_path}")
+    return ingest_files(policy_files(folder), kind, workers, batch_size)
+
+
+def ingest_changed(
+    folder_path, kind=None, manifest_path=None, workers=None, batch_size=500
+):
+    """
+    Incremental ingest_folder: only the files that are new or whose content changed
+    since the last run are parsed and upserted, the others are left untouched.
+
+    Args:
+        folder_path: Folder of policy JSON files
+        kind (str, optional): "policy" or "ncci", detected per file by default
+        manifest_path (optional): Manifest file, defaults to .ingestion_manifest.json
+            in the folder
+        workers (int, optional): Parsing processes, defaults to the number of CPUs
+        batch_size (int): Maximum number of operations per bulk_write
+
+    Returns:
+        dict: The ingest_files report of the loaded files, plus the "new_files",
+        "modified_files" and "unchanged_files" paths, the "removed_files" names and
+        the "replaced_policies" {file: previous policy_number}. A modified file whose
+        policy_number changed replaces its previous policy, which is deleted unless
+        another file still holds it. The policies of removed files are kept in MongoDB.
+
+    Raises:
+        ValueError: If the folder does not exist
+    """
+    folder = Path(folder_path)
+    if not folder.is_dir():
+        raise ValueError(f"Folder not found: {folder_path}")
+    manifest = IngestionManifest(manifest_path or folder / MANIFEST_NAME)
+    new, modified, unchanged, removed = manifest.classify(policy_files(folder))
+
+    changed = {**new, **modified}
+    report = ingest_files(list(changed), kind, workers, batch_size)
+    replaced = {}
+    for path, policy_number in report["policies"].items():
+        entry = manifest.entries.get(Path(path).name)
+        previous = entry and entry.get("policy_number")
+        if previous and previous != policy_number:
+            replaced[path] = previous
+        manifest.record(path, changed[path], policy_number)
+    for name in removed:
+        manifest.forget(name)
+
+    held = {entry.get("policy_number") for entry in manifest.entries.values()}
+    replaced = {path: n for path, n in replaced.items() if n not in held}
+    stale = {}  # kind -> previous policy numbers no file holds anymore
+    for path, number in replaced.items():
+        stale.setdefault(report["kinds"][path], set()).add(number)
+    for file_kind, numbers in stale.items():
+        delete_policies(file_kind, numbers)
+    manifest.save()
+
+    report.update(
+        {
+            "new_files": sorted(new),
+            "modified_files": sorted(modified),
+            "unchanged_files": sorted(unchanged),
+            "removed_files": removed,
+            "replaced_policies": replaced,
+        }
+    )
+    return report
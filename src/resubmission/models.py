@@ -1,24 +1,120 @@
+import re
+import threading
+
 from mongoengine import (
     DateField,
+    DictField,
     Document,
     EmbeddedDocument,
     EmbeddedDocumentListField,
+    QuerySet,
     StringField,
     connect,
 )
+from mongoengine.connection import ConnectionFailure, get_connection
 
 from src.resubmission.config_handler import config
 
-# 1. Connect to MongoDB
-params = config(section="mongodb")
-connect(
-    db=params["db"],
-    host=params.get("host"),
-    port=int(params.get("port")),
-    username=params.get("username"),
-    password=params.get("password"),
-    authentication_source=params.get("authentication_source"),
-)
+_connect_lock = threading.Lock()
+_connected = False
+
+
+def connect_mongo():
+    """
+    Connects to MongoDB with the mongodb section of database.ini, once per process.
+    Called by the documents on their first query, so importing the models costs nothing.
+    """
+    global _connected
+    if _connected:
+        return
+    with _connect_lock:
+        if _connected:
+            return
+        try:
+            get_connection()  # already connected by the caller, e.g. a script
+        except ConnectionFailure:
+            params = config(section="mongodb")
+            connect(
+                db=params["db"],
+                host=params.get("host"),
+                port=int(params.get("port")),
+                username=params.get("username"),
+                password=params.get("password"),
+                authentication_source=params.get("authentication_source"),
+            )
+        _connected = True
+
+
+class LazyConnectDocument(Document):
+    """Document connecting to MongoDB on first use instead of at import time."""
+
+    meta = {"abstract": True}
+
+    @classmethod
+    def _get_db(cls):
+        connect_mongo()
+        return super()._get_db()
+
+
+def level_pattern(level: str) -> dict:
+    """
+    Builds a case-insensitive regex matching a class/VIP level regardless of the spaces
+    and dashes around or inside it, mirroring utils.normalize_text on the database side.
+    """
+    separators = r"[\s\-–]*"
+    chars = [re.escape(c) for c in level if c not in " -–"]
+    return {
+        "$regex": "^" + separators + separators.join(chars) + separators + "$",
+        "$options": "i",
+    }
+
+
+class PolicyQuerySet(QuerySet):
+    HEADER_FIELDS = (
+        "policy_number",
+        "company_name",
+        "policy_holder",
+        "effective_from",
+        "effective_to",
+    )
+
+    def with_coverage_level(self, vip_level: str):
+        """
+        Returns the first policy with only its header fields and the single coverage
+        detail matching vip_level, using an $elemMatch projection.
+        """
+        return (
+            self.only(*self.HEADER_FIELDS)
+            .fields(elemMatch__coverage_details={"vip_level": level_pattern(vip_level)})
+            .first()
+        )
+
+
+class NCCIPolicyQuerySet(QuerySet):
+    HEADER_FIELDS = (
+        "provider_name",
+        "policy_number",
+        "policy_status",
+        "policy_holder_name",
+        "policy_type",
+        "start_date",
+        "end_date",
+        "coverage",
+        "exclusion",
+        "comments",
+        "additional_information",
+    )
+
+    def with_class(self, class_code: str):
+        """
+        Returns the first policy with only its header fields and the single class
+        matching class_code, using an $elemMatch projection.
+        """
+        return (
+            self.only(*self.HEADER_FIELDS)
+            .fields(elemMatch__classes={"class_code": level_pattern(class_code)})
+            .first()
+        )
 
 
 # 2. Define EmbeddedDocument for coverage details
@@ -73,13 +169,25 @@ class CoverageDetail(EmbeddedDocument):
 
 
 # 3. Define Main Document
-class Policy(Document):
+class Policy(LazyConnectDocument):
     policy_number = StringField(required=True)
     company_name = StringField()
     policy_holder = StringField()
     effective_from = DateField()
     effective_to = DateField()
     coverage_details = EmbeddedDocumentListField(CoverageDetail)
+    # Contract alias -> [vip_level, score], see class_aliases.build_class_aliases
+    class_aliases = DictField()
+
+    meta = {
+        "queryset_class": PolicyQuerySet,
+        "indexes": [
+            "policy_number",
+            ("effective_from", "effective_to"),
+            "effective_to",
+            "coverage_details.vip_level",
+        ],
+    }
 
 
 ###########################################
@@ -121,7 +229,7 @@ class Endorsement(EmbeddedDocument):
     type = StringField(required=True)
     message = StringField(required=True)
 
-class NCCI_Policy(Document):
+class NCCI_Policy(LazyConnectDocument):
     provider_name = StringField(required=True)
     policy_number = StringField(required=True, unique=True)
     policy_status = StringField(required=True)
@@ -141,3 +249,15 @@ class NCCI_Policy(Document):
 
     endorsements = EmbeddedDocumentListField(Endorsement, null=True)
     additional_information = StringField(null=True)
+
+    # Contract alias -> [class_code, score], see class_aliases.build_class_aliases
+    class_aliases = DictField()
+
+    meta = {
+        "queryset_class": NCCIPolicyQuerySet,
+        "indexes": [
+            ("start_date", "end_date"),
+            "end_date",
+            "classes.class_code",
+        ],
+    }
@@ -0,0 +1,298 @@
+import csv
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from src.resubmission.chatbot import get_batch_justifications
+from src.resubmission.utils import (
+    get_policy_details,
+    get_policy_digest,
+    get_rejected_services,
+    get_visit_info,
+    get_visits_data,
+    get_visits_data_by_date,
+)
+
+OUTPUT_COLUMNS = [
+    "VisitID",
+    "Start_Date",
+    "ContractorClientPolicyNumber",
+    "Contract",
+    "Service_Name",
+    "ResponseReasonCode",
+    "ResponseReason",
+    "Price",
+    "Status",
+    "Justification",
+]
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the worker threads, allows rate calls per second on average
+    with bursts of up to burst calls.
+
+    Raises:
+        ValueError: If rate is not positive or burst is below 1
+    """
+
+    def __init__(self, rate=1.0, burst=1):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Blocks until tokens calls are allowed, tokens must not exceed burst."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """
+    Append-only file of the visit IDs already written to the output, one per line,
+    so that an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        if self.path.exists():
+            self.done = {
+                line.strip() for line in self.path.read_text().splitlines() if line.strip()
+            }
+
+    def mark(self, visit_id):
+        with open(self.path, "a") as f:
+            f.write(f"{visit_id}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.add(str(visit_id))
+
+
+class CSVResultWriter:
+    """Appends result rows to a CSV file, writing the header only for a new file."""
+
+    buffered = 0  # rows are on disk as soon as write returns
+
+    def __init__(self, path):
+        self.path = Path(path)
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=OUTPUT_COLUMNS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes result rows to a directory of Parquet part files, one part per flush_every
+    rows, so a resumed run adds parts instead of rewriting earlier ones.
+
+    Raises:
+        ImportError: If neither pyarrow nor fastparquet is installed, checked here so
+            a run fails before any LLM call rather than at its first flush
+    """
+
+    def __init__(self, path, flush_every=500):
+        if not any(importlib.util.find_spec(e) for e in ("pyarrow", "fastparquet")):
+            raise ImportError(
+                "Parquet output requires pyarrow or fastparquet, install one of them "
+                "or write to a .csv file"
+            )
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self._rows = []
+
+    @property
+    def buffered(self):
+        """Number of rows written but not on disk yet."""
+        return len(self._rows)
+
+    def write(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        part = self.path / f"part-{time.time_ns()}.parquet"
+        pd.DataFrame(self._rows, columns=OUTPUT_COLUMNS).to_parquet(part, index=False)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+def _result_rows(visit_df, status, justifications=None):
+    rows = []
+    for index, row in visit_df.iterrows():
+        result = (justifications or {}).get(str(index), {})
+        record = {column: row.get(column) for column in OUTPUT_COLUMNS[:-2]}
+        record["Status"] = "error" if "error" in result else status
+        record["Justification"] = result.get("justification") or result.get("error")
+        rows.append(record)
+    return rows
+
+
+def _valid_visit_ids(visit_ids, logger):
+    """Drops the visit ids that are not integers, logging each of them."""
+    valid = []
+    for visit_id in visit_ids:
+        if str(visit_id).strip().isdigit():
+            valid.append(str(visit_id).strip())
+        else:
+            logger.warning(f"Skipping invalid visit id {visit_id!r}")
+    return valid
+
+
+def process_visit(visit_df, limiter, logger, max_concurrency=4):
+    """
+    Resolves the policy of one visit and justifies its rejected services.
+
+    Returns:
+        list: Output rows of the visit, with a Status of "justified", "error",
+        "no_policy" or "no_class".
+    """
+    policy, detail, _ = get_policy_details(visit_df, logger)
+    if policy is None:
+        return _result_rows(visit_df, "no_policy")
+    if detail is None:
+        return _result_rows(visit_df, "no_class")
+
+    services = get_rejected_services(visit_df)
+    for _ in services:
+        limiter.acquire()
+    justifications = get_batch_justifications(
+        get_policy_digest(policy, detail, visit_df),
+        get_visit_info(visit_df),
+        services,
+        max_concurrency,
+    )
+    return _result_rows(visit_df, "justified", justifications)
+
+
+def run_bulk_resubmission(
+    start_date,
+    end_date,
+    output,
+    logger,
+    workers=4,
+    rate=1.0,
+    checkpoint=None,
+    visit_ids=None,
+):
+    """
+    Generates justifications for every BE/CV rejected visit created in a date window,
+    or for an explicit list of visits.
+
+    Visits are fetched with one set-based query, processed by a pool of workers sharing
+    a rate limiter on LLM calls, and streamed to the output as they complete. Completed
+    visits are recorded in the checkpoint file and skipped when the run is restarted.
+
+    Args:
+        start_date: First day of the window (inclusive)
+        end_date: Last day of the window (exclusive)
+        output (str): .csv file, or a directory for Parquet part files
+        logger: Logger for progress messages
+        workers (int): Number of visits processed concurrently
+        rate (float): Average LLM calls per second across all workers
+        checkpoint (str, optional): Checkpoint file, defaults to <output>.checkpoint
+        visit_ids (list, optional): Process these visits instead of the date window,
+            ids that are not integers are logged and skipped
+
+    Returns:
+        int: Number of visits processed by this run
+    """
+    # Invalid settings and a missing Parquet engine fail here, before any LLM call
+    limiter = RateLimiter(rate=rate, burst=max(workers, 1) * 4)
+    writer = (
+        CSVResultWriter(output)
+        if str(output).endswith(".csv")
+        else ParquetResultWriter(output)
+    )
+
+    checkpoint = Checkpoint(checkpoint or f"{str(output).rstrip('/')}.checkpoint")
+    processed = 0
+    pending = []  # visits whose rows are not on disk yet, checkpointed once they are
+    try:
+        if visit_ids is not None:
+            visit_ids = _valid_visit_ids(visit_ids, logger)
+            todo = [v for v in visit_ids if v not in checkpoint.done]
+            grouped = get_visits_data(todo, logger).items() if todo else []
+        else:
+            df = get_visits_data_by_date(start_date, end_date, logger)
+            grouped = df.groupby("VisitID", sort=False) if df is not None else []
+
+        visits = [
+            (visit_id, visit_df.reset_index(drop=True))
+            for visit_id, visit_df in grouped
+            if str(visit_id) not in checkpoint.done
+        ]
+        if not visits:
+            logger.info("No rejected visits left to process")
+            return 0
+        logger.info(
+            f"{len(visits)} visits to process, {len(checkpoint.done)} already done"
+        )
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(process_visit, visit_df, limiter, logger): visit_id
+                for visit_id, visit_df in visits
+            }
+            for future in as_completed(futures):
+                visit_id = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    # Not checkpointed, the visit is retried on the next run
+                    logger.error(f"Visit {visit_id} failed: {e}")
+                    continue
+                try:
+                    writer.write(rows)
+                except Exception:
+                    # Output is broken, do not spend LLM calls on rows that would be lost
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+                pending.append(visit_id)
+                if not writer.buffered:
+                    for done_id in pending:
+                        checkpoint.mark(done_id)
+                    pending = []
+                processed += 1
+                logger.info(f"Visit {visit_id} done ({processed}/{len(visits)})")
+    finally:
+        writer.close()
+        for done_id in pending:
+            checkpoint.mark(done_id)
+    return processed
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+
+from src.resubmission.class_aliases import resolve_class
+
+# Bound of the remembered lookup misses, cleared at once when reached
+MAX_CACHED_MISSES = 10000
+
+
+def normalize_policy_number(policy_number) -> str:
+    """Strips whitespace so that '513508002 ' and '513508002' index the same."""
+    if policy_number is None:
+        return ""
+    return "".join(str(policy_number).split())
+
+
+class PolicyNumberIndex:
+    """
+    In-memory sorted index over the policy numbers of one collection (Policy or NCCI_Policy).
+
+    The index is built from a single projection query on first use, then kept up to date
+    by add/discard whenever this process inserts or deletes a policy. A lookup miss
+    rebuilds it at most once per refresh_interval seconds to pick up policies inserted
+    by other processes.
+
+    The same query loads the class alias table of each policy, see class_aliases, so
+    the class of a visit's contract is resolved without touching MongoDB.
+
+    Args:
+        model: The mongoengine Document class to index.
+        refresh_interval (float): Minimum seconds between rebuilds triggered by a miss.
+    """
+
+    def __init__(self, model, refresh_interval=300.0):
+        self.model = model
+        self.refresh_interval = refresh_interval
+        self._keys = []  # sorted normalized policy numbers
+        self._numbers = {}  # normalized -> policy number as stored in Mongo
+        self._aliases = {}  # normalized -> class alias table, see build_class_aliases
+        self._misses = set()  # inputs matching nothing, until the next build or add
+        self._built_at = None
+        self._lock = threading.RLock()
+
+    def build(self):
+        """(Re)loads every policy number and class alias table in one query."""
+        rows = self.model.objects().only("policy_number", "class_aliases").as_pymongo()
+        numbers, aliases = {}, {}
+        for row in rows:
+            number = row.get("policy_number")
+            if number is None:
+                continue
+            key = normalize_policy_number(number)
+            numbers[key] = number
+            if row.get("class_aliases"):
+                aliases[key] = row["class_aliases"]
+        with self._lock:
+            self._numbers = numbers
+            self._aliases = aliases
+            self._keys = sorted(self._numbers)
+            self._misses.clear()
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if self._built_at is None:
+            self.build()
+
+    def add(self, policy_number, class_aliases=None):
+        """Registers a newly inserted or replaced policy and its class alias table."""
+        key = normalize_policy_number(policy_number)
+        with self._lock:
+            if self._built_at is None:
+                return
+            self.set_class_aliases(policy_number, class_aliases)
+            if key in self._numbers:
+                return
+            self._numbers[key] = policy_number
+            bisect.insort(self._keys, key)
+            self._misses.clear()
+
+    def discard(self, policy_number):
+        """Removes a deleted policy number."""
+        key = normalize_policy_number(policy_number)
+        with self._lock:
+            self._aliases.pop(key, None)
+            if self._numbers.pop(key, None) is None:
+                return
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def set_class_aliases(self, policy_number, class_aliases):
+        """Replaces the alias table of a policy, e.g. computed for a legacy document."""
+        key = normalize_policy_number(policy_number)
+        with self._lock:
+            if class_aliases:
+                self._aliases[key] = class_aliases
+            else:
+                self._aliases.pop(key, None)
+
+    def resolve_class(self, policy_number, contract):
+        """
+        Class name of a policy matching a visit's contract, from its alias table.
+
+        Returns:
+            str or None: The class name as stored, or None if the policy has no alias
+            table or none of its aliases matches.
+        """
+        key = normalize_policy_number(policy_number)
+        self._ensure_built()
+        with self._lock:
+            aliases = self._aliases.get(key)
+        return resolve_class(aliases, contract)
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._numbers:
+                return self._numbers[key]
+
+            # Input missing a suffix: the first key at or after it shares it as a prefix
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i].startswith(key):
+                return self._numbers[self._keys[i]]
+
+            # Visits without a policy, or of the other payer's collection, miss on
+            # every request: only the first one pays for the substring scan
+            if key in self._misses:
+                return None
+
+            # Rare case, input found in the middle of a stored number
+            for candidate in self._keys:
+                if key in candidate:
+                    return self._numbers[candidate]
+            if len(self._misses) >= MAX_CACHED_MISSES:
+                self._misses.clear()
+            self._misses.add(key)
+        return None
+
+    def resolve(self, policy_number_input):
+        """
+        Maps a policy number from the visit data to the policy number stored in Mongo.
+
+        Args:
+            policy_number_input: Policy number, possibly missing its suffix.
+
+        Returns:
+            str or None: The stored policy number, or None if nothing matches.
+        """
+        key = normalize_policy_number(policy_number_input)
+        if not key:
+            return None
+
+        self._ensure_built()
+        policy_number = self._lookup(key)
+        if policy_number is None and (
+            time.monotonic() - self._built_at >= self.refresh_interval
+        ):
+            self.build()
+            policy_number = self._lookup(key)
+        return policy_number
+
+    def find(self, policy_number_input):
+        """
+        Resolves the policy number and fetches its document in a single query.
+
+        Returns:
+            The matching document or None.
+        """
+        policy_number = self.resolve(policy_number_input)
+        if policy_number is None:
+            return None
+        return self.model.objects(policy_number=policy_number).first()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_policy_index(model):
+    """Returns the process-wide PolicyNumberIndex of a policy model, creating it on first use."""
+    with _indexes_lock:
+        if model not in _indexes:
+            _indexes[model] = PolicyNumberIndex(model)
+        return _indexes[model]
@@ -164,3 +164,10 @@ in the policy just say that there isn't information about it in the policy. Alwa
 Focus on the specialty that the patient visited, pay attention and relate it to the policy.
 Be effecient and concise, make fast and smart conclusions. When you're unsure always say that, do not make wrong conclusions with confidence.
 """
+
+summary_prompt = """
+You are given the earlier part of a conversation between an insurance team member and an insurance assistant about a patient's visit,
+possibly with a summary of what came before it. Write an updated summary of the whole conversation in a few short bullet points:
+the questions asked, the answers and policy facts given, the justifications written and any decisions taken.
+Keep numbers, limits and service names exactly as stated. Do not add anything that was not said.
+"""
@@ -0,0 +1,154 @@
+import math
+import re
+from collections import Counter
+
+# Coverage fields sent whatever the visit, they apply to every claim of the class
+ALWAYS_RELEVANT_FIELDS = (
+    "vip_level",
+    "overall_annual_limit",
+    "approval_preauthorization_notes",
+    "special_instructions",
+    # NCCI classes, see coverage.flatten_ncci_class
+    "class_limit",
+    "exclusion",
+)
+
+# Visit columns describing what was treated, matched against the coverage fields
+VISIT_QUERY_COLUMNS = ("Specialty_Name", "Diagnose_Name", "ICD10 Code", "Service_Name")
+
+# ICD-10 code prefixes -> words of the coverage fields they relate to, since codes
+# never appear in the policy text itself
+ICD10_HINTS = (
+    (("F84",), "autism"),
+    (("F",), "psychiatric"),
+    (("G30",), "alzheimers"),
+    (("K0", "K10", "K11", "K12", "K13", "K14"), "dental"),
+    (("H0", "H1", "H2", "H3", "H4", "H5"), "optical eye lens"),
+    (("H6", "H7", "H8", "H9"), "hearing audiometry"),
+    (("N18", "Z49", "Z99.2"), "dialysis kidney"),
+    (("E66",), "obesity"),
+    (("O", "Z3"), "maternity pregnancy"),
+    (("P",), "neonatal newborn premature"),
+    (("Q",), "congenital"),
+    (("Z00", "Z01", "Z13"), "checkup screening"),
+    (("Z23", "Z27"), "vaccination"),
+    (("Z94", "Z52"), "transplant organ donor"),
+    (("I34", "I35", "I05", "I06", "I08"), "heart valves"),
+    (("M", "S"), "physiotherapy"),
+)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "not", "of", "on", "or", "per", "the", "to", "up", "with", "without",
+}  # fmt: skip
+
+
+def tokenize(text) -> list:
+    """Lowercase word tokens without stopwords, plural "s" stripped."""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", str(text).lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def icd10_hints(codes) -> str:
+    """Coverage words related to a " , " separated list of ICD-10 codes."""
+    words = []
+    for code in str(codes or "").split(","):
+        code = code.strip().upper()
+        for prefixes, hint in ICD10_HINTS:
+            if code.startswith(prefixes):
+                words.append(hint)
+                break
+    return " ".join(words)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a small set of documents, here the fields of one coverage class.
+
+    Args:
+        documents (dict): Key -> document text.
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms = {key: Counter(tokenize(text)) for key, text in documents.items()}
+        self._lengths = {key: sum(terms.values()) for key, terms in self._terms.items()}
+        count = len(self._terms)
+        self._avg_length = (sum(self._lengths.values()) / count) if count else 0.0
+        frequencies = Counter()
+        for terms in self._terms.values():
+            frequencies.update(terms.keys())
+        self._idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in frequencies.items()
+        }
+
+    def scores(self, query: str) -> dict:
+        """Returns key -> BM25 score of every document for the query text."""
+        query_terms = set(tokenize(query))
+        scores = {}
+        for key, terms in self._terms.items():
+            norm = self.k1 * (
+                1 - self.b + self.b * self._lengths[key] / (self._avg_length or 1)
+            )
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores[key] = score
+        return scores
+
+
+def coverage_field_index(detail: dict) -> BM25Index:
+    """BM25 index of the non-empty fields of a coverage detail, by field name and text."""
+    return BM25Index(
+        {
+            field: f"{field.replace('_', ' ')} {value}"
+            for field, value in detail.items()
+            if not field.startswith("_") and value not in (None, "", [], {})
+        }
+    )
+
+
+def visit_query(df) -> str:
+    """Query text describing a visit: specialty, diagnoses, ICD-10 hints and services."""
+    parts = []
+    for column in VISIT_QUERY_COLUMNS:
+        if column in df.columns:
+            parts.extend(str(v) for v in df[column].dropna().unique())
+    if "ICD10 Code" in df.columns:
+        parts.extend(icd10_hints(codes) for codes in df["ICD10 Code"].dropna().unique())
+    return " ".join(parts)
+
+
+def prune_detail(detail: dict, index: BM25Index, query: str, top_k=12) -> dict:
+    """
+    Keeps the always relevant fields and the top_k fields matching the query.
+
+    Args:
+        detail (dict): Coverage detail of one class.
+        index (BM25Index): Index of the detail, see coverage_field_index.
+        query (str): Visit query, see visit_query.
+        top_k (int): Maximum number of matched fields kept on top of the always
+            relevant ones, fields not matching any query term are dropped.
+
+    Returns:
+        dict: The pruned detail, fields in their original order.
+    """
+    scores = index.scores(query)
+    ranked = sorted(
+        (field for field, score in scores.items() if score > 0),
+        key=lambda field: -scores[field],
+    )
+    keep = set(ALWAYS_RELEVANT_FIELDS) | set(ranked[:top_k])
+    return {field: value for field, value in detail.items() if field in keep}
@@ -0,0 +1,271 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from src.resubmission.cache import TTLCache
+
+
+class SessionStore(ABC):
+    """
+    Storage backend of server-side sessions. Values are JSON-serializable dicts,
+    keep them small and store large payloads in a cache referenced by key instead.
+    """
+
+    @abstractmethod
+    def get(self, sid):
+        """Returns the session data, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, sid, data, ttl):
+        """Stores the session data for ttl seconds."""
+
+    @abstractmethod
+    def touch(self, sid, ttl):
+        """Makes a stored session expire ttl seconds from now, leaving its data as is."""
+
+    @abstractmethod
+    def delete(self, sid):
+        """Removes a session, missing ones are ignored."""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process LRU store, sessions are lost on restart and not shared between workers.
+    Suited to development and single-worker deployments.
+
+    Args:
+        maxsize (int): Maximum number of sessions, the least recently used is evicted first.
+    """
+
+    def __init__(self, maxsize=10000):
+        # Expiry is tracked per session, the cache only bounds the number of sessions
+        self._cache = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    def get(self, sid):
+        entry = self._cache.get(sid)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= time.time():
+            self._cache.pop(sid)
+            return None
+        return json.loads(data)
+
+    def set(self, sid, data, ttl):
+        self._cache.set(sid, (time.time() + ttl, json.dumps(data)))
+
+    def touch(self, sid, ttl):
+        entry = self._cache.get(sid)
+        if entry is not None:
+            self._cache.set(sid, (time.time() + ttl, entry[1]))
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a local SQLite file, shared by every worker of the host and kept across
+    restarts. Expired rows are purged every prune_interval seconds.
+
+    Args:
+        path (str): SQLite database file.
+        prune_interval (float): Seconds between two purges of expired sessions.
+    """
+
+    def __init__(self, path="sessions.db", prune_interval=300.0):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)"
+            )
+
+    def get(self, sid):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE sid = ? AND expires_at > ?",
+                (sid, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid, data, ttl):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                (sid, json.dumps(data), now + ttl),
+            )
+            if now - self._pruned_at >= self.prune_interval:
+                self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+                self._pruned_at = now
+
+    def touch(self, sid, ttl):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sessions SET expires_at = ? WHERE sid = ?", (time.time() + ttl, sid)
+            )
+
+    def delete(self, sid):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in Redis (or any server speaking its protocol), shared by every host behind
+    the load balancer. Expiry is enforced by Redis itself.
+
+    Args:
+        url (str): Redis connection URL, e.g. redis://localhost:6379/0
+        prefix (str): Key prefix of the session entries.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="session:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        data = self._client.get(self.prefix + sid)
+        return json.loads(data) if data else None
+
+    def set(self, sid, data, ttl):
+        self._client.setex(self.prefix + sid, max(int(ttl), 1), json.dumps(data))
+
+    def touch(self, sid, ttl):
+        self._client.expire(self.prefix + sid, max(int(ttl), 1))
+
+    def delete(self, sid):
+        self._client.delete(self.prefix + sid)
+
+
+def create_session_store(backend=None):
+    """
+    Builds the session store selected by backend, or by the SESSION_BACKEND environment
+    variable (memory, sqlite or redis, defaults to sqlite).
+    """
+    backend = (backend or os.getenv("SESSION_BACKEND", "sqlite")).lower()
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_SQLITE_PATH", "sessions.db"))
+    if backend == "redis":
+        return RedisSessionStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict whose content lives in a SessionStore, the cookie only holds sid."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface backed by a SessionStore. The cookie carries a signed session
+    id, the data is stored server side for app.permanent_session_lifetime and the
+    cookie expires at the same time, permanent session or not. The expiry slides: while
+    SESSION_REFRESH_EACH_REQUEST is on (the default), every request, read-only ones
+    included, pushes back both the stored data's and the cookie's expiry.
+    """
+
+    salt = "resubmission-session"
+
+    def __init__(self, store):
+        """
+        Args:
+            store: SessionStore, or a callable returning one that is called on the first
+                request, e.g. create_session_store, so that importing the app opens
+                no database.
+        """
+        self._store = store if isinstance(store, SessionStore) else None
+        self._factory = None if self._store is not None else store
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self._factory()
+        return self._store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        if session.modified:
+            self.store.set(session.sid, dict(session), ttl)
+        elif app.config["SESSION_REFRESH_EACH_REQUEST"]:
+            # Only the expiry, a concurrent request may have written newer data
+            self.store.touch(session.sid, ttl)
+        else:
+            return
+
+        # The stored data expires after ttl even for non-permanent sessions, the
+        # cookie expires with it rather than pointing at a session that is gone
+        expires = self.get_expiration_time(app, session) or (
+            datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        )
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,71 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+SFDA_PATH = Path("Data") / "sfda_list.csv"
+KEY_COLUMN = "Service_Name"
+
+
+def normalize_service_name(name) -> str:
+    """Case and whitespace insensitive key for service names."""
+    if not isinstance(name, str):
+        return ""
+    return " ".join(name.split()).casefold()
+
+
+class SFDALookup:
+    """
+    SFDA list indexed by normalized service name.
+
+    The CSV is parsed on the first lookup rather than at import time, and parsed again
+    only when its modification time changes.
+
+    Args:
+        path (Path): Location of the SFDA CSV file.
+    """
+
+    def __init__(self, path=SFDA_PATH):
+        self.path = Path(path)
+        self.columns = []
+        self._rows = {}  # normalized service name -> tuple of column values
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        mtime = self.path.stat().st_mtime
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            sf = pd.read_csv(self.path)
+            self.columns = [c for c in sf.columns if c != KEY_COLUMN]
+            keys = sf[KEY_COLUMN].map(normalize_service_name)
+            values = sf[self.columns].astype(object).where(sf[self.columns].notna(), None)
+            # First occurrence wins, same as the first match of the previous merge
+            rows = {}
+            for key, row in zip(keys, values.itertuples(index=False, name=None)):
+                if key and key not in rows:
+                    rows[key] = row
+            self._rows = rows
+            self._mtime = mtime
+
+    def lookup(self, service_names):
+        """
+        Looks up every service of a visit in one pass.
+
+        Args:
+            service_names: Iterable of service names.
+
+        Returns:
+            pandas DataFrame: One row per input name with the SFDA columns, None where
+            the service is not in the list.
+        """
+        self._load()
+        empty = (None,) * len(self.columns)
+        rows = [self._rows.get(normalize_service_name(n), empty) for n in service_names]
+        return pd.DataFrame(rows, columns=self.columns)
+
+
+sfda_lookup = SFDALookup()
@@ -1,96 +1,296 @@
 import json
+import os
 import re
-import time
-import urllib.error
-import urllib.parse
-import urllib.request
+import threading
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 
+from src.resubmission.answer_cache import answer_cache
+from src.resubmission.cache import TTLCache
+from src.resubmission.class_aliases import build_class_aliases, resolve_class
+from src.resubmission.const import SERVICE_FIELDS
+from src.resubmission.coverage import class_views, payer_kind
+from src.resubmission.database import read_data_for_id_query, read_data_for_ids
+from src.resubmission.digest import render_coverage_digest
 from src.resubmission.models import CoverageDetail, Policy,NCCI_Policy,CaseCoverage,SubCoverage,Benefit,PolicyClass,Endorsement
+from src.resubmission.policy_index import get_policy_index, normalize_policy_number
+from src.resubmission.relevance import coverage_field_index, prune_detail, visit_query
+from src.resubmission.sfda import sfda_lookup
+from src.resubmission.visit_index import VisitIndex
 
-sf = pd.read_csv(Path("Data") / "sfda_list.csv")
+# Policy kind -> collection, the kind of a visit's policy is chosen by its payer
+POLICY_MODELS = {"policy": Policy, "ncci": NCCI_Policy}
 
-with open("passcode.json", "r") as file:
-    db_configs = json.load(file)
-db_configs = db_configs["DB_NAMES"]
-read_passcode = db_configs["Replica"]
+# passcode.json entry used for read queries, its engine is created once and shared
+READ_DB = "Replica"
+
+# Resolved (policy number, VIP level) -> (policy, detail dict). Policies change about
+# once a year, the TTL only bounds staleness when another process updates one.
+coverage_cache = TTLCache(maxsize=512, ttl=6 * 3600)
+
+# (policy number, class) -> rendered coverage digest sent as the policy system prompt
+# or (policy number, class, kept fields) -> digest pruned to those fields
+digest_cache = TTLCache(maxsize=2048, ttl=6 * 3600)
+
+# (policy number, class) -> BM25 index of the coverage fields, for relevance pruning
+field_index_cache = TTLCache(maxsize=512, ttl=6 * 3600)
+
+# Coverage fields kept per visit on top of the always relevant ones, 0 (the default)
+# sends them all. Pruning shrinks the prompt but makes the policy prompt vary from
+# visit to visit, which loses the provider's prompt prefix cache.
+POLICY_CONTEXT_TOP_K = int(os.getenv("POLICY_CONTEXT_TOP_K", "0"))
+
+# Visit id -> visit rows as {column: values}, shared by the routes of one user flow
+visit_cache = TTLCache(maxsize=256, ttl=3600)
 
 sql_path = Path("SQL")
-with open(sql_path / "resubmission.sql", "r") as file:
-    query = file.read()
-with open(sql_path / "get_visits.sql", "r") as file:
-    visits_query = file.read()
+
+
+@lru_cache(maxsize=None)
+def load_query(name):
+    """Reads an SQL file of the SQL folder on first use, then serves it from memory."""
+    with open(sql_path / name, "r") as file:
+        return file.read()
+
+
+_visit_index = None
+_visit_index_lock = threading.Lock()
+
+
+def get_visit_index():
+    """
+    Home page visit IDs, loaded on first use then refreshed incrementally by CreatedDate.
+    """
+    global _visit_index
+    if _visit_index is None:
+        with _visit_index_lock:
+            if _visit_index is None:
+                _visit_index = VisitIndex(
+                    load_query("get_visits.sql"),
+                    load_query("get_visits_since.sql"),
+                    READ_DB,
+                )
+    return _visit_index
+
 
 _ = load_dotenv()
 
 
-def get_visits_by_date():
+def get_visits_by_date(prefix="", start_date=None, end_date=None, limit=50, offset=0):
     """"
-    Fetch all visit IDs for Bupa visits ordered by date from most to least recent.
-    These visit ids are displayed in the dropdown on the home page as a suggestion to choose from."""
-    df = read_data(visits_query, read_passcode, params=None)
-    return df["VisitID"]
+    Fetch a page of Bupa visit IDs ordered by date from most to least recent.
+    These visit ids are displayed in the dropdown on the home page as a suggestion to choose from.
+    Served from the cached visit index, see VisitIndex.search for the arguments.
+
+    Returns:
+        dict: {"total": number of matching visits, "visits": [{"visit_id", "created_date"}]}"""
+    return get_visit_index().search(prefix, start_date, end_date, limit, offset)
 
 
 def get_policy_details(df, logger):
     """
     Retrieves policy and coverage details by matching policy number and VIP level.
+    Bupa (Policy) and NCCI (NCCI_Policy) policies go through the same path: the
+    collection is chosen by the visit's Payer, and both are returned as a flat
+    coverage view whose "vip_level" is the class name.
 
     Args:
-        df: DataFrame containing 'ContractorClientPolicyNumber' and 'Contract' columns
+        df: DataFrame containing 'ContractorClientPolicyNumber' and 'Contract' columns,
+            and optionally 'Payer'
 
     Returns:
         tuple: (policy, detail_dict, available_levels)
-            - policy: Policy object or None
+            - policy: Policy or NCCI_Policy object, or None
             - detail_dict: Coverage detail dictionary or None
             - available_levels: List of available VIP levels (only when no match found) or None
     """
     policy_number_input = df["ContractorClientPolicyNumber"].iloc[0]
     vip_level_input = normalize_text(df["Contract"].iloc[0])
+    payer = df["Payer"].iloc[0] if "Payer" in df.columns else None
 
-    # Find matching policy (handles suffix variations)
-    policy = _find_policy_by_number(policy_number_input)
-    if not policy:
+    # Resolve the stored policy number (handles suffix variations)
+    kind, policy_number = resolve_policy_number(policy_number_input, payer)
+    if not policy_number:
         logger.info("No policy found")
         return None, None, None
 
-    # Get coverage details for the matching VIP level
-    detail, available_levels = _match_coverage_detail(policy, vip_level_input)
+    cache_key = (normalize_policy_number(policy_number), vip_level_input)
+    cached = coverage_cache.get(cache_key)
+    if cached is not None:
+        policy, detail = cached
+        return policy, detail, None
+
+    policy, detail, available_levels = _fetch_coverage_detail(
+        kind, policy_number, vip_level_input
+    )
+    if policy is None:
+        logger.info("No policy found")
+    elif detail is not None:
+        coverage_cache.set(cache_key, (policy, detail))
 
     return policy, detail, available_levels
 
 
-def _find_policy_by_number(policy_number_input):
+def resolve_policy_number(policy_number_input, payer=None):
     """
-    Finds a policy by matching policy number (handles suffix variations).
+    Finds the collection and stored number of a policy from the in-memory policy
+    indexes, without querying MongoDB.
+
     Args:
         policy_number_input: Policy number from input data
+        payer: Payer name of the visit, selects the collection. When unknown, each
+            collection is tried in turn.
+
+    Returns:
+        tuple: (kind, policy number as stored), or (None, None) if not found
+    """
+    kind = payer_kind(payer)
+    for kind in [kind] if kind else POLICY_MODELS:
+        policy_number = get_policy_index(POLICY_MODELS[kind]).resolve(
+            policy_number_input
+        )
+        if policy_number:
+            return kind, policy_number
+    return None, None
+
+
+def _fetch_coverage_detail(kind, policy_number, vip_level_input):
+    """
+    Fetches a policy and its coverage detail for a VIP level from MongoDB.
+
+    Args:
+        kind: "policy" or "ncci", see POLICY_MODELS
+        policy_number: Policy number as stored in MongoDB
+        vip_level_input: Normalized VIP level from input
+
     Returns:
-        Policy object or None
+        tuple: (policy, detail_dict, available_levels), same as get_policy_details
     """
-    policy_numbers = list(
-        Policy.objects().only("policy_number").scalar("policy_number")
+    model = POLICY_MODELS[kind]
+    index = get_policy_index(model)
+    # Contract strings such as "A+" or "VIP" name the class through the alias table
+    # computed at ingestion, the input itself is tried when it has no alias
+    level = index.resolve_class(policy_number, vip_level_input) or vip_level_input
+    # Fetch the policy header with only the coverage detail of the VIP level
+    if isinstance(level, str) and level:
+        queryset = model.objects(policy_number=policy_number)
+        if kind == "ncci":
+            policy = queryset.with_class(level)
+        else:
+            policy = queryset.with_coverage_level(level)
+        if policy is None:
+            return None, None, None
+        views = class_views(kind, policy)
+        if views:
+            return policy, views[0][1], None
+
+    # No exact level match: load every coverage detail to fall back on a single
+    # coverage or to list the available levels
+    policy = model.objects(policy_number=policy_number).first()
+    if not policy:
+        return None, None, None
+    # The full document is loaded anyway, precompute the view of every class, and the
+    # alias table of policies ingested before class_aliases existed
+    views = class_views(kind, policy)
+    if not policy.class_aliases:
+        index.set_class_aliases(
+            policy_number, build_class_aliases(level for level, _ in views)
+        )
+    for level, view in views:
+        coverage_cache.set(
+            (normalize_policy_number(policy_number), normalize_text(level)),
+            (policy, view),
+        )
+    detail, available_levels = _match_coverage_detail(kind, policy, vip_level_input)
+
+    return policy, detail, available_levels
+
+
+def policy_cache_key(policy, detail):
+    """(normalized policy number, normalized class) identifying a coverage detail."""
+    return (
+        normalize_policy_number(policy.policy_number),
+        normalize_text(detail.get("vip_level")),
     )
 
-    for policy_number in policy_numbers:
-        # Check if input is substring of DB policy number (handles missing suffixes)
-        if policy_number_input in policy_number:
-            return Policy.objects(policy_number=policy_number).first()
 
-    return None
+def get_policy_digest(policy, detail, visit_df=None):
+    """
+    Returns the canonical text of a coverage detail, rendered once per (policy, class).
+    Send this instead of str(detail) so the policy prompt is identical across requests.
+
+    With visit_df and POLICY_CONTEXT_TOP_K set, only the always relevant fields and the
+    POLICY_CONTEXT_TOP_K fields best matching the visit's specialty, diagnoses and
+    services are rendered. Visits keeping the same fields share one cached digest.
+
+    Args:
+        policy: Policy object returned by get_policy_details
+        detail: Coverage detail dictionary returned by get_policy_details
+        visit_df: Optional visit DataFrame to prune the fields for
+
+    Returns:
+        str: The coverage digest, see render_coverage_digest
+    """
+    key = policy_cache_key(policy, detail)
+    if visit_df is not None and POLICY_CONTEXT_TOP_K > 0:
+        index = field_index_cache.get(key)
+        if index is None:
+            index = coverage_field_index(detail)
+            field_index_cache.set(key, index)
+        detail = prune_detail(
+            detail, index, visit_query(visit_df), top_k=POLICY_CONTEXT_TOP_K
+        )
+        key = key + (tuple(detail),)
+
+    digest = digest_cache.get(key)
+    if digest is None:
+        digest = render_coverage_digest(detail, policy)
+        digest_cache.set(key, digest)
+    return digest
+
+
+def invalidate_policy_cache(policy_number):
+    """
+    Drops the cached coverage details and assistant answers of a policy after it is
+    inserted or deleted.
+    """
+    key = normalize_policy_number(policy_number)
+    coverage_cache.invalidate(lambda cache_key: cache_key[0] == key)
+    digest_cache.invalidate(lambda cache_key: cache_key[0] == key)
+    field_index_cache.invalidate(lambda cache_key: cache_key[0] == key)
+    answer_cache.invalidate(key)
+
+
+def _find_policy_by_number(policy_number_input, model=None, payer=None):
+    """
+    Finds a policy by matching policy number (handles suffix variations).
+    Args:
+        policy_number_input: Policy number from input data
+        model: Policy or NCCI_Policy, the collection to search. By default the
+            collection is resolved from payer, see resolve_policy_number
+        payer: Payer name, used when model is not given
+    Returns:
+        Policy or NCCI_Policy object, or None
+    """
+    if model is not None:
+        return get_policy_index(model).find(policy_number_input)
+    kind, policy_number = resolve_policy_number(policy_number_input, payer)
+    if not policy_number:
+        return None
+    return POLICY_MODELS[kind].objects(policy_number=policy_number).first()
 
 
-def _match_coverage_detail(policy, vip_level_input):
+def _match_coverage_detail(kind, policy, vip_level_input):
     """
     Matches coverage detail by VIP level from policy.
 
     Args:
-        policy: Policy object
+        kind: "policy" or "ncci", see POLICY_MODELS
+        policy: Policy or NCCI_Policy object with all its classes
         vip_level_input: Normalized VIP level from input
 
     Returns:
@@ -98,31 +298,120 @@ def _match_coverage_detail(policy, vip_level_input):
             - detail_dict: Matched coverage detail as sorted dict, or None
             - available_levels: List of available levels (only if no match), or None
     """
-    coverage_details = policy.coverage_details
+    views = class_views(kind, policy)
 
     # If only one coverage exists, return it directly
-    if len(coverage_details) == 1:
-        detail = coverage_details[0].to_mongo().to_dict()
-        return dict(sorted(detail.items())), None
+    if len(views) == 1:
+        return views[0][1], None
 
-    # Try to match by VIP level
+    # Try to match by VIP level, then by the contract aliases of the classes
+    aliases = policy.class_aliases or build_class_aliases(level for level, _ in views)
+    class_name = resolve_class(aliases, vip_level_input)
     matching_coverages = [
-        c for c in coverage_details if normalize_text(c.vip_level) == vip_level_input
+        view
+        for level, view in views
+        if normalize_text(level) == vip_level_input or level == class_name
     ]
 
     if matching_coverages:
-        detail = matching_coverages[0].to_mongo().to_dict()
-        return dict(sorted(detail.items())), None
+        return matching_coverages[0], None
 
     # No match found - return available levels for error message
-    available_levels = [c.vip_level for c in coverage_details]
+    available_levels = [level for level, _ in views]
     return None, available_levels
 
 
-def get_visit_data(visit_id, logger):
-    """Fetch and process visit data by selected visit id"""
-    df = read_data(query, read_passcode, (visit_id,))
+def get_visit_data(visit_id, logger, refresh=False):
+    """
+    Fetch and process visit data by selected visit id.
+    Results are kept in visit_cache so that the /visit, /select_level and /chat routes
+    of one user flow hit SQL Server once. Each call returns a new DataFrame that the
+    caller is free to modify.
+
+    Args:
+        visit_id: Selected visit id
+        logger: Logger of the calling app
+        refresh (bool): Bypass the cache and query SQL Server again
+
+    Returns:
+        pandas DataFrame, or None if the visit has no BE or CV rejections
+    """
+    key = str(visit_id)
+    cached = None if refresh else visit_cache.get(key)
+    if cached is not None:
+        return pd.DataFrame(cached)
+
+    df = _fetch_visit_data(visit_id, logger)
+    if df is not None:
+        visit_cache.set(key, df.to_dict(orient="list"))
+    return df
+
+
+def _fetch_visit_data(visit_id, logger):
+    """Runs the resubmission query for a visit and adds the SFDA columns."""
+    if not str(visit_id).strip().isdigit():
+        logger.info(f"Invalid visit id {visit_id}")
+        return None
+    df = read_data_for_ids(load_query("resubmission.sql"), READ_DB, [visit_id])
     logger.info(f"Fetched {len(df)} rows for visit {visit_id}")
+    return _prepare_visit_frame(df)
+
+
+def get_visits_data(visit_ids, logger):
+    """
+    Bulk counterpart of get_visit_data: fetches many visits in one round trip and
+    fills visit_cache with each of them.
+
+    Args:
+        visit_ids: Iterable of visit ids
+        logger: Logger of the caller
+
+    Returns:
+        dict: Visit id (as str) -> pandas DataFrame of its rows. Visits without
+        BE or CV rejections are left out.
+    """
+    df = read_data_for_ids(load_query("resubmission.sql"), READ_DB, visit_ids)
+    logger.info(f"Fetched {len(df)} rows for {df['VisitID'].nunique()} visits")
+    df = _prepare_visit_frame(df)
+    if df is None:
+        return {}
+
+    visits = {}
+    for visit_id, visit_df in df.groupby("VisitID", sort=False):
+        visit_df = visit_df.reset_index(drop=True)
+        visits[str(visit_id)] = visit_df
+        visit_cache.set(str(visit_id), visit_df.to_dict(orient="list"))
+    return visits
+
+
+def get_visits_data_by_date(start_date, end_date, logger):
+    """
+    Fetch and process the BE/CV rejected rows of every visit created in a date window,
+    in one set-based query.
+
+    Args:
+        start_date: First day of the window (inclusive)
+        end_date: Last day of the window (exclusive)
+        logger: Logger of the caller
+
+    Returns:
+        pandas DataFrame with the rows of all visits, or None if there are none
+    """
+    df = read_data_for_id_query(
+        load_query("resubmission.sql"),
+        READ_DB,
+        load_query("visit_ids_by_date.sql"),
+        tuple(pd.Timestamp(d).to_pydatetime() for d in (start_date, end_date)),
+    )
+    logger.info(
+        f"Fetched {len(df)} rows for {df['VisitID'].nunique()} visits "
+        f"between {start_date} and {end_date}"
+    )
+    return _prepare_visit_frame(df)
+
+
+def _prepare_visit_frame(df):
+    """Normalizes the Contract and Start_Date columns and adds the SFDA columns."""
     df["Contract"] = (
         df["Contract"]
         .fillna("")  # ensure no NaN
@@ -130,7 +419,10 @@ def get_visit_data(visit_id, logger):
         .str.split("-", n=1)
         .pipe(lambda p: p.apply(lambda x: x[1].strip() if len(x) > 1 else x[0].strip()))
     )
-    df = pd.merge(df, sf, on="Service_Name", how="left")
+    sfda = sfda_lookup.lookup(df["Service_Name"])
+    sfda.index = df.index
+    # The SQL result may already carry SFDA columns; the lookup takes precedence
+    df = df.drop(columns=sfda.columns, errors="ignore").join(sfda)
 
     # Format Start_Date consistently
     if "Start_Date" in df.columns and not df.empty:
@@ -144,6 +436,39 @@ def get_visit_data(visit_id, logger):
         return df
 
 
+def get_visit_info(df):
+    """Visit summary given to the assistant: patient info and the services provided."""
+    return str(
+        df[["Med_Dept", "Specialty_Name", "Diagnose_Name", "ICD10 Code"]]
+        .iloc[0]
+        .to_dict()
+    ) + str(df[["Service_Name", "Price"]].to_dict(orient="records"))
+
+
+def get_rejected_services(df):
+    """
+    Selects the BE/CV rejected services of a visit, the same rejections that
+    resubmission.sql filters on.
+
+    Args:
+        df: Visit DataFrame returned by get_visit_data
+
+    Returns:
+        dict: Row index (as str) -> service details given to the justification prompt
+    """
+    pattern = r"BE-|CV-"
+    rejected = df["ResponseReasonCode"].fillna("").astype(str).str.contains(
+        pattern
+    ) | df["ResponseReason"].fillna("").astype(str).str.contains(pattern)
+    columns = [c for c in SERVICE_FIELDS if c in df.columns]
+    return {
+        str(index): row
+        for index, row in zip(
+            df.index[rejected], df.loc[rejected, columns].to_dict(orient="records")
+        )
+    }
+
+
 def extract_drug_code(text):
     """
     Extract the drug codes in rejection reason strings.
@@ -160,60 +485,6 @@ def processing_thoughts(text):
     return clean_text.strip(), text_in_between[0].strip()
 
 
-def get_conn_engine(passcodes):
-    """
-    Creates and returns a SQLAlchemy engine for connecting to the SQL database.
-
-    Args:
-    - passcodes (dict): A dictionary containing database credentials.
-
-    Returns:
-    - engine (sqlalchemy.engine.Engine): A SQLAlchemy Engine instance for connecting to the database.
-    """
-    try:
-        server, db, uid, pwd, driver = (
-            passcodes["Server"],
-            passcodes["Database"],
-            passcodes["UID"],
-            passcodes["PWD"],
-            passcodes["driver"],
-        )
-        params = urllib.parse.quote_plus(
-            f"DRIVER={driver};"
-            f"SERVER={server};"
-            f"DATABASE={db};"
-            f"UID={uid};"
-            f"PWD={pwd};"
-            f"Connection Timeout=300;"
-        )
-        engine = create_engine("mssql+pyodbc:///?odbc_connect={}".format(params))
-        return engine
-    except KeyError as e:
-        print(f"Missing key in passcodes dictionary: {e}")
-        raise
-    except Exception as e:
-        print(f"Error creating database connection engine: {e}")
-        raise
-
-
-def read_data(query, passcode, params):
-    """
-    Executes a SQL query using get_conn_engine. If the first attempt fails,
-    waits for 5 minutes before trying again. If second attempt fails, reads data from live instead.
-
-    Returns:
-        pandas DataFrame with query results
-    """
-    try:
-        df = pd.read_sql_query(query, get_conn_engine(passcode), params=params)
-        return df
-    except Exception as e:
-        print(e)
-        time.sleep(300)  # Wait for 5 minutes (300 seconds)
-        df = pd.read_sql_query(query, get_conn_engine(passcode), params=params)
-        return df
-
-
 def list_files(folder_path: str):
     """
     Return a list of file names in the given folder.
@@ -225,37 +496,24 @@ def list_files(folder_path: str):
     return [str(f) for f in p.iterdir() if f.is_file()]
 
 
-def insert(data_source):
+def build_policy(data: dict) -> Policy:
     """
-    Insert a Policy document from either a JSON file path or a Python dict.
-    Validates and doesn't insert if a policy with the same policy_number already exists.
-    """
-    # --- Load data ---
-    if isinstance(data_source, str):
-        with open(data_source, "r") as f:
-            data = json.load(f)
-    elif isinstance(data_source, dict):
-        data = data_source
-    else:
-        raise TypeError("data_source must be a dict or JSON file path")
+    Builds a Policy document (not saved) from its extracted JSON.
 
-    policy_number = data.get("policy_number")
-    if not policy_number:
-        raise ValueError("Missing required field: 'policy_number'")
+    Args:
+        data (dict): Policy JSON, see schema.json
 
-    # --- Check for existing policy ---
-    existing = Policy.objects(policy_number=policy_number).first()
-    if existing:
-        print(f"Policy {policy_number} already exists. Skipping insert.")
-        return existing  # return the existing one instead of re-inserting
+    Returns:
+        Policy: The unsaved document
+    """
+    policy_number = data.get("policy_number")
 
     # --- Parse coverage details ---
     coverage_list = [
         CoverageDetail(**coverage) for coverage in data.get("coverage_details", [])
     ]
 
-    # --- Create Policy object ---
-    policy = Policy(
+    return Policy(
         policy_number=policy_number,
         company_name=data.get("company_name"),
         policy_holder=data.get("policy_holder"),
@@ -270,38 +528,24 @@ def insert(data_source):
             else None
         ),
         coverage_details=coverage_list,
+        class_aliases=build_class_aliases(c.vip_level for c in coverage_list),
     )
 
-    policy.save()
-    print(f"Policy {policy.policy_number} inserted successfully.")
 
-def insert_ncci(data_source):
+def build_ncci_policy(data: dict) -> NCCI_Policy:
     """
-    Insert an NCCI_Policy document from either a JSON file path or a Python dict.
-    Validates and doesn't insert if a policy with the same policy_number already exists.
-    """
-
-    # --- Load data ---
-    if isinstance(data_source, str):
-        with open(data_source, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    Builds an NCCI_Policy document (not saved) from its extracted JSON.
 
-    elif isinstance(data_source, dict):
-        data = data_source
+    Args:
+        data (dict): NCCI policy JSON, see ncci_schema.json
 
-    else:
-        raise TypeError("data_source must be a dict or JSON file path")
+    Returns:
+        NCCI_Policy: The unsaved document
 
-    # --- Validate policy_number ---
+    Raises:
+        ValueError: If the policy has no class
+    """
     policy_number = data.get("policy_number")
-    if not policy_number:
-        raise ValueError("Missing required field: 'policy_number'")
-
-    # --- Check for existing policy ---
-    existing = NCCI_Policy.objects(policy_number=policy_number).first()
-    if existing:
-        print(f"Policy {policy_number} already exists. Skipping insert.")
-        return existing
 
     # --- Parse classes ---
     class_list = []
@@ -349,8 +593,7 @@ def insert_ncci(data_source):
         for endorsement in (data.get("endorsements") or [])
     ]
 
-    # --- Create policy document ---
-    policy = NCCI_Policy(
+    return NCCI_Policy(
         provider_name=data.get("provider_name"),
         policy_number=policy_number,
         policy_status=data.get("policy_status"),
@@ -369,9 +612,72 @@ def insert_ncci(data_source):
         classes=class_list,
         endorsements=endorsement_list or None,
         additional_information=data.get("additional_information"),
+        class_aliases=build_class_aliases(c.class_code for c in class_list),
     )
 
+
+def insert(data_source):
+    """
+    Insert a Policy document from either a JSON file path or a Python dict.
+    Validates and doesn't insert if a policy with the same policy_number already exists.
+    """
+    # --- Load data ---
+    if isinstance(data_source, str):
+        with open(data_source, "r") as f:
+            data = json.load(f)
+    elif isinstance(data_source, dict):
+        data = data_source
+    else:
+        raise TypeError("data_source must be a dict or JSON file path")
+
+    policy_number = data.get("policy_number")
+    if not policy_number:
+        raise ValueError("Missing required field: 'policy_number'")
+
+    # --- Check for existing policy ---
+    existing = Policy.objects(policy_number=policy_number).first()
+    if existing:
+        print(f"Policy {policy_number} already exists. Skipping insert.")
+        return existing  # return the existing one instead of re-inserting
+
+    policy = build_policy(data)
+    policy.save()
+    get_policy_index(Policy).add(policy.policy_number, policy.class_aliases)
+    invalidate_policy_cache(policy.policy_number)
+    print(f"Policy {policy.policy_number} inserted successfully.")
+
+def insert_ncci(data_source):
+    """
+    Insert an NCCI_Policy document from either a JSON file path or a Python dict.
+    Validates and doesn't insert if a policy with the same policy_number already exists.
+    """
+
+    # --- Load data ---
+    if isinstance(data_source, str):
+        with open(data_source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    elif isinstance(data_source, dict):
+        data = data_source
+
+    else:
+        raise TypeError("data_source must be a dict or JSON file path")
+
+    # --- Validate policy_number ---
+    policy_number = data.get("policy_number")
+    if not policy_number:
+        raise ValueError("Missing required field: 'policy_number'")
+
+    # --- Check for existing policy ---
+    existing = NCCI_Policy.objects(policy_number=policy_number).first()
+    if existing:
+        print(f"Policy {policy_number} already exists. Skipping insert.")
+        return existing
+
+    policy = build_ncci_policy(data)
     policy.save()
+    get_policy_index(NCCI_Policy).add(policy.policy_number, policy.class_aliases)
+    invalidate_policy_cache(policy.policy_number)
     print(f"Policy {policy.policy_number} inserted successfully.")
 
     return policy
@@ -393,6 +699,8 @@ def delete(policy_number: str):
         return False
 
     policy.delete()
+    get_policy_index(Policy).discard(policy_number)
+    invalidate_policy_cache(policy_number)
     print(f"Policy {policy_number} deleted successfully.")
     return True
 
@@ -0,0 +1,114 @@
+import bisect
+import threading
+import time
+
+import pandas as pd
+
+from src.resubmission.database import read_data
+
+
+class VisitIndex:
+    """
+    In-memory list of visit IDs ordered by creation date, for the home page dropdown.
+
+    The first access loads the full list, later refreshes only fetch visits created
+    since the last seen CreatedDate (the watermark). Refreshes happen on access once
+    the data is older than refresh_interval seconds; while one request refreshes,
+    the others keep serving the current list.
+
+    Args:
+        full_query (str): SQL returning VisitID and CreatedDate of every visit.
+        since_query (str): Same query restricted to CreatedDate >= ? (the watermark).
+        db_name (str): passcode.json entry to read from.
+        refresh_interval (float): Seconds before the list is considered stale.
+    """
+
+    def __init__(self, full_query, since_query, db_name, refresh_interval=300.0):
+        self.full_query = full_query
+        self.since_query = since_query
+        self.db_name = db_name
+        self.refresh_interval = refresh_interval
+        # (ascending CreatedDate list, aligned VisitID list), swapped as a whole on refresh
+        self._snapshot = ([], [])
+        self._seen = set()
+        self._watermark = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Fetches visits created since the watermark, or every visit on the first call."""
+        if self._watermark is None:
+            df = read_data(self.full_query, self.db_name, params=None)
+        else:
+            df = read_data(
+                self.since_query, self.db_name, params=(self._watermark.to_pydatetime(),)
+            )
+
+        df = df.dropna(subset=["VisitID", "CreatedDate"])
+        df["CreatedDate"] = pd.to_datetime(df["CreatedDate"])
+        dates, ids = (list(entries) for entries in self._snapshot)
+        for visit_id, created in zip(df["VisitID"], df["CreatedDate"]):
+            visit_id = str(visit_id)
+            if visit_id in self._seen:
+                continue
+            i = bisect.bisect_right(dates, created)
+            dates.insert(i, created)
+            ids.insert(i, visit_id)
+            self._seen.add(visit_id)
+
+        self._snapshot = (dates, ids)
+        if dates:
+            self._watermark = dates[-1]
+        self._refreshed_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._refreshed_at is None:
+            with self._lock:
+                if self._refreshed_at is None:
+                    self.refresh()
+            return
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        # Only one request refreshes, the others serve the current list
+        if self._lock.acquire(blocking=False):
+            try:
+                self.refresh()
+            finally:
+                self._lock.release()
+
+    def search(self, prefix="", start_date=None, end_date=None, limit=50, offset=0):
+        """
+        Pages through visit IDs from most to least recent.
+
+        Args:
+            prefix (str): Keep only visit IDs starting with this text.
+            start_date, end_date: Optional CreatedDate bounds (inclusive), anything
+                pandas.Timestamp accepts.
+            limit (int): Page size.
+            offset (int): Number of matching visits to skip.
+
+        Returns:
+            dict: {"total": number of matches, "visits": [{"visit_id", "created_date"}]}
+        """
+        self._ensure_fresh()
+        dates, ids = self._snapshot
+
+        lo = bisect.bisect_left(dates, pd.Timestamp(start_date)) if start_date else 0
+        hi = len(dates)
+        if end_date:
+            next_day = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+            hi = bisect.bisect_left(dates, next_day)
+
+        newest_first = range(hi - 1, lo - 1, -1)
+        prefix = (prefix or "").strip()
+        if prefix:
+            matches = [i for i in newest_first if ids[i].startswith(prefix)]
+        else:
+            matches = newest_first
+        page = matches[offset : offset + limit]
+        return {
+            "total": len(matches),
+            "visits": [
+                {"visit_id": ids[i], "created_date": dates[i].isoformat()} for i in page
+            ],
+        }
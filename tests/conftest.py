@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """The policy models connected to an empty in-memory mongomock database."""
+    mongomock = pytest.importorskip("mongomock")
+    mongoengine = pytest.importorskip("mongoengine")
+    from src.resubmission import models, policy_index
+
+    mongoengine.connect(
+        "resubmission_test",
+        host="mongodb://localhost",
+        mongo_client_class=mongomock.MongoClient,
+        uuidRepresentation="standard",
+    )
+    monkeypatch.setattr(models, "_connected", True)
+    monkeypatch.setattr(policy_index, "_indexes", {})
+    yield mongomock
+    mongoengine.disconnect()
+    for model in (models.Policy, models.NCCI_Policy):
+        model._collection = None
@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.resubmission.answer_cache import AnswerCache, normalize_question  # noqa: E402
+
+KEY = ("100", "vip", "context-a")
+
+
+class FakeEmbedder:
+    """Maps each question to a fixed unit vector."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __call__(self, texts):
+        return [np.asarray(self.vectors[t], dtype=np.float32) for t in texts]
+
+
+def test_normalize_question():
+    assert normalize_question("  Is Dental   covered?? ") == "is dental covered"
+
+
+def test_exact_match_after_normalization():
+    cache = AnswerCache()
+    cache.set(KEY, "Is dental covered?", "Yes, up to SAR 2,000.")
+    assert cache.get(KEY, "is dental covered") == "Yes, up to SAR 2,000."
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_answers_are_scoped_to_their_context():
+    cache = AnswerCache()
+    cache.set(KEY, "Is optical covered?", "No information in the policy.")
+    assert cache.get(("100", "vip", "context-b"), "Is optical covered?") is None
+    assert cache.get(("100", "a", "context-a"), "Is optical covered?") is None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = AnswerCache(ttl=0)
+    cache.set(KEY, "Is dental covered?", "Yes.")
+    assert cache.get(KEY, "Is dental covered?") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_drops_policy_answers():
+    cache = AnswerCache()
+    cache.set(KEY, "Is dental covered?", "Yes.")
+    cache.set(("200", "vip", "context-a"), "Is dental covered?", "No.")
+    cache.invalidate("100")
+    assert cache.get(KEY, "Is dental covered?") is None
+    assert cache.get(("200", "vip", "context-a"), "Is dental covered?") == "No."
+
+
+def test_semantic_match_above_threshold():
+    embedder = FakeEmbedder(
+        {
+            "is dental covered": [1.0, 0.0],
+            "are dental treatments covered": [0.96, 0.28],
+            "is optical covered": [0.0, 1.0],
+        }
+    )
+    cache = AnswerCache(embedder=embedder, threshold=0.9)
+    cache.set(KEY, "Is dental covered?", "Yes.")
+    assert cache.get(KEY, "Are dental treatments covered?") == "Yes."
+    assert cache.get(KEY, "Is optical covered?") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_vectors_are_pruned_on_set():
+    embedder = FakeEmbedder({f"q{i}": [1.0, float(i)] for i in range(10)})
+    cache = AnswerCache(maxsize=2, embedder=embedder)
+    for i in range(10):
+        cache.set(KEY, f"q{i}", f"a{i}")
+    assert sum(map(len, cache._vectors.values())) <= 3
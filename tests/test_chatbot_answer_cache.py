@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+pytest.importorskip("numpy")
+
+from src.resubmission import chatbot  # noqa: E402
+from src.resubmission.answer_cache import AnswerCache  # noqa: E402
+
+POLICY_KEY = ("100", "vip")
+
+
+class FakeAgent:
+    """Answers with a counter and keeps the messages of each thread in memory."""
+
+    def __init__(self):
+        self.threads = {}
+        self.calls = 0
+
+    def _answer(self, thread_id, user_input):
+        self.calls += 1
+        answer = f"answer {self.calls}"
+        self.threads.setdefault(thread_id, []).extend([user_input, answer])
+        return answer
+
+    def is_new_thread(self, thread_id):
+        return not self.threads.get(thread_id)
+
+    async def ais_new_thread(self, thread_id):
+        return self.is_new_thread(thread_id)
+
+    def record_exchange(self, thread_id, policy, visit_info, user_input, answer):
+        self.threads.setdefault(thread_id, []).extend([user_input, answer])
+
+    async def arecord_exchange(self, *args):
+        self.record_exchange(*args)
+
+    def respond(self, thread_id, policy, visit_info, user_input):
+        return self._answer(thread_id, user_input)
+
+    def stream_respond(self, thread_id, policy, visit_info, user_input):
+        yield self._answer(thread_id, user_input)
+
+    async def astream_respond(self, thread_id, policy, visit_info, user_input):
+        yield self._answer(thread_id, user_input)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    fake = FakeAgent()
+    monkeypatch.setattr(chatbot, "get_agent", lambda: fake)
+    monkeypatch.setattr(chatbot, "answer_cache", AnswerCache())
+    return fake
+
+
+def ask(thread_id, question, visit_info="visit 1", mode="sync"):
+    args = (question, thread_id, "policy digest", visit_info)
+    if mode == "sync":
+        return chatbot.get_agent_response(*args, cache_key=POLICY_KEY)
+    if mode == "stream":
+        return "".join(chatbot.stream_agent_response(*args, cache_key=POLICY_KEY))
+
+    async def collect():
+        chunks = chatbot.astream_agent_response(*args, cache_key=POLICY_KEY)
+        return "".join([chunk async for chunk in chunks])
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("mode", ["sync", "stream", "async"])
+def test_answer_reused_for_the_same_context(agent, mode):
+    assert ask("t1", "Is dental covered?", mode=mode) == "answer 1"
+    assert ask("t2", "Is dental covered?", mode=mode) == "answer 1"
+    assert agent.calls == 1
+    assert agent.threads["t2"] == ["Is dental covered?", "answer 1"]
+
+
+@pytest.mark.parametrize("mode", ["sync", "stream", "async"])
+def test_policy_question_is_served_across_visits_and_turns(agent, mode):
+    ask("t1", "Is optical covered?", visit_info="dental visit", mode=mode)
+    ask("t2", "What is the dental limit?", visit_info="optical visit", mode=mode)
+    assert ask("t2", "is OPTICAL covered", visit_info="optical visit", mode=mode) == (
+        "answer 1"
+    )
+    assert agent.calls == 2
+
+
+@pytest.mark.parametrize("mode", ["sync", "stream", "async"])
+def test_visit_question_is_not_served_for_another_visit(agent, mode):
+    question = "Is this service covered?"
+    ask("t1", question, visit_info="dental visit", mode=mode)
+    assert ask("t2", question, visit_info="optical visit", mode=mode) == "answer 2"
+    assert ask("t3", question, visit_info="dental visit", mode=mode) == "answer 1"
+
+
+@pytest.mark.parametrize("mode", ["sync", "stream", "async"])
+def test_follow_up_questions_are_not_cached(agent, mode):
+    ask("t1", "Is dental covered?", mode=mode)
+    ask("t1", "And orthodontics?", mode=mode)
+    ask("t2", "Is optical covered?", mode=mode)
+    assert ask("t2", "And orthodontics?", mode=mode) == "answer 4"
+
+
+@pytest.mark.parametrize(
+    "question, standalone",
+    [
+        ("Is dental covered?", True),
+        ("What is the maternity limit for VIP?", True),
+        ("Is this service covered?", False),
+        ("Why was the claim rejected?", False),
+        ("and for optical?", False),
+        ("What about its co-pay?", False),
+        (None, False),
+    ],
+)
+def test_is_standalone_question(question, standalone):
+    assert chatbot.is_standalone_question(question) is standalone
+
+
+def test_answer_cache_key_hashes_policy_and_visit():
+    key = chatbot.answer_cache_key(POLICY_KEY, "policy", "visit")
+    assert key[:2] == POLICY_KEY
+    assert key != chatbot.answer_cache_key(POLICY_KEY, "policy", "other visit")
+    assert key != chatbot.answer_cache_key(POLICY_KEY, "other policy", "visit")
+    assert key != chatbot.answer_cache_key(POLICY_KEY, "policy")
+    assert chatbot.answer_cache_key(POLICY_KEY, "other policy") != (
+        chatbot.answer_cache_key(POLICY_KEY, "policy")
+    )
+
+
+def test_invalidate_policy_cache_drops_the_answers(agent, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("mongoengine")
+    from src.resubmission import utils
+
+    monkeypatch.setattr(utils, "answer_cache", chatbot.answer_cache)
+    ask("t1", "Is dental covered?", visit_info="visit 1")
+    assert ask("t2", "Is dental covered?", visit_info="visit 2") == "answer 1"
+
+    utils.invalidate_policy_cache(" 100 ")
+
+    assert ask("t3", "Is dental covered?", visit_info="visit 3") == "answer 2"
+    assert chatbot.answer_cache.stats()["exact_hits"] == 1
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+
+from src.resubmission.chatbot import InsuranceAgent  # noqa: E402
+
+
+def chunk(content):
+    return SimpleNamespace(content=content)
+
+
+STREAM = [
+    (chunk("Covered"), {"langgraph_node": "llm"}),
+    (chunk(""), {"langgraph_node": "llm"}),
+    (chunk("summary text"), {"langgraph_node": "trim_history"}),
+    (chunk(" up to 500 SAR"), {"langgraph_node": "llm"}),
+]
+
+
+class FakeGraph:
+    def stream(self, state, thread, version, stream_mode):
+        assert stream_mode == "messages"
+        yield from STREAM
+
+    async def astream(self, state, thread, version, stream_mode):
+        for item in STREAM:
+            yield item
+
+
+@pytest.fixture
+def agent():
+    agent = InsuranceAgent.__new__(InsuranceAgent)  # no model client nor checkpointer
+    agent.graph = FakeGraph()
+    return agent
+
+
+def test_iter_stream_forwards_llm_chunks_only(agent):
+    chunks = list(agent._iter_stream({"messages": []}, {}))
+    assert chunks == ["Covered", " up to 500 SAR"]
+    assert agent._stream({"messages": []}, {}) == "Covered up to 500 SAR"
+
+
+def test_aiter_stream_forwards_llm_chunks_only(agent):
+    async def collect():
+        return [c async for c in agent._aiter_stream({"messages": []}, {})]
+
+    assert asyncio.run(collect()) == ["Covered", " up to 500 SAR"]
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: E402
+
+from src.resubmission.chatbot import SUMMARY_ID, InsuranceAgent  # noqa: E402
+
+TEXT = "x" * 400  # about 100 tokens per message
+
+
+class FakeLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.requests = []
+
+    def invoke(self, messages):
+        self.requests.append(messages)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return AIMessage(content=f"summary {len(self.requests)}")
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+def make_agent(llm=None, token_budget=1000):
+    agent = InsuranceAgent.__new__(InsuranceAgent)  # no model client nor checkpointer
+    agent.llm = llm or FakeLLM()
+    agent.model = "test-model"
+    agent.token_budget = token_budget
+    agent._pinned_over_budget = False
+    return agent
+
+
+def context(n=1):
+    return [SystemMessage(content=TEXT, id=f"context-{i}") for i in range(n)]
+
+
+def turns(n, start=0):
+    messages = []
+    for i in range(start, start + n):
+        messages.append(HumanMessage(content=TEXT, id=f"q{i}"))
+        messages.append(AIMessage(content=TEXT, id=f"a{i}"))
+    return messages
+
+
+def trimmed(update):
+    return update["messages"].value
+
+
+def ids(messages):
+    return [m.id for m in messages]
+
+
+def test_history_within_budget_is_left_alone():
+    agent = make_agent()
+    assert agent._trim_history({"messages": context() + turns(2)}) == {}
+    assert agent.llm.requests == []
+
+
+def test_pinned_context_is_kept_and_evicted_turns_summarized():
+    agent = make_agent()
+    messages = context() + turns(5)
+
+    result = trimmed(agent._trim_history({"messages": messages}))
+
+    assert ids(result) == ["context-0", SUMMARY_ID, "q4", "a4"]
+    assert result[1].content.endswith("summary 1")
+    transcript = agent.llm.requests[0][1].content
+    assert transcript.count("Human:") == 4 and transcript.count("AI:") == 4
+
+
+def test_kept_history_never_starts_with_an_answer():
+    agent = make_agent()
+    # a3, q4 and a4 fit in the target, a3 is evicted with its question q3
+    plan = agent._plan_trim(context() + turns(5))
+    pinned, summary, evicted, kept, summarize = plan
+    assert ids(evicted)[-1] == "a3"
+    assert isinstance(kept[0], HumanMessage)
+    assert summarize
+
+
+def test_previous_summary_is_folded_into_the_next_one():
+    agent = make_agent()
+    state = trimmed(agent._trim_history({"messages": context() + turns(5)}))
+    state += turns(4, start=5)
+
+    result = trimmed(agent._trim_history({"messages": state}))
+
+    assert result[1].content.endswith("summary 2")
+    assert "Summary so far:\nSummary of the earlier conversation:\nsummary 1" in (
+        agent.llm.requests[1][1].content
+    )
+
+
+def test_trimming_leaves_room_for_a_few_turns():
+    agent = make_agent()
+    state = trimmed(agent._trim_history({"messages": context() + turns(5)}))
+    state += turns(1, start=5)
+    assert agent._trim_history({"messages": state}) == {}
+    assert len(agent.llm.requests) == 1
+
+
+def test_summary_failure_keeps_the_previous_summary(caplog):
+    agent = make_agent()
+    state = trimmed(agent._trim_history({"messages": context() + turns(5)}))
+    agent.llm.fail = True
+    state += turns(4, start=5)
+
+    with caplog.at_level(logging.WARNING):
+        result = trimmed(agent._trim_history({"messages": state}))
+
+    assert result[0].id == "context-0"
+    assert result[1].content == "Summary of the earlier conversation:\nsummary 1"
+    assert "History summary failed" in caplog.text
+
+
+def test_async_summary_failure_without_previous_summary():
+    agent = make_agent(FakeLLM(fail=True))
+    result = trimmed(
+        asyncio.run(agent._atrim_history({"messages": context() + turns(5)}))
+    )
+    assert ids(result) == ["context-0", "q4", "a4"]
+
+
+def test_pinned_context_over_budget_truncates_without_summary(caplog):
+    agent = make_agent()
+    with caplog.at_level(logging.WARNING):
+        for n in (3, 4):
+            result = trimmed(agent._trim_history({"messages": context(7) + turns(n)}))
+            assert ids(result)[:7] == [f"context-{i}" for i in range(7)]
+            assert ids(result)[7:] == [f"a{n - 1}"]
+    assert agent.llm.requests == []
+    assert caplog.text.count("leaves no room for history") == 1
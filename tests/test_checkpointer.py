@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+
+from src.resubmission import checkpointer as checkpointer_module  # noqa: E402
+from src.resubmission.checkpointer import BoundedSqliteSaver  # noqa: E402
+
+
+def make_saver(**kwargs):
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    saver = BoundedSqliteSaver(conn, **kwargs)
+    saver.setup()
+    return saver
+
+
+def put(saver, thread_id, count=1):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for _ in range(count):
+        config = saver.put(config, empty_checkpoint(), {}, {})
+    return config
+
+
+def checkpoint_count(saver, thread_id):
+    return saver.conn.execute(
+        "SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)
+    ).fetchone()[0]
+
+
+def test_keeps_latest_checkpoints_per_thread():
+    saver = make_saver(max_checkpoints=3)
+    last = put(saver, "t1", count=5)
+    put(saver, "t2", count=2)
+
+    assert checkpoint_count(saver, "t1") == 3
+    assert checkpoint_count(saver, "t2") == 2
+    latest = saver.get_tuple({"configurable": {"thread_id": "t1"}})
+    assert latest.config["configurable"]["checkpoint_id"] == (
+        last["configurable"]["checkpoint_id"]
+    )
+
+
+def test_deletes_inactive_threads_after_ttl(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(checkpointer_module.time, "time", lambda: now[0])
+    saver = make_saver(ttl=60, prune_interval=0)
+    put(saver, "old")
+    now[0] += 120
+    put(saver, "new")
+
+    assert checkpoint_count(saver, "old") == 0
+    assert checkpoint_count(saver, "new") == 1
+
+
+def test_delete_thread_clears_activity():
+    saver = make_saver()
+    put(saver, "t1")
+    saver.delete_thread("t1")
+    rows = saver.conn.execute("SELECT * FROM thread_activity").fetchall()
+    assert rows == []
+    assert checkpoint_count(saver, "t1") == 0
@@ -0,0 +1,68 @@
+from src.resubmission.class_aliases import (
+    alias_key,
+    build_class_aliases,
+    contract_form,
+    resolve_class,
+    tier_variants,
+)
+
+
+def test_alias_key():
+    assert alias_key(" Class A+ ") == "classa+"
+    assert alias_key("VIP-Gold.") == "vipgold"
+    assert alias_key(None) == ""
+
+
+def test_contract_form():
+    assert contract_form("Bupa VIP+") == "VIP+"
+    assert contract_form("Class A+") == "A+"
+    assert contract_form("Class B") == "B"
+    assert contract_form("Gold") == "Gold"
+
+
+def test_tier_variants():
+    assert tier_variants("vvip", "vip")
+    assert tier_variants("vip+", "vip")
+    assert tier_variants("gold2", "gold")
+    assert not tier_variants("vip", "vip")
+    assert not tier_variants("platinum", "platinium")
+
+
+def test_build_aliases_by_name_contract_and_stripped_name():
+    aliases = build_class_aliases(["Class A+", "VIP", "Class B", None, " "])
+    assert aliases == {
+        "classa+": ["Class A+", 1.0],
+        "a+": ["Class A+", 0.95],
+        "vip": ["VIP", 1.0],
+        "classb": ["Class B", 1.0],
+        "b": ["Class B", 0.95],
+    }
+
+
+def test_fuzzy_aliases_never_cross_tiers():
+    aliases = build_class_aliases(["Class A+", "VIP", "Class B"])
+    assert "vvip" not in aliases
+    assert "vip+" not in aliases
+    assert "a" not in aliases
+    assert "gold" not in build_class_aliases(["Gold 2"])
+
+
+def test_fuzzy_alias_of_a_misspelled_class():
+    aliases = build_class_aliases(["Platinium", "Golden"])
+    assert aliases["platinum"] == ["Platinium", 0.941]
+    assert aliases["gold"] == ["Golden", 0.8]
+
+
+def test_ambiguous_fuzzy_match_is_skipped():
+    assert "silver" not in build_class_aliases(["Silvr", "Silve"])
+
+
+def test_resolve_class():
+    aliases = build_class_aliases(["Class A+", "VIP", "Platinium"])
+    assert resolve_class(aliases, "a+") == "Class A+"
+    assert resolve_class(aliases, " VIP ") == "VIP"
+    assert resolve_class(aliases, "VVIP") is None
+    assert resolve_class(aliases, "Platinum") == "Platinium"
+    assert resolve_class(aliases, "Platinum", min_score=0.95) is None
+    assert resolve_class(None, "VIP") is None
+    assert resolve_class(aliases, None) is None
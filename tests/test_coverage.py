@@ -0,0 +1,182 @@
+import pytest
+
+pytest.importorskip("mongoengine")
+
+from src.resubmission.coverage import (  # noqa: E402
+    class_views,
+    flatten_ncci_class,
+    payer_kind,
+)
+from src.resubmission.models import (  # noqa: E402
+    Benefit,
+    CaseCoverage,
+    CoverageDetail,
+    NCCI_Policy,
+    Policy,
+    PolicyClass,
+    SubCoverage,
+)
+
+
+@pytest.mark.parametrize(
+    "payer, kind",
+    [
+        ("Bupa Arabia for Cooperative Insurance", "policy"),
+        ("BUPA", "policy"),
+        ("NCCI", "ncci"),
+        ("The National Company for Cooperative Insurance (ncci)", "ncci"),
+        ("Tawuniya", None),
+        ("", None),
+        (None, None),
+        (42, None),
+    ],
+)
+def test_payer_kind(payer, kind):
+    assert payer_kind(payer) == kind
+
+
+def ncci_policy(*classes, **fields):
+    return NCCI_Policy(
+        policy_number="48594944",
+        classes=list(classes),
+        coverage=fields.get("coverage", "Worldwide"),
+        exclusion=fields.get("exclusion"),
+    )
+
+
+def case(name, share):
+    return CaseCoverage(
+        case_name=name,
+        patient_share=share,
+        max_patient_share="",
+        max_consultation_fee=None,
+        approval_threshold="500",
+    )
+
+
+FULL_CLASS = PolicyClass(
+    class_code="A+",
+    class_limit="1,000,000",
+    room_type="Private",
+    room_limit="1200",
+    benefits=[
+        Benefit(
+            benefit_code="B01",
+            description="Dental Treatment",
+            limit="2,000",
+            cases=[case("Emergency", "0%"), case("Routine", "20%")],
+            sub_coverages=[
+                SubCoverage(
+                    sub_coverage_code="S1",
+                    description="Scaling",
+                    limit="300",
+                    approval_threshold=None,
+                )
+            ],
+        ),
+        Benefit(benefit_code="B02", description="Optical", limit="500"),
+        # Same description as another benefit, told apart by its code
+        Benefit(benefit_code="B03", description="Optical", limit="700"),
+    ],
+)
+
+# Only the required fields, no benefits nor limits
+BARE_CLASS = PolicyClass(class_code="C", room_type="Ward", room_limit="")
+
+
+@pytest.mark.parametrize(
+    "policy_class, expected",
+    [
+        (
+            FULL_CLASS,
+            {
+                "class_limit": "1,000,000",
+                "coverage": "Worldwide",
+                "dental_treatment": (
+                    "Limit: 2,000"
+                    " | Emergency: patient share 0%, approval threshold 500"
+                    " | Routine: patient share 20%, approval threshold 500"
+                    " | Scaling: limit 300"
+                ),
+                "optical": "Limit: 500",
+                "optical_b03": "Limit: 700",
+                "room_limit": "1200",
+                "room_type": "Private",
+                "vip_level": "A+",
+            },
+        ),
+        (
+            BARE_CLASS,
+            {"coverage": "Worldwide", "room_type": "Ward", "vip_level": "C"},
+        ),
+    ],
+)
+def test_flatten_ncci_class(policy_class, expected):
+    view = flatten_ncci_class(ncci_policy(policy_class), policy_class)
+    assert view == expected
+    assert list(view) == sorted(view)
+
+
+def test_flatten_ncci_benefit_without_cases_nor_limit():
+    benefit = Benefit(benefit_code="B09", description="", limit="")
+    policy_class = PolicyClass(
+        class_code="B", room_type="Ward", room_limit="0", benefits=[benefit]
+    )
+    view = flatten_ncci_class(ncci_policy(policy_class, coverage=None), policy_class)
+    # Named after its code, left out as it holds no text
+    assert "b09" not in view
+    assert view["vip_level"] == "B"
+
+
+def test_class_views_of_both_kinds():
+    ncci = ncci_policy(FULL_CLASS, BARE_CLASS)
+    assert [name for name, _ in class_views("ncci", ncci)] == ["A+", "C"]
+
+    bupa = Policy(
+        policy_number="513508002",
+        coverage_details=[
+            CoverageDetail(vip_level="VIP", optical="1,000", dental_general="2,000"),
+            CoverageDetail(vip_level="A"),
+        ],
+    )
+    views = class_views("policy", bupa)
+    assert [name for name, _ in views] == ["VIP", "A"]
+    assert views[0][1] == {
+        "dental_general": "2,000",
+        "optical": "1,000",
+        "vip_level": "VIP",
+    }
+
+
+class FakeIndex:
+    def __init__(self, numbers):
+        self.numbers = numbers
+
+    def resolve(self, policy_number):
+        return self.numbers.get(policy_number)
+
+
+@pytest.mark.parametrize(
+    "number, payer, expected",
+    [
+        ("513508002", "Bupa Arabia", ("policy", "513508002")),
+        ("48594944", "NCCI", ("ncci", "48594944-01")),
+        # The payer picks the collection, a number of the other one is not found
+        ("48594944", "Bupa Arabia", (None, None)),
+        ("513508002", "NCCI", (None, None)),
+        # Unknown payer: every collection is tried in turn
+        ("48594944", "Tawuniya", ("ncci", "48594944-01")),
+        ("513508002", None, ("policy", "513508002")),
+        ("000", None, (None, None)),
+    ],
+)
+def test_resolve_policy_number_routes_by_payer(monkeypatch, number, payer, expected):
+    pytest.importorskip("pandas")
+    from src.resubmission import utils
+
+    indexes = {
+        Policy: FakeIndex({"513508002": "513508002"}),
+        NCCI_Policy: FakeIndex({"48594944": "48594944-01"}),
+    }
+    monkeypatch.setattr(utils, "get_policy_index", indexes.__getitem__)
+    assert utils.resolve_policy_number(number, payer) == expected
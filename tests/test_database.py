@@ -0,0 +1,395 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pandas")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from src.resubmission import database  # noqa: E402
+from src.resubmission.database import (  # noqa: E402
+    CircuitBreaker,
+    DatabaseUnavailableError,
+    RetryPolicy,
+)
+
+
+class FakeClock:
+    """monotonic() whose sleep() only moves the clock forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(database.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(database.time, "sleep", fake.sleep)
+    return fake
+
+
+@pytest.fixture
+def entries(monkeypatch):
+    """Replica fails over to Live, engines are stood in for by the entry names."""
+    configs = {"Replica": {"failover": "Live"}, "Live": {}}
+    monkeypatch.setattr(database, "get_db_configs", lambda: configs)
+    monkeypatch.setattr(database, "get_engine", lambda name: name)
+    monkeypatch.setattr(database, "_breakers", {})
+    return configs
+
+
+def connection_error():
+    return OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+
+class FakeRun:
+    """run(engine) failing with a connection error for the entries in down."""
+
+    def __init__(self, down=(), failures=None):
+        self.down = set(down)
+        self.failures = failures  # fail this many calls, then answer
+        self.calls = []
+
+    def __call__(self, engine):
+        self.calls.append(engine)
+        if engine in self.down:
+            raise connection_error()
+        if self.failures:
+            self.failures -= 1
+            raise connection_error()
+        return f"rows from {engine}"
+
+
+def test_backoff_ceiling_doubles_up_to_max_delay(monkeypatch):
+    monkeypatch.setattr(database.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0)
+    assert [policy.backoff(a) for a in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+
+
+def test_backoff_is_jittered_from_zero(monkeypatch):
+    monkeypatch.setattr(database.random, "uniform", lambda low, high: low)
+    assert RetryPolicy().backoff(3) == 0
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_trial_call_through_after_reset_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # the others wait for the trial call
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_breaker_reopens_when_the_trial_call_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+
+
+def test_failover_chain_stops_at_cycles_and_unknown_entries(monkeypatch):
+    configs = {
+        "Replica": {"failover": "Live"},
+        "Live": {"failover": "Replica"},
+        "Other": {"failover": "Missing"},
+    }
+    monkeypatch.setattr(database, "get_db_configs", lambda: configs)
+    assert database.failover_chain("Replica") == ["Replica", "Live"]
+    assert database.failover_chain("Other") == ["Other"]
+
+
+def test_transient_error_is_retried(entries, clock):
+    run = FakeRun(failures=2)
+    assert database._run_with_failover("Replica", run) == "rows from Replica"
+    assert run.calls == ["Replica"] * 3
+    assert len(clock.sleeps) == 2
+    assert database.get_breaker("Replica").failures == 0
+
+
+def test_fails_over_after_the_attempts_of_an_entry(entries, clock):
+    run = FakeRun(down={"Replica"})
+    policy = RetryPolicy(attempts=3, deadline=60.0)
+    assert database._run_with_failover("Replica", run, policy) == "rows from Live"
+    assert run.calls == ["Replica"] * 3 + ["Live"]
+    # No backoff after the last attempt of an entry
+    assert len(clock.sleeps) == 2
+    assert database.get_breaker("Replica").failures == 1
+
+
+def test_other_errors_are_not_retried(entries, clock):
+    calls = []
+
+    def run(engine):
+        calls.append(engine)
+        raise ValueError("Incorrect syntax")
+
+    with pytest.raises(ValueError):
+        database._run_with_failover("Replica", run)
+    assert calls == ["Replica"]
+
+
+def test_unavailable_error_chains_the_last_failure(entries, clock):
+    run = FakeRun(down={"Replica", "Live"})
+    with pytest.raises(DatabaseUnavailableError) as info:
+        database._run_with_failover("Replica", run, RetryPolicy(deadline=60.0))
+    assert isinstance(info.value.__cause__, OperationalError)
+    assert run.calls == ["Replica"] * 3 + ["Live"] * 3
+
+
+def test_deadline_bounds_the_total_time(entries, clock, monkeypatch):
+    monkeypatch.setattr(database.random, "uniform", lambda low, high: high)
+    start = clock.now
+    run = FakeRun(down={"Replica", "Live"})
+    policy = RetryPolicy(attempts=10, base_delay=1.0, max_delay=4.0, deadline=5.0)
+    with pytest.raises(DatabaseUnavailableError):
+        database._run_with_failover("Replica", run, policy)
+    # Replica sleeps 1 and 2 seconds, a 4 second backoff would overrun the deadline
+    # so it fails over; Live then only has time for one backoff
+    assert clock.sleeps == [1.0, 2.0, 1.0]
+    assert clock.now - start < policy.deadline
+    assert run.calls == ["Replica"] * 3 + ["Live"] * 2
+
+
+def test_open_circuit_skips_the_entry(entries, clock):
+    run = FakeRun(down={"Replica"})
+    policy = RetryPolicy(attempts=1, deadline=60.0)
+    for _ in range(3):
+        assert database._run_with_failover("Replica", run, policy) == "rows from Live"
+    assert database.get_breaker("Replica").state == "open"
+
+    run.calls.clear()
+    assert database._run_with_failover("Replica", run, policy) == "rows from Live"
+    assert run.calls == ["Live"]
+
+    # After the reset timeout one trial call goes back to the recovered primary
+    clock.now += database.get_breaker("Replica").reset_timeout
+    run.down.clear()
+    run.calls.clear()
+    assert database._run_with_failover("Replica", run, policy) == "rows from Replica"
+    assert database.get_breaker("Replica").state == "closed"
+
+
+def test_read_data_raises_unavailable_when_every_entry_is_down(
+    entries, clock, monkeypatch
+):
+    def read_sql_query(query, engine, params=None):
+        raise connection_error()
+
+    monkeypatch.setattr(database.pd, "read_sql_query", read_sql_query)
+    with pytest.raises(DatabaseUnavailableError):
+        database.read_data("SELECT 1", "Replica", None, RetryPolicy(deadline=60.0))
+
+
+@pytest.fixture
+def sqlite_engines(monkeypatch, tmp_path):
+    """get_engine over SQLite files, recording the pool options of each engine."""
+    from sqlalchemy import create_engine
+
+    options = {}
+
+    def get_conn_engine(passcodes, **pool_options):
+        options[passcodes["Database"]] = pool_options
+        path = tmp_path / passcodes["Database"]
+        return create_engine(f"sqlite:///{path}", **pool_options)
+
+    monkeypatch.setattr(database, "get_conn_engine", get_conn_engine)
+    monkeypatch.setattr(database, "_engines", {})
+    monkeypatch.setattr(database, "_connect_counts", {})
+    yield options
+    database.dispose_engines()
+
+
+def test_pool_timeout_is_capped_at_the_retry_deadline(sqlite_engines, monkeypatch):
+    configs = {
+        "Replica": {"Database": "replica.db", "pool": {"pool_timeout": 60}},
+        "Live": {"Database": "live.db"},
+    }
+    monkeypatch.setattr(database, "get_db_configs", lambda: configs)
+    database.get_engine("Replica")
+    database.get_engine("Live")
+    deadline = database.DEFAULT_RETRY_POLICY.deadline
+    assert sqlite_engines["replica.db"]["pool_timeout"] == deadline
+    assert sqlite_engines["live.db"]["pool_timeout"] <= deadline
+
+
+def test_get_engine_shares_one_engine_per_entry(sqlite_engines, monkeypatch):
+    configs = {"Replica": {"Database": "replica.db"}, "Live": {"Database": "live.db"}}
+    monkeypatch.setattr(database, "get_db_configs", lambda: configs)
+
+    replica = database.get_engine("Replica")
+
+    assert database.get_engine("Replica") is replica
+    assert database.get_engine("Live") is not replica
+    assert list(sqlite_engines) == ["replica.db", "live.db"]
+
+
+def test_get_engine_applies_the_pool_options_of_the_entry(sqlite_engines, monkeypatch):
+    configs = {"Replica": {"Database": "replica.db", "pool": {"pool_size": 2}}}
+    monkeypatch.setattr(database, "get_db_configs", lambda: configs)
+
+    engine = database.get_engine("Replica")
+
+    assert sqlite_engines["replica.db"] == {
+        **database.DEFAULT_POOL_OPTIONS,
+        "pool_size": 2,
+    }
+    assert engine.pool.size() == 2
+
+
+def test_pool_stats_and_dispose_engines(sqlite_engines, monkeypatch):
+    configs = {"Replica": {"Database": "replica.db"}}
+    monkeypatch.setattr(database, "get_db_configs", lambda: configs)
+    engine = database.get_engine("Replica")
+    with engine.connect():
+        stats = database.pool_stats()["Replica"]
+        assert stats["checked_out"] == 1
+        assert stats["connections_opened"] == 1
+    assert database.pool_stats()["Replica"]["checked_in"] == 1
+
+    database.dispose_engines()
+
+    assert database._engines == {}
+    assert database.pool_stats() == {}
+    assert database.get_engine("Replica") is not engine
+
+
+class FakeConnection:
+    """Records the statements run on one pooled connection."""
+
+    def __init__(self, log, failing=()):
+        self.log = log
+        self.failing = failing
+
+    def __enter__(self):
+        self.log.append(("connect",))
+        return self
+
+    def __exit__(self, *exc):
+        self.log.append(("close",))
+
+    def exec_driver_sql(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.log.append((sql, params))
+        if sql in self.failing:
+            raise connection_error()
+
+
+class FakeEngine:
+    def __init__(self, failing=()):
+        self.log = []
+        self.failing = failing
+
+    def connect(self):
+        return FakeConnection(self.log, self.failing)
+
+
+@pytest.fixture
+def visit_ids_db(entries, clock, monkeypatch):
+    """A Replica engine whose queries return one row per call, or fail if told to."""
+    engine = FakeEngine()
+    monkeypatch.setattr(database, "get_engine", lambda name: engine)
+    engine.query_error = None
+
+    def read_sql_query(query, conn, params=None):
+        conn.log.append(("query", query))
+        if engine.query_error:
+            raise engine.query_error
+        return database.pd.DataFrame({"VisitID": [1]})
+
+    monkeypatch.setattr(database.pd, "read_sql_query", read_sql_query)
+    return engine
+
+
+CREATE = [
+    ("connect",),
+    ("IF OBJECT_ID('tempdb..#VisitIds') IS NOT NULL DROP TABLE #VisitIds", None),
+    ("CREATE TABLE #VisitIds (VisitID BIGINT PRIMARY KEY)", None),
+]
+INSERT = "INSERT INTO #VisitIds (VisitID) VALUES (?)"
+DROP = [("DROP TABLE #VisitIds", None), ("close",)]
+
+
+def test_ids_are_loaded_in_chunks_on_the_query_connection(visit_ids_db, monkeypatch):
+    monkeypatch.setattr(database, "VISIT_IDS_CHUNK_SIZE", 2)
+
+    df = database.read_data_for_ids("SELECT ...", "Replica", ["5", 3, 5, 9, 1])
+
+    assert list(df["VisitID"]) == [1]
+    assert visit_ids_db.log == CREATE + [
+        (INSERT, [(5,), (3,)]),
+        (INSERT, [(9,), (1,)]),
+        ("query", "SELECT ..."),
+    ] + DROP
+
+
+def test_empty_id_list_inserts_nothing(visit_ids_db):
+    database.read_data_for_ids("SELECT ...", "Replica", [])
+    assert visit_ids_db.log == CREATE + [("query", "SELECT ...")] + DROP
+
+
+def test_id_query_fills_the_table_server_side(visit_ids_db):
+    database.read_data_for_id_query(
+        "SELECT ...", "Replica", "SELECT ID FROM Visit WHERE CreatedDate >= ?", ["2026"]
+    )
+    assert visit_ids_db.log == CREATE + [
+        (
+            "INSERT INTO #VisitIds (VisitID) SELECT ID FROM Visit WHERE CreatedDate >= ?",
+            ("2026",),
+        ),
+        ("query", "SELECT ..."),
+    ] + DROP
+
+
+def test_table_is_dropped_when_the_query_fails(visit_ids_db):
+    visit_ids_db.query_error = ValueError("Invalid column name")
+    with pytest.raises(ValueError):
+        database.read_data_for_ids("SELECT ...", "Replica", [1])
+    assert visit_ids_db.log[-3:] == [("query", "SELECT ...")] + DROP
+
+
+def test_lost_connection_keeps_the_query_error(visit_ids_db):
+    visit_ids_db.query_error = connection_error()
+    visit_ids_db.failing = ("DROP TABLE #VisitIds",)
+    with pytest.raises(DatabaseUnavailableError) as info:
+        database.read_data_for_ids(
+            "SELECT ...", "Replica", [1], RetryPolicy(attempts=1, deadline=60.0)
+        )
+    assert isinstance(info.value.__cause__, OperationalError)
+    # Retried on the failover entry, with the table created afresh each time
+    assert visit_ids_db.log.count(CREATE[2]) == 2
+
+
+def test_resubmission_sql_reads_the_visit_ids_table():
+    from pathlib import Path
+
+    sql = (Path(__file__).resolve().parents[1] / "SQL" / "resubmission.sql").read_text()
+    assert "FROM #VisitIds" in sql
+    assert "?" not in sql  # run without parameters once the table is filled
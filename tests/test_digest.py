@@ -0,0 +1,87 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from src.resubmission.digest import render_coverage_digest
+
+DETAIL = {
+    "vip_level": "VIP",
+    "optical": "Covered  up to\n1,000 SAR",
+    "dental_general": "Covered",
+    "maternity": "",
+    "network": None,
+    "sub_limits": {"frames": "500", "lenses": "500"},
+    "_id": "internal",
+}
+POLICY = SimpleNamespace(
+    policy_number="513508002",
+    company_name="Bupa Arabia",
+    policy_holder="Hala",
+    effective_from=date(2026, 1, 1),
+    effective_to=None,
+)
+
+
+def test_digest_is_canonical():
+    assert render_coverage_digest(DETAIL, POLICY) == "\n".join(
+        [
+            "Policy coverage details",
+            "policy_number: 513508002",
+            "company_name: Bupa Arabia",
+            "policy_holder: Hala",
+            "effective_from: 2026-01-01",
+            "dental_general: Covered",
+            "optical: Covered up to 1,000 SAR",
+            'sub_limits: {"frames":"500","lenses":"500"}',
+            "vip_level: VIP",
+        ]
+    )
+
+
+def test_digest_does_not_depend_on_dict_order():
+    reordered = dict(reversed(list(DETAIL.items())))
+    reordered["sub_limits"] = {"lenses": "500", "frames": "500"}
+    assert render_coverage_digest(reordered, POLICY).encode() == (
+        render_coverage_digest(DETAIL, POLICY).encode()
+    )
+
+
+def test_policy_digest_is_shared_by_the_visits_of_a_class(monkeypatch):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("mongoengine")
+    from src.resubmission import utils
+    from src.resubmission.cache import TTLCache
+
+    monkeypatch.setattr(utils, "digest_cache", TTLCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(utils, "POLICY_CONTEXT_TOP_K", 0)
+    visits = [
+        pd.DataFrame({"Med_Dept": ["Dental"], "Service_Name": ["Filling"]}),
+        pd.DataFrame({"Med_Dept": ["Optical"], "Service_Name": ["Frames"]}),
+    ]
+
+    digests = [utils.get_policy_digest(POLICY, dict(DETAIL), df) for df in visits]
+    digests.append(utils.get_policy_digest(POLICY, dict(reversed(DETAIL.items()))))
+
+    assert digests[0] == digests[1] == digests[2]
+    assert digests[0] == render_coverage_digest(DETAIL, POLICY)
+    assert utils.digest_cache.stats()["size"] == 1
+
+
+def test_system_context_orders_prompt_policy_visit():
+    pytest.importorskip("langgraph")
+    pytest.importorskip("langchain_fireworks")
+    from src.resubmission.chatbot import InsuranceAgent
+    from src.resubmission.prompt import chatbot_prompt
+
+    agent = InsuranceAgent.__new__(InsuranceAgent)  # no model client nor checkpointer
+    first = agent._system_context("policy digest", "visit 1")["messages"]
+    second = agent._system_context("policy digest", "visit 2")["messages"]
+
+    assert [m.id for m in first] == ["context-prompt", "context-policy", "context-visit"]
+    assert first[0].content == chatbot_prompt
+    assert first[1].content == "policy digest"
+    assert first[2].content.endswith("visit 1")
+    # Only the last message differs between visits of the same class
+    assert first[:2] == second[:2]
+    assert first[2] != second[2]
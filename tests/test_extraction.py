@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("mongoengine")
+
+from src.resubmission import extraction  # noqa: E402
+from src.resubmission.ingestion import MANIFEST_NAME, IngestionManifest  # noqa: E402
+
+
+class FakeAgent:
+    """Jobs of "slow.pdf" keep running until every other file has been queued."""
+
+    def __init__(self, files, failing=()):
+        self.files = files
+        self.failing = failing
+        self.queued = {}  # job id -> file
+        self.calls = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self.peak = max(self.peak, self.calls)
+
+    def _leave(self):
+        with self._lock:
+            self.calls -= 1
+
+    async def queue_extraction(self, file_path):
+        self._enter()
+        try:
+            await asyncio.sleep(0.001)
+            job_id = f"job-{len(self.queued)}"
+            self.queued[job_id] = file_path
+            return [SimpleNamespace(id=job_id, status="PENDING")]
+        finally:
+            self._leave()
+
+    def get_extraction_job(self, job_id):
+        self._enter()
+        try:
+            time.sleep(0.001)
+            file_path = self.queued[job_id]
+            if file_path.endswith(self.failing):
+                return SimpleNamespace(id=job_id, status="ERROR")
+            running = file_path.endswith("slow.pdf") and len(self.queued) < len(
+                self.files
+            )
+            return SimpleNamespace(id=job_id, status="RUNNING" if running else "SUCCESS")
+        finally:
+            self._leave()
+
+    def get_extraction_run_for_job(self, job_id):
+        file_path = self.queued[job_id]
+        return SimpleNamespace(id=f"run-{job_id}", data={"source": file_path})
+
+
+def make_tracker(agent, **kwargs):
+    kwargs.setdefault("poll_interval", 0.001)
+    kwargs.setdefault("max_poll_interval", 0.01)
+    kwargs.setdefault("timeout", 2.0)
+    return extraction.ExtractionTracker(agent, **kwargs)
+
+
+def test_running_jobs_do_not_hold_back_queuing():
+    files = ["slow.pdf", "a.pdf", "b.pdf", "c.pdf"]
+    agent = FakeAgent(files)
+    seen = []
+
+    results = asyncio.run(
+        make_tracker(agent, max_in_flight=1).run(
+            files, lambda path, run: seen.append(path)
+        )
+    )
+
+    assert {path: run.data["source"] for path, run in results.items()} == {
+        f: f for f in files
+    }
+    assert sorted(seen) == sorted(files)
+    assert agent.peak == 1
+
+
+def test_failed_jobs_are_returned_as_exceptions():
+    files = ["a.pdf", "bad.pdf"]
+    results = asyncio.run(make_tracker(FakeAgent(files, failing=("bad.pdf",))).run(files))
+    assert results["a.pdf"].data == {"source": "a.pdf"}
+    assert isinstance(results["bad.pdf"], RuntimeError)
+
+
+def test_ingesting_sink_saves_ingests_and_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        extraction, "ingest_data", lambda data, kind=None: (data["policy_number"], {})
+    )
+    sink = extraction.IngestingSink(tmp_path)
+    run = SimpleNamespace(id="run-1", data={"policy_number": "513508002"})
+
+    asyncio.run(sink("in/policy.pdf", run))
+
+    path = tmp_path / "llama-extract-run-1-policy.json"
+    assert json.loads(path.read_text(encoding="utf-8")) == run.data
+    assert sink.policies == {"in/policy.pdf": "513508002"}
+    manifest = IngestionManifest(tmp_path / MANIFEST_NAME)
+    assert manifest.entries[path.name]["policy_number"] == "513508002"
+
+
+def test_ingesting_sink_reports_errors(tmp_path, monkeypatch):
+    def ingest_data(data, kind=None):
+        raise ValueError("Missing required field: 'policy_number'")
+
+    monkeypatch.setattr(extraction, "ingest_data", ingest_data)
+    sink = extraction.IngestingSink(tmp_path)
+
+    asyncio.run(sink("in/policy.pdf", SimpleNamespace(id="run-1", data={})))
+
+    assert sink.policies == {}
+    assert sink.errors["in/policy.pdf"].startswith("ValueError")
+    assert not (tmp_path / MANIFEST_NAME).exists()
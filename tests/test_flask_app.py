@@ -0,0 +1,174 @@
+import importlib
+import sys
+
+import pytest
+
+# flask_app uses f-string syntax of Python 3.12
+if sys.version_info < (3, 12):
+    pytest.skip("flask_app needs Python 3.12", allow_module_level=True)
+
+for module in ("flask", "pandas", "mongoengine", "langgraph", "langchain_fireworks"):
+    pytest.importorskip(module)
+
+from src.resubmission.database import DatabaseUnavailableError  # noqa: E402
+from src.resubmission.sessions import (  # noqa: E402
+    MemorySessionStore,
+    ServerSideSessionInterface,
+)
+
+
+@pytest.fixture
+def flask_app(monkeypatch, tmp_path):
+    # The app logs to app.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("flask_app")
+    monkeypatch.setattr(module.app, "secret_key", "test")
+    monkeypatch.setattr(
+        module.app, "session_interface", ServerSideSessionInterface(MemorySessionStore())
+    )
+    return module
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.app.test_client()
+
+
+def test_database_unavailable_is_a_503_page(flask_app, client, monkeypatch):
+    def get_visits_by_date(**kwargs):
+        raise DatabaseUnavailableError(
+            "Database Replica is unavailable, please try again later."
+        ) from ConnectionError("refused")
+
+    monkeypatch.setattr(flask_app, "get_visits_by_date", get_visits_by_date)
+    response = client.get("/")
+    assert response.status_code == 503
+    assert "Database Replica is unavailable" in response.text
+
+
+def visit_frame():
+    import pandas as pd
+
+    return pd.DataFrame(
+        {
+            "VisitId": [1, 1],
+            "Contract": ["VIP", "VIP"],
+            "Service_Name": ["X-Ray", "Filling"],
+            "ResponseReasonCode": ["BE-1-4", "CV-2"],
+            "ResponseReason": ["Not covered", "Limit exceeded"],
+        },
+        index=[4, 9],
+    )
+
+
+@pytest.fixture
+def loaded_visit(flask_app, monkeypatch):
+    """Visit 1 served from patched lookups, counting the SQL and MongoDB fetches."""
+    calls = {"get_visit_data": 0, "get_policy_details": 0}
+
+    def get_visit_data(visit_id, logger):
+        calls["get_visit_data"] += 1
+        return visit_frame() if visit_id == "1" else None
+
+    def get_policy_details(df, logger):
+        calls["get_policy_details"] += 1
+        return {"policy_number": "100"}, {"vip_level": df["Contract"].iloc[0]}, ["VIP"]
+
+    monkeypatch.setattr(flask_app, "get_visit_data", get_visit_data)
+    monkeypatch.setattr(flask_app, "get_policy_details", get_policy_details)
+    monkeypatch.setattr(
+        flask_app, "get_policy_digest", lambda policy, detail, df: "policy digest"
+    )
+    monkeypatch.setattr(
+        flask_app, "policy_cache_key", lambda policy, detail: ("100", "vip")
+    )
+    monkeypatch.setattr(flask_app, "get_visit_info", lambda df: "visit info")
+    return calls
+
+
+def test_justify_all_needs_a_loaded_visit(client, loaded_visit):
+    response = client.post("/chat/1/justify_all")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Visit not loaded, open it again."}
+
+
+def test_justify_all_returns_one_result_per_rejected_row(
+    flask_app, client, loaded_visit, monkeypatch
+):
+    received = {}
+
+    def get_batch_justifications(policy, visit_info, services):
+        received.update(policy=policy, visit_info=visit_info, services=services)
+        return {
+            "4": {"justification": "Covered under dental."},
+            "9": {"error": "rate limited"},
+        }
+
+    monkeypatch.setattr(flask_app, "get_batch_justifications", get_batch_justifications)
+    with client.session_transaction() as session:
+        session["visit_1"] = {"contract": "VIP"}
+
+    response = client.post("/chat/1/justify_all")
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "justifications": {
+            "4": {"justification": "Covered under dental.", "service": "X-Ray"},
+            "9": {"error": "rate limited", "service": "Filling"},
+        }
+    }
+    assert received["policy"] == "policy digest"
+    assert received["visit_info"] == "visit info"
+    assert list(received["services"]) == ["4", "9"]
+
+
+def test_chat_reuses_the_visit_and_coverage_caches(flask_app, client, monkeypatch):
+    from types import SimpleNamespace
+
+    from src.resubmission import utils
+    from src.resubmission.cache import TTLCache
+
+    fetches = {"sql": 0, "mongo": 0}
+    policy = SimpleNamespace(policy_number="100", company_name="Acme")
+
+    def fetch_visit_data(visit_id, logger):
+        fetches["sql"] += 1
+        df = visit_frame().assign(
+            ContractorClientPolicyNumber="100",
+            Med_Dept="Dental",
+            Specialty_Name="Dentist",
+            Diagnose_Name="Caries",
+        )
+        df["ICD10 Code"] = "K02"
+        return df
+
+    def fetch_coverage_detail(kind, policy_number, vip_level_input):
+        fetches["mongo"] += 1
+        return policy, {"vip_level": "VIP", "dental": "covered"}, None
+
+    monkeypatch.setattr(utils, "visit_cache", TTLCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(utils, "coverage_cache", TTLCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(utils, "_fetch_visit_data", fetch_visit_data)
+    monkeypatch.setattr(utils, "_fetch_coverage_detail", fetch_coverage_detail)
+    monkeypatch.setattr(
+        utils, "resolve_policy_number", lambda number, payer=None: ("bupa", number)
+    )
+    monkeypatch.setattr(
+        flask_app, "get_policy_digest", lambda policy, detail, df: "policy digest"
+    )
+    monkeypatch.setattr(
+        flask_app, "policy_cache_key", lambda policy, detail: ("100", "vip")
+    )
+    monkeypatch.setattr(flask_app, "get_visit_info", lambda df: "visit info")
+    monkeypatch.setattr(
+        flask_app, "get_agent_response", lambda *args, **kwargs: "It is covered."
+    )
+
+    assert client.get("/visit/1").status_code == 200
+    assert client.get("/chat/1").status_code == 200
+    response = client.post("/chat/1", data={"message": "Is dental covered?"})
+
+    assert response.get_json() == {"response": "It is covered."}
+    assert fetches == {"sql": 1, "mongo": 1}
+    with client.session_transaction() as session:
+        assert dict(session) == {"visit_1": {"contract": "VIP"}}
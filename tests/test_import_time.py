@@ -0,0 +1,87 @@
+"""
+Importing the app and the CLI modules must do no network nor disk work: no MongoDB
+connection, no SQL, CSV or passcode file read, no SQLite database opened. They are
+imported in a fresh interpreter from an empty directory, so any such work fails or
+leaves a file behind, and the import time of this package's own modules is checked
+against IMPORT_TIME_BUDGET seconds.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "0.5"))
+
+MODULES = [
+    "src.resubmission.utils",
+    "src.resubmission.chatbot",
+    "src.resubmission.pipeline",
+    "src.resubmission.ingestion",
+    "insert",
+]
+# flask_app uses f-string syntax of Python 3.12
+if sys.version_info >= (3, 12):
+    MODULES.append("flask_app")
+
+SCRIPT = """
+import json, sys
+import mongoengine.connection as connection
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({"connections": list(connection._connections)}))
+"""
+
+for module in ("pandas", "mongoengine", "langgraph", "langchain_fireworks", "flask"):
+    pytest.importorskip(module)
+
+
+def own_import_time(stderr):
+    """Sums the self time of this repository's modules in -X importtime output."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[12:].split("|"))
+        if not self_us.isdigit():
+            continue
+        if name.startswith("src") or name in MODULES:
+            total += int(self_us)
+    return total / 1e6
+
+
+@pytest.fixture(scope="module")
+def imported(tmp_path_factory):
+    cwd = tmp_path_factory.mktemp("empty")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT), *sys.path])}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT, *MODULES],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return cwd, json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def test_import_opens_no_connection(imported):
+    _, state, _ = imported
+    assert state["connections"] == []
+
+
+def test_import_creates_no_file(imported):
+    cwd, _, _ = imported
+    created = {p.name for p in cwd.iterdir()} - {"app.log"}
+    assert created == set()
+
+
+def test_import_time_budget(imported):
+    _, _, stderr = imported
+    assert own_import_time(stderr) < IMPORT_TIME_BUDGET
@@ -0,0 +1,231 @@
+import json
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("mongoengine")
+
+from src.resubmission import ingestion  # noqa: E402
+
+
+@pytest.fixture
+def fake_ingest(monkeypatch):
+    numbers = {}  # file name -> policy number the next ingest reads from it
+    deleted = []
+
+    def ingest_files(paths, kind=None, workers=None, batch_size=500):
+        policies = {p: numbers[ingestion.Path(p).name] for p in paths}
+        return {
+            "files": len(paths),
+            "policies": policies,
+            "kinds": {p: "policy" for p in paths},
+            "inserted": len(paths),
+            "updated": 0,
+            "unchanged": 0,
+            "errors": {},
+        }
+
+    monkeypatch.setattr(ingestion, "ingest_files", ingest_files)
+    monkeypatch.setattr(
+        ingestion, "delete_policies", lambda kind, n: deleted.append((kind, set(n)))
+    )
+    return numbers, deleted
+
+
+def test_ingest_changed_deletes_a_replaced_policy_number(tmp_path, fake_ingest):
+    numbers, deleted = fake_ingest
+    (tmp_path / "a.json").write_text('{"v": 1}')
+    (tmp_path / "b.json").write_text('{"v": 1}')
+    numbers.update({"a.json": "111", "b.json": "222"})
+    ingestion.ingest_changed(tmp_path)
+
+    (tmp_path / "a.json").write_text('{"v": 22}')
+    numbers["a.json"] = "333"
+    report = ingestion.ingest_changed(tmp_path)
+
+    assert report["replaced_policies"] == {str(tmp_path / "a.json"): "111"}
+    assert deleted == [("policy", {"111"})]
+    manifest = ingestion.IngestionManifest(tmp_path / ingestion.MANIFEST_NAME)
+    assert manifest.entries["a.json"]["policy_number"] == "333"
+
+
+def test_ingest_changed_keeps_a_number_another_file_holds(tmp_path, fake_ingest):
+    numbers, deleted = fake_ingest
+    (tmp_path / "a.json").write_text('{"v": 1}')
+    (tmp_path / "b.json").write_text('{"v": 1}')
+    numbers.update({"a.json": "111", "b.json": "111"})
+    ingestion.ingest_changed(tmp_path)
+
+    (tmp_path / "a.json").write_text('{"v": 22}')
+    numbers["a.json"] = "333"
+    report = ingestion.ingest_changed(tmp_path)
+
+    assert report["replaced_policies"] == {}
+    assert deleted == []
+
+
+def test_manifest_classifies_new_modified_touched_and_removed(tmp_path):
+    for name in ("same.json", "edited.json", "touched.json", "gone.json"):
+        (tmp_path / name).write_text('{"v": 1}')
+    manifest = ingestion.IngestionManifest(tmp_path / ingestion.MANIFEST_NAME)
+    for path in ingestion.policy_files(tmp_path):
+        manifest.record(path, ingestion.file_digest(path), path.stem)
+    manifest.save()
+
+    (tmp_path / "edited.json").write_text('{"v": 22}')
+    touched = tmp_path / "touched.json"
+    stat = touched.stat()
+    ingestion.os.utime(touched, (stat.st_atime, stat.st_mtime + 10))
+    (tmp_path / "gone.json").unlink()
+    (tmp_path / "added.json").write_text('{"v": 1}')
+
+    manifest = ingestion.IngestionManifest(tmp_path / ingestion.MANIFEST_NAME)
+    new, modified, unchanged, removed = manifest.classify(
+        ingestion.policy_files(tmp_path)
+    )
+    assert list(new) == [str(tmp_path / "added.json")]
+    assert list(modified) == [str(tmp_path / "edited.json")]
+    assert sorted(unchanged) == [str(tmp_path / "same.json"), str(touched)]
+    assert removed == ["gone.json"]
+    # The touched file's new mtime is recorded, its content is not hashed again
+    assert manifest.entries["touched.json"]["mtime"] == touched.stat().st_mtime
+    assert manifest.entries["touched.json"]["policy_number"] == "touched"
+
+
+def test_policy_files_skip_the_manifest(tmp_path):
+    (tmp_path / "a.json").write_text("{}")
+    ingestion.IngestionManifest(tmp_path / ingestion.MANIFEST_NAME).save()
+    assert ingestion.policy_files(tmp_path) == [tmp_path / "a.json"]
+
+
+def policy_json(number, holder=None, levels=("VIP",)):
+    return {
+        "policy_number": number,
+        "company_name": "Bupa Arabia",
+        "policy_holder": holder or f"Holder {number}",
+        "effective_from": "2026-01-01",
+        "coverage_details": [
+            {"vip_level": level, "optical": "1,000"} for level in levels
+        ],
+    }
+
+
+def son(data):
+    return ingestion.parse_policy_data(data)[2]
+
+
+@pytest.fixture
+def bulk_writes(mongo, monkeypatch):
+    """Number of operations of each bulk_write sent to mongomock."""
+    sizes = []
+    bulk_write = mongo.collection.Collection.bulk_write
+
+    def record(self, operations, *args, **kwargs):
+        sizes.append(len(operations))
+        return bulk_write(self, operations, *args, **kwargs)
+
+    monkeypatch.setattr(mongo.collection.Collection, "bulk_write", record)
+    return sizes
+
+
+def test_upsert_policies_inserts_in_batches(bulk_writes):
+    documents = {str(n): son(policy_json(str(n))) for n in range(5)}
+
+    counts, errors = ingestion.upsert_policies("policy", documents, batch_size=2)
+
+    assert counts == {"inserted": 5, "updated": 0, "unchanged": 0}
+    assert errors == {}
+    assert bulk_writes == [2, 2, 1]
+    assert ingestion.Policy.objects.count() == 5
+
+
+def test_upsert_policies_replaces_by_policy_number(bulk_writes):
+    ingestion.upsert_policies(
+        "policy", {"1": son(policy_json("1")), "2": son(policy_json("2"))}
+    )
+    index = ingestion.get_policy_index(ingestion.Policy)
+    index.build()
+
+    changed = son(policy_json("1", levels=("VIP", "A")))
+    counts, _ = ingestion.upsert_policies(
+        "policy", {"1": changed, "2": son(policy_json("2")), "3": son(policy_json("3"))}
+    )
+
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert ingestion.Policy.objects.count() == 3
+    stored = ingestion.Policy.objects(policy_number="1").first()
+    assert [c.vip_level for c in stored.coverage_details] == ["VIP", "A"]
+    assert index.resolve("3") == "3"
+    assert index.resolve_class("1", "a") == "A"
+
+
+def test_upsert_policies_reports_failed_writes_and_keeps_the_others(bulk_writes):
+    ingestion.Policy._get_collection().create_index("policy_holder", unique=True)
+    index = ingestion.get_policy_index(ingestion.Policy)
+    index.build()
+    documents = {
+        "1": son(policy_json("1", holder="Same")),
+        "2": son(policy_json("2", holder="Same")),
+        "3": son(policy_json("3")),
+    }
+
+    counts, errors = ingestion.upsert_policies("policy", documents)
+
+    assert list(errors) == ["2"]
+    assert "Duplicate" in errors["2"]
+    assert counts["inserted"] == 2
+    assert sorted(ingestion.Policy.objects.distinct("policy_number")) == ["1", "3"]
+    assert index.resolve("2") is None
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_ingest_files_reports_each_file(mongo, tmp_path):
+    ingestion.Policy._get_collection().create_index("policy_holder", unique=True)
+    good = write_json(tmp_path / "good.json", policy_json("1"))
+    ncci = write_json(
+        tmp_path / "ncci.json",
+        {
+            "policy_number": "48594944",
+            "provider_name": "NCCI",
+            "policy_status": "Active",
+            "policy_holder_name": "Hala",
+            "policy_type": "Group",
+            "classes": [
+                {"class_code": "A", "room_type": "Private", "room_limit": "1000"}
+            ],
+        },
+    )
+    duplicate = write_json(tmp_path / "dup.json", policy_json("2", holder="Holder 1"))
+    missing = write_json(tmp_path / "missing.json", {"coverage_details": []})
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json", encoding="utf-8")
+
+    report = ingestion.ingest_files([good, ncci, duplicate, missing, broken], workers=2)
+
+    assert report["files"] == 5
+    assert report["policies"] == {good: "1", ncci: "48594944"}
+    assert report["kinds"] == {good: "policy", ncci: "ncci"}
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (2, 0, 0)
+    assert set(report["errors"]) == {duplicate, missing, str(broken)}
+    assert "policy_number" in report["errors"][missing]
+    assert report["errors"][str(broken)].startswith("JSONDecodeError")
+    assert ingestion.NCCI_Policy.objects.count() == 1
+
+
+def test_delete_policies(mongo):
+    ingestion.upsert_policies(
+        "policy", {"1": son(policy_json("1")), "2": son(policy_json("2"))}
+    )
+    index = ingestion.get_policy_index(ingestion.Policy)
+    index.build()
+
+    assert ingestion.delete_policies("policy", ["1", "9"]) == 1
+    assert ingestion.delete_policies("policy", []) == 0
+
+    assert ingestion.Policy.objects.distinct("policy_number") == ["2"]
+    assert index.resolve("1") is None
+    assert index.resolve("2") == "2"
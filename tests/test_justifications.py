@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+
+from langchain_core.messages import AIMessage  # noqa: E402
+
+from src.resubmission import chatbot  # noqa: E402
+from src.resubmission.chatbot import InsuranceAgent  # noqa: E402
+
+
+class FakeLLM:
+    """batch() answering each prompt with its last message, failing the "bad" ones."""
+
+    def __init__(self):
+        self.prompts = None
+        self.config = None
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        assert return_exceptions
+        self.prompts, self.config = prompts, config
+        return [
+            RuntimeError("rate limited")
+            if "bad" in prompt[-1].content
+            else AIMessage(content="justified: " + prompt[-1].content[-20:])
+            for prompt in prompts
+        ]
+
+
+@pytest.fixture
+def agent():
+    agent = InsuranceAgent.__new__(InsuranceAgent)  # no model client nor checkpointer
+    agent.llm = FakeLLM()
+    agent.model = "test-model"
+    return agent
+
+
+SERVICES = {
+    "0": {"Service_Name": "X-Ray"},
+    "3": {"Service_Name": "bad filling"},
+    "7": {"Service_Name": "Cleaning"},
+}
+
+
+def test_results_are_keyed_by_row_index(agent):
+    results = agent.justify_batch("policy", "visit", SERVICES)
+    assert list(results) == ["0", "3", "7"]
+    assert results["0"]["justification"].endswith("'X-Ray'}")
+    assert results["7"]["justification"].endswith("'Cleaning'}")
+
+
+def test_a_failed_service_does_not_fail_the_others(agent):
+    results = agent.justify_batch("policy", "visit", SERVICES)
+    assert results["3"] == {"error": "rate limited"}
+    assert "justification" in results["0"] and "justification" in results["7"]
+
+
+def test_max_concurrency_is_passed_to_batch(agent):
+    agent.justify_batch("policy", "visit", SERVICES, max_concurrency=2)
+    assert agent.llm.config == {"max_concurrency": 2}
+
+
+def test_each_service_gets_the_shared_context_and_its_own_prompt(agent):
+    agent.justify_batch("policy digest", "visit info", SERVICES)
+    context = agent._system_context("policy digest", "visit info")["messages"]
+    for prompt, service in zip(agent.llm.prompts, SERVICES.values()):
+        assert prompt[:-1] == context
+        assert prompt[-1].content.endswith(str(service))
+
+
+def test_get_batch_justifications_uses_the_shared_agent(agent, monkeypatch):
+    monkeypatch.setattr(chatbot, "get_agent", lambda: agent)
+    results = chatbot.get_batch_justifications("policy", "visit", SERVICES, 3)
+    assert agent.llm.config == {"max_concurrency": 3}
+    assert set(results) == set(SERVICES)
+
+
+def test_get_rejected_services_selects_be_and_cv_rows():
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("mongoengine")
+    from src.resubmission.utils import get_rejected_services
+
+    df = pd.DataFrame(
+        {
+            "Service_Name": ["X-Ray", "Filling", "Cleaning", "Crown"],
+            "ResponseReasonCode": ["BE-1-4", None, "MN-1", None],
+            "ResponseReason": ["Not covered", "CV-2 exceeded limit", None, None],
+            "Med_Dept": ["Dental"] * 4,
+            "VisitId": [1] * 4,
+        },
+        index=[10, 11, 12, 13],
+    )
+
+    services = get_rejected_services(df)
+
+    assert list(services) == ["10", "11"]
+    assert services["11"] == {
+        "Med_Dept": "Dental",
+        "Service_Name": "Filling",
+        "ResponseReason": "CV-2 exceeded limit",
+    }
@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+
+from src.resubmission.chatbot import get_model_limiter  # noqa: E402
+
+
+async def limiters(*models):
+    return [get_model_limiter(model) for model in models]
+
+
+def test_limiter_is_shared_within_a_loop():
+    first, second, other = asyncio.run(limiters("model-a", "model-a", "model-b"))
+    assert first is second
+    assert first is not other
+
+
+def test_each_event_loop_gets_its_own_limiter():
+    (first,) = asyncio.run(limiters("model-a"))
+    (second,) = asyncio.run(limiters("model-a"))
+    assert first is not second
@@ -0,0 +1,131 @@
+import re
+
+import pytest
+
+pytest.importorskip("mongoengine")
+
+from src.resubmission.models import (  # noqa: E402
+    CoverageDetail,
+    NCCI_Policy,
+    Policy,
+    PolicyClass,
+    level_pattern,
+)
+
+
+def matches(level, value):
+    pattern = level_pattern(level)
+    assert pattern["$options"] == "i"
+    return re.match(pattern["$regex"], value, re.I) is not None
+
+
+@pytest.mark.parametrize(
+    "level, value, expected",
+    [
+        ("VIP", "vip", True),
+        ("VIP", " V-I P ", True),
+        ("vip+", "VIP +", True),
+        ("A+", "A+", True),
+        # Metacharacters are matched literally
+        ("A+", "AA", False),
+        ("A+", "A", False),
+        ("VIP (1)", "vip (1)", True),
+        ("VIP (1)", "VIP 1", False),
+        ("A.B", "AxB", False),
+        ("A*", "AAAA", False),
+        ("[A]", "A", False),
+        # The whole value must match
+        ("VIP", "VVIP", False),
+        ("VIP", "VIP+", False),
+    ],
+)
+def test_level_pattern(level, value, expected):
+    assert matches(level, value) is expected
+
+
+def bupa_policy():
+    return Policy(
+        policy_number="513508002",
+        company_name="Bupa Arabia",
+        policy_holder="Hala",
+        coverage_details=[
+            CoverageDetail(vip_level="VIP (1)", optical="500"),
+            CoverageDetail(vip_level="A+", optical="1,000"),
+            CoverageDetail(vip_level="AA", optical="2,000"),
+        ],
+        class_aliases={"vip": ["VIP (1)", 0.9]},
+    )
+
+
+def test_with_coverage_level_projects_the_matching_detail_only(mongo):
+    bupa_policy().save()
+
+    policy = Policy.objects(policy_number="513508002").with_coverage_level("a +")
+
+    assert policy.policy_holder == "Hala"
+    assert [c.vip_level for c in policy.coverage_details] == ["A+"]
+    # Fields outside the header are not loaded
+    assert policy.class_aliases == {}
+
+
+def test_with_coverage_level_escapes_metacharacters(mongo):
+    bupa_policy().save()
+    objects = Policy.objects(policy_number="513508002")
+
+    assert objects.with_coverage_level("vip (1)").coverage_details[0].optical == "500"
+    assert objects.with_coverage_level("A+").coverage_details[0].vip_level == "A+"
+    assert not objects.with_coverage_level("VIP 1").coverage_details
+    assert Policy.objects(policy_number="0").with_coverage_level("A+") is None
+
+
+def test_with_class_projects_the_matching_class_only(mongo):
+    NCCI_Policy(
+        provider_name="NCCI",
+        policy_number="48594944",
+        policy_status="Active",
+        policy_holder_name="Hala",
+        policy_type="Group",
+        coverage="Worldwide",
+        classes=[
+            PolicyClass(class_code="VIP+", room_type="Private", room_limit="1500"),
+            PolicyClass(class_code="VIP", room_type="Private", room_limit="1200"),
+        ],
+    ).save()
+
+    policy = NCCI_Policy.objects(policy_number="48594944").with_class("vip")
+
+    assert policy.coverage == "Worldwide"
+    assert [c.room_limit for c in policy.classes] == ["1200"]
+    plus = NCCI_Policy.objects(policy_number="48594944").with_class("Vip +")
+    assert [c.class_code for c in plus.classes] == ["VIP+"]
+
+
+@pytest.mark.parametrize(
+    "model, keys",
+    [
+        (
+            Policy,
+            [
+                [("policy_number", 1)],
+                [("effective_from", 1), ("effective_to", 1)],
+                [("effective_to", 1)],
+                [("coverage_details.vip_level", 1)],
+            ],
+        ),
+        (
+            NCCI_Policy,
+            [
+                [("policy_number", 1)],
+                [("start_date", 1), ("end_date", 1)],
+                [("end_date", 1)],
+                [("classes.class_code", 1)],
+            ],
+        ),
+    ],
+)
+def test_indexes_are_created(mongo, model, keys):
+    model.ensure_indexes()
+    info = model._get_collection().index_information()
+    created = [spec["key"] for name, spec in info.items() if name != "_id_"]
+    for key in keys:
+        assert key in created
@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+pytest.importorskip("mongoengine")
+
+from src.resubmission import pipeline  # noqa: E402
+from src.resubmission.pipeline import Checkpoint, RateLimiter  # noqa: E402
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_rate_limiter_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        RateLimiter(rate=rate)
+
+
+def test_rate_limiter_allows_a_burst():
+    limiter = RateLimiter(rate=1000, burst=3)
+    for _ in range(3):
+        limiter.acquire()
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    path = tmp_path / "run.checkpoint"
+    Checkpoint(path).mark(101)
+    assert Checkpoint(path).done == {"101"}
+
+
+def test_missing_parquet_engine_fails_before_fetching(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.importlib.util, "find_spec", lambda name: None)
+
+    def fetch(*args):
+        raise AssertionError("visits fetched before the output was checked")
+
+    monkeypatch.setattr(pipeline, "get_visits_data_by_date", fetch)
+    with pytest.raises(ImportError):
+        pipeline.run_bulk_resubmission(
+            "2026-10-01", "2026-10-02", tmp_path / "out", logger=None
+        )
+
+
+def test_invalid_visit_ids_are_skipped(tmp_path, monkeypatch, caplog):
+    import logging
+
+    requested = []
+
+    def get_visits_data(visit_ids, logger):
+        requested.extend(visit_ids)
+        return {}
+
+    monkeypatch.setattr(pipeline, "get_visits_data", get_visits_data)
+    logger = logging.getLogger("test_pipeline")
+    with caplog.at_level(logging.WARNING, logger="test_pipeline"):
+        processed = pipeline.run_bulk_resubmission(
+            None,
+            None,
+            str(tmp_path / "out.csv"),
+            logger,
+            visit_ids=["101", "abc", " 102 ", "10-3"],
+        )
+
+    assert processed == 0
+    assert requested == ["101", "102"]
+    assert "Skipping invalid visit id 'abc'" in caplog.text
+    assert "Skipping invalid visit id '10-3'" in caplog.text
@@ -0,0 +1,87 @@
+from src.resubmission.policy_index import PolicyNumberIndex, normalize_policy_number
+
+
+class FakeQuerySet:
+    def __init__(self, rows, calls):
+        self.rows = rows
+        self.calls = calls
+
+    def only(self, *fields):
+        return self
+
+    def as_pymongo(self):
+        self.calls.append("build")
+        return list(self.rows)
+
+
+class FakeModel:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def objects(self, **kwargs):
+        return FakeQuerySet(self.rows, self.calls)
+
+
+def make_index(numbers, **kwargs):
+    model = FakeModel([{"policy_number": n} for n in numbers])
+    return model, PolicyNumberIndex(model, **kwargs)
+
+
+def test_normalize_policy_number():
+    assert normalize_policy_number(" 513 508002 ") == "513508002"
+    assert normalize_policy_number(None) == ""
+
+
+def test_resolve_exact_match():
+    _, index = make_index(["513508002", "48594944-01"])
+    assert index.resolve("513508002 ") == "513508002"
+
+
+def test_resolve_prefix_of_stored_number():
+    _, index = make_index(["513508002", "48594944-01"])
+    assert index.resolve("48594944") == "48594944-01"
+
+
+def test_resolve_substring_of_stored_number():
+    _, index = make_index(["BUPA-48594944-01"])
+    assert index.resolve("48594944") == "BUPA-48594944-01"
+
+
+def test_resolve_unknown_number_returns_none():
+    _, index = make_index(["513508002"])
+    assert index.resolve("999") is None
+    assert index.resolve("") is None
+
+
+def test_misses_are_cached_until_add():
+    model, index = make_index(["513508002"], refresh_interval=3600)
+    assert index.resolve("777") is None
+    assert "777" in index._misses
+    index.add("BUPA-777")
+    assert index.resolve("777") == "BUPA-777"
+    assert model.calls == ["build"]
+
+
+def test_miss_rebuilds_after_refresh_interval():
+    model, index = make_index(["513508002"], refresh_interval=0)
+    index.build()
+    model.rows.append({"policy_number": "600100"})
+    assert index.resolve("600100") == "600100"
+    assert model.calls == ["build", "build"]
+
+
+def test_discard_removes_number():
+    _, index = make_index(["513508002"], refresh_interval=3600)
+    index.build()
+    index.discard("513508002")
+    assert index.resolve("513508002") is None
+
+
+def test_resolve_class_from_loaded_aliases():
+    model = FakeModel(
+        [{"policy_number": "100", "class_aliases": {"a+": ["Class A+", 0.95]}}]
+    )
+    index = PolicyNumberIndex(model)
+    assert index.resolve_class("100", "A+") == "Class A+"
+    assert index.resolve_class("100", "B") is None
@@ -0,0 +1,67 @@
+import pytest
+
+from src.resubmission.relevance import (
+    ALWAYS_RELEVANT_FIELDS,
+    BM25Index,
+    coverage_field_index,
+    icd10_hints,
+    prune_detail,
+    tokenize,
+    visit_query,
+)
+
+DETAIL = {
+    "vip_level": "VIP",
+    "overall_annual_limit": "SAR 1,000,000",
+    "optical": "Eye glasses and lenses up to SAR 500",
+    "dental": "Dental treatment up to SAR 2,000",
+    "maternity": "Pregnancy and delivery up to SAR 15,000",
+    "physiotherapy": "Physiotherapy sessions up to 12 per year",
+    "psychiatric": "",
+}
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("Lenses and the Glasses of 2 eyes") == ["lense", "glasse", "2", "eye"]
+
+
+def test_icd10_hints():
+    assert icd10_hints("K02.1 , H52.1") == "dental optical eye lens"
+    assert icd10_hints(None) == ""
+
+
+def test_bm25_ranks_matching_document_first():
+    index = BM25Index({"a": "dental treatment", "b": "optical lenses", "c": "other"})
+    scores = index.scores("dental")
+    assert scores["a"] > 0
+    assert scores["b"] == scores["c"] == 0
+
+
+def test_field_index_skips_empty_fields():
+    scores = coverage_field_index(DETAIL).scores("psychiatric")
+    assert "psychiatric" not in scores
+
+
+def test_prune_keeps_always_relevant_and_top_fields_in_order():
+    index = coverage_field_index(DETAIL)
+    pruned = prune_detail(DETAIL, index, "optical eye lens", top_k=1)
+    assert list(pruned) == ["vip_level", "overall_annual_limit", "optical"]
+    assert set(ALWAYS_RELEVANT_FIELDS) >= {"vip_level", "overall_annual_limit"}
+
+
+def test_prune_drops_fields_matching_nothing():
+    index = coverage_field_index(DETAIL)
+    pruned = prune_detail(DETAIL, index, "unrelated", top_k=12)
+    assert list(pruned) == ["vip_level", "overall_annual_limit"]
+
+
+def test_visit_query_adds_icd10_hints():
+    pd = pytest.importorskip("pandas")
+    df = pd.DataFrame(
+        {
+            "Specialty_Name": ["Dentistry", "Dentistry"],
+            "ICD10 Code": ["K02.1", None],
+            "Service_Name": ["Filling", "X-Ray"],
+        }
+    )
+    assert visit_query(df) == "Dentistry K02.1 Filling X-Ray dental"
@@ -0,0 +1,163 @@
+import pytest
+
+pytest.importorskip("flask")
+
+from src.resubmission import sessions as sessions_module  # noqa: E402
+from src.resubmission.sessions import (  # noqa: E402
+    MemorySessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(sessions_module.time, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+
+
+def test_set_then_get(store, clock):
+    store.set("sid", {"last_search": {"visit_id": "1"}}, ttl=60)
+    assert store.get("sid") == {"last_search": {"visit_id": "1"}}
+    assert store.get("other") is None
+
+
+def test_session_expires_after_ttl(store, clock):
+    store.set("sid", {"a": 1}, ttl=60)
+    clock.now += 59
+    assert store.get("sid") == {"a": 1}
+    clock.now += 2
+    assert store.get("sid") is None
+
+
+def test_set_refreshes_expiry(store, clock):
+    store.set("sid", {"a": 1}, ttl=60)
+    clock.now += 50
+    store.set("sid", {"a": 2}, ttl=60)
+    clock.now += 50
+    assert store.get("sid") == {"a": 2}
+
+
+def test_delete(store, clock):
+    store.set("sid", {"a": 1}, ttl=60)
+    store.delete("sid")
+    assert store.get("sid") is None
+    store.delete("sid")  # deleting a missing session is a no-op
+
+
+def test_memory_store_is_bounded(clock):
+    store = MemorySessionStore(maxsize=2)
+    for sid in ("a", "b", "c"):
+        store.set(sid, {}, ttl=60)
+    assert store.get("a") is None
+    assert store.get("c") == {}
+
+
+def test_sqlite_store_prunes_expired_rows(tmp_path, clock):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), prune_interval=0)
+    store.set("old", {}, ttl=10)
+    clock.now += 20
+    store.set("new", {}, ttl=10)
+    rows = store._conn.execute("SELECT sid FROM sessions").fetchall()
+    assert rows == [("new",)]
+
+
+def test_create_session_store_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        create_session_store("filesystem")
+
+
+def test_interface_creates_store_on_first_use():
+    from src.resubmission.sessions import ServerSideSessionInterface
+
+    created = []
+
+    def factory():
+        created.append(MemorySessionStore())
+        return created[-1]
+
+    interface = ServerSideSessionInterface(factory)
+    assert created == []
+    assert interface.store is created[0]
+    assert interface.store is created[0]
+
+
+def test_touch_extends_expiry_without_changing_data(store, clock):
+    store.set("sid", {"a": 1}, ttl=60)
+    clock.now += 50
+    store.touch("sid", ttl=60)
+    clock.now += 50
+    assert store.get("sid") == {"a": 1}
+    store.touch("missing", ttl=60)
+    assert store.get("missing") is None
+
+
+def test_session_store_is_abstract():
+    from src.resubmission.sessions import SessionStore
+
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def make_app(store, **config):
+    from datetime import timedelta
+
+    from flask import Flask, session
+
+    from src.resubmission.sessions import ServerSideSessionInterface
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.config.update(config)
+    app.session_interface = ServerSideSessionInterface(store)
+    app.permanent_session_lifetime = timedelta(seconds=60)
+
+    @app.route("/write")
+    def write():
+        session["visit_1"] = {"contract": "VIP"}
+        return "ok"
+
+    @app.route("/read")
+    def read():
+        return str(session.get("visit_1"))
+
+    return app
+
+
+def test_read_only_request_extends_expiry(store, clock):
+    client = make_app(store).test_client()
+    client.get("/write")
+    for _ in range(3):
+        clock.now += 50
+        response = client.get("/read")
+        assert response.text == "{'contract': 'VIP'}"
+        assert "Expires=" in response.headers["Set-Cookie"]
+    clock.now += 61
+    assert client.get("/read").text == "None"
+
+
+def test_expiry_is_fixed_without_refresh_each_request(store, clock):
+    client = make_app(store, SESSION_REFRESH_EACH_REQUEST=False).test_client()
+    client.get("/write")
+    clock.now += 50
+    response = client.get("/read")
+    assert response.text == "{'contract': 'VIP'}"
+    assert "Set-Cookie" not in response.headers
+    clock.now += 20
+    assert client.get("/read").text == "None"
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from src.resubmission import utils  # noqa: E402
+from src.resubmission.sfda import SFDALookup, normalize_service_name  # noqa: E402
+
+
+def write_list(path, rows):
+    lines = ["Service_Name,Code,Price"] + [",".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_normalize_service_name():
+    assert normalize_service_name("  Panadol   500MG ") == "panadol 500mg"
+    assert normalize_service_name(None) == ""
+
+
+def test_lookup_keeps_input_order_and_misses(tmp_path):
+    path = tmp_path / "sfda.csv"
+    write_list(path, [("Panadol 500mg", "P1", "10"), ("Brufen", "B1", "20")])
+    sfda = SFDALookup(path)
+
+    df = sfda.lookup(["brufen", "Unknown", "PANADOL  500MG"])
+
+    assert list(df.columns) == ["Code", "Price"]
+    assert df["Code"][0] == "B1"
+    assert pd.isna(df["Code"][1])
+    assert df["Code"][2] == "P1"
+
+
+def test_first_occurrence_wins(tmp_path):
+    path = tmp_path / "sfda.csv"
+    write_list(path, [("Brufen", "B1", "20"), ("brufen", "B2", "30")])
+    assert list(SFDALookup(path).lookup(["Brufen"])["Code"]) == ["B1"]
+
+
+def test_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "sfda.csv"
+    write_list(path, [("Brufen", "B1", "20")])
+    sfda = SFDALookup(path)
+    assert list(sfda.lookup(["Brufen"])["Code"]) == ["B1"]
+
+    write_list(path, [("Brufen", "B9", "20")])
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert list(sfda.lookup(["Brufen"])["Code"]) == ["B9"]
+
+
+def test_prepare_visit_frame_replaces_sfda_columns_from_sql(tmp_path, monkeypatch):
+    path = tmp_path / "sfda.csv"
+    write_list(path, [("Brufen", "B1", "20")])
+    monkeypatch.setattr(utils, "sfda_lookup", SFDALookup(path))
+    df = pd.DataFrame(
+        {
+            "VisitID": [1, 1],
+            "Contract": ["X - Gold", "Gold"],
+            "Service_Name": ["brufen", "Unknown"],
+            "Code": ["stale", "stale"],
+            "Start_Date": ["2024-01-02 03:04:05", "2024-01-02 03:04:05"],
+        }
+    )
+
+    df = utils._prepare_visit_frame(df)
+
+    assert list(df.columns).count("Code") == 1
+    assert df["Code"][0] == "B1"
+    assert pd.isna(df["Code"][1])
+    assert list(df["Contract"]) == ["Gold", "Gold"]
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_fireworks")
+
+from src.resubmission.chatbot import TokenUsage  # noqa: E402
+
+
+def with_usage_metadata(input_tokens, cached, output_tokens):
+    return SimpleNamespace(
+        usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "input_token_details": {"cache_read": cached},
+        }
+    )
+
+
+def with_raw_usage(prompt_tokens, cached, completion_tokens):
+    return SimpleNamespace(
+        usage_metadata=None,
+        response_metadata={
+            "token_usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            }
+        },
+    )
+
+
+def test_record_reads_usage_metadata():
+    usage = TokenUsage()
+    assert usage.record(with_usage_metadata(1000, 800, 50)) == {
+        "input_tokens": 1000,
+        "cached_input_tokens": 800,
+        "uncached_input_tokens": 200,
+        "output_tokens": 50,
+    }
+
+
+def test_record_falls_back_to_raw_token_usage():
+    usage = TokenUsage()
+    assert usage.record(with_raw_usage(400, None, 20))["uncached_input_tokens"] == 400
+    assert usage.record(SimpleNamespace())["input_tokens"] == 0
+
+
+def test_stats_totals_and_hit_rate():
+    usage = TokenUsage()
+    assert usage.stats()["cache_hit_rate"] == 0.0
+    usage.record(with_usage_metadata(1000, 800, 50))
+    usage.record(with_raw_usage(1000, 0, 30))
+
+    assert usage.stats() == {
+        "calls": 2,
+        "input_tokens": 2000,
+        "cached_input_tokens": 800,
+        "uncached_input_tokens": 1200,
+        "output_tokens": 80,
+        "cache_hit_rate": 0.4,
+    }
@@ -0,0 +1,61 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sqlalchemy")
+
+from src.resubmission import visit_index as visit_index_module  # noqa: E402
+from src.resubmission.visit_index import VisitIndex  # noqa: E402
+
+
+class FakeReplica:
+    """Stands in for read_data, serving the visits created since the watermark."""
+
+    def __init__(self, visits):
+        self.visits = visits  # (visit id, created date)
+        self.calls = []
+
+    def __call__(self, query, db_name, params):
+        self.calls.append((query, params))
+        rows = self.visits
+        if params:
+            rows = [v for v in rows if pd.Timestamp(v[1]) >= pd.Timestamp(params[0])]
+        return pd.DataFrame(rows, columns=["VisitID", "CreatedDate"])
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    fake = FakeReplica(
+        [(101, "2024-01-01 09:00"), (102, "2024-01-02 09:00"), (201, "2024-01-03 09:00")]
+    )
+    monkeypatch.setattr(visit_index_module, "read_data", fake)
+    return fake
+
+
+def ids(result):
+    return [v["visit_id"] for v in result["visits"]]
+
+
+def test_search_newest_first(replica):
+    index = VisitIndex("full", "since", "Replica")
+    result = index.search()
+    assert result["total"] == 3
+    assert ids(result) == ["201", "102", "101"]
+
+
+def test_search_prefix_dates_and_paging(replica):
+    index = VisitIndex("full", "since", "Replica")
+    assert ids(index.search(prefix="10")) == ["102", "101"]
+    assert ids(index.search(end_date="2024-01-02")) == ["102", "101"]
+    assert ids(index.search(start_date="2024-01-02")) == ["201", "102"]
+    assert ids(index.search(limit=1, offset=1)) == ["102"]
+
+
+def test_refresh_fetches_only_new_visits(replica):
+    index = VisitIndex("full", "since", "Replica", refresh_interval=0)
+    index.search()
+    replica.visits.append((301, "2024-01-04 09:00"))
+
+    assert ids(index.search(limit=2)) == ["301", "201"]
+    assert replica.calls[0] == ("full", None)
+    assert replica.calls[-1][0] == "since"
+    assert index.search()["total"] == 4  # the watermark row is not duplicated